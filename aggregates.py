@@ -0,0 +1,120 @@
+"""
+Script description: Totali della dashboard e delle statistiche aggiornati a ogni modifica.
+
+Conteggi per stato, ricavi, depositi pagati e totali per attrezzatura vengono
+sommati e sottratti record per record quando le prenotazioni cambiano, così le
+pagine "home" e "stats" li leggono in tempo costante invece di scandire l'elenco.
+
+Libraries imported:
+-------------------
+- json: Module for JSON data handling.
+- os: Module for operating system interface.
+- storage: Scrittura atomica dei file JSON.
+"""
+
+import json
+import os
+
+from storage import atomic_write_json
+
+EQUIPMENT = ['ombrellone', 'sdraio', 'lettino', 'regista']
+
+
+class RunningAggregates:
+    """Totali correnti delle prenotazioni"""
+
+    def __init__(self):
+        self.total = 0
+        self.completed = 0
+        self.deposits_paid = 0
+        self.insured = 0
+        # Ricavi in centesimi: somme e sottrazioni ripetute restano esatte
+        self.revenue_cents = 0
+        self.equipment = {eq: 0 for eq in EQUIPMENT}
+
+    @property
+    def active(self):
+        return self.total - self.completed
+
+    @property
+    def revenue(self):
+        return self.revenue_cents / 100
+
+    @property
+    def average_price(self):
+        return self.revenue / self.total if self.total else 0
+
+    def _account(self, record, sign):
+        self.total += sign
+        self.completed += sign * bool(record.get('completed', False))
+        self.deposits_paid += sign * bool(record.get('deposit_paid'))
+        self.insured += sign * bool(record.get('insurance'))
+        self.revenue_cents += sign * round(float(record.get('price') or 0) * 100)
+        for eq in EQUIPMENT:
+            self.equipment[eq] += sign * int(record.get(eq) or 0)
+
+    def add(self, record):
+        self._account(record, 1)
+
+    def remove(self, record):
+        self._account(record, -1)
+
+    def replace(self, old, new):
+        if old is not None:
+            self.remove(old)
+        if new is not None:
+            self.add(new)
+
+    @classmethod
+    def total_of(cls, parts):
+        """Totali complessivi di più insiemi di prenotazioni (es. lavoro e archivio)"""
+        result = cls()
+        for part in parts:
+            result.total += part.total
+            result.completed += part.completed
+            result.deposits_paid += part.deposits_paid
+            result.insured += part.insured
+            result.revenue_cents += part.revenue_cents
+            for eq in EQUIPMENT:
+                result.equipment[eq] += part.equipment[eq]
+        return result
+
+    def to_dict(self):
+        return {
+            'total': self.total,
+            'completed': self.completed,
+            'deposits_paid': self.deposits_paid,
+            'insured': self.insured,
+            'revenue_cents': self.revenue_cents,
+            'equipment': dict(self.equipment),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        aggregates = cls()
+        aggregates.total = data['total']
+        aggregates.completed = data['completed']
+        aggregates.deposits_paid = data['deposits_paid']
+        aggregates.insured = data['insured']
+        aggregates.revenue_cents = data['revenue_cents']
+        aggregates.equipment.update(data['equipment'])
+        return aggregates
+
+
+def load_aggregates(path, cursor):
+    """Totali salvati, solo se corrispondono esattamente alla posizione dei dati"""
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('cursor') != json.loads(json.dumps(cursor)):
+            return None
+        return RunningAggregates.from_dict(data['aggregates'])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def save_aggregates(path, cursor, aggregates):
+    """Salva i totali accanto ai dati, insieme alla posizione a cui si riferiscono"""
+    atomic_write_json(path, {'cursor': cursor, 'aggregates': aggregates.to_dict()})
@@ -0,0 +1,152 @@
+"""
+Script description: Statistiche vettorizzate con NumPy per la pagina Statistiche.
+
+Le prenotazioni vengono convertite una volta per versione dei dati in colonne
+NumPy (date, restituzione, prezzo, attrezzature, flag, operatore); ricavi per
+giorno/settimana/mese, utilizzo delle attrezzature, durata media, quota di
+depositi pagati e riepiloghi per operatore sono poi operazioni su array.
+
+Libraries imported:
+-------------------
+- numpy: Fundamental package for array computing.
+- datetime: Module for date and time operations.
+- records: Prenotazioni compatte con le date come giorni ordinali.
+"""
+
+import numpy as np
+from datetime import date
+
+from records import FLAG_BITS, Reservation, date_ordinal
+
+EQUIPMENT = ['ombrellone', 'sdraio', 'lettino', 'regista']
+
+# Differenza tra il giorno ordinale di Python e i giorni dal 1970 di NumPy
+_UNIX_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+class ReservationColumns:
+    """Prenotazioni in forma colonnare"""
+
+    def __init__(self, records):
+        operators = {}
+        rows = []
+        for record in records:
+            row = _row(record)
+            if row is not None:
+                rows.append(row + (operators.setdefault(row[-1], len(operators)),))
+        n = len(rows)
+        self.size = n
+        table = np.array([row[:-2] for row in rows], dtype=np.float64).reshape(n, 9)
+        self.start = table[:, 0].astype(np.int64)
+        self.end = np.maximum(table[:, 1].astype(np.int64), self.start)
+        self.price = table[:, 2]
+        self.equipment = table[:, 3:7].astype(np.int32)
+        self.deposit_paid = table[:, 7].astype(bool)
+        self.completed = table[:, 8].astype(bool)
+        self.operator = np.fromiter((row[-1] for row in rows), dtype=np.int32, count=n)
+        self.operator_names = list(operators)
+
+
+def _row(record):
+    """(inizio, fine, prezzo, attrezzature..., deposito, completato, operatore)"""
+    if isinstance(record, Reservation):
+        if not record.date_ord:
+            return None
+        return (record.date_ord, record.return_ord or record.date_ord, record.price,
+                record.ombrellone, record.sdraio, record.lettino, record.regista,
+                record.flags & FLAG_BITS['deposit_paid'], record.flags & FLAG_BITS['completed'],
+                record.created_by or 'N/A')
+    start = date_ordinal(record.get('date'))
+    if not start:
+        return None
+    return (start, date_ordinal(record.get('return_date')) or start, float(record.get('price') or 0),
+            *(int(record.get(eq) or 0) for eq in EQUIPMENT),
+            bool(record.get('deposit_paid')), bool(record.get('completed')),
+            record.get('created_by') or 'N/A')
+
+
+def _to_dates(ordinals):
+    return (np.asarray(ordinals, dtype=np.int64) - _UNIX_ORDINAL).astype('datetime64[D]')
+
+
+def _grouped_sum(keys, weights):
+    """Somma dei pesi per chiave: (chiavi ordinate, somme)"""
+    if keys.size == 0:
+        return keys, weights
+    unique, inverse = np.unique(keys, return_inverse=True)
+    return unique, np.bincount(inverse, weights=weights, minlength=unique.size)
+
+
+def revenue_by_day(cols):
+    days, revenue = _grouped_sum(cols.start, cols.price)
+    return _to_dates(days), revenue
+
+
+def revenue_by_week(cols):
+    """Ricavi per settimana (lunedì di inizio settimana)"""
+    # date.fromordinal(1) è un lunedì: (ordinale - 1) % 7 è il giorno della settimana
+    week_start = cols.start - (cols.start - 1) % 7
+    weeks, revenue = _grouped_sum(week_start, cols.price)
+    return _to_dates(weeks), revenue
+
+
+def revenue_by_month(cols):
+    months = _to_dates(cols.start).astype('datetime64[M]')
+    unique, revenue = _grouped_sum(months.astype(np.int64), cols.price)
+    return unique.astype('datetime64[M]'), revenue
+
+
+def daily_occupancy(cols, first=None, last=None):
+    """Unità in uso per giorno tra first e last (compresi).
+
+    Conta tutti i noleggi, anche già restituiti, con un array delle differenze
+    e una somma cumulativa. Restituisce (giorni, {attrezzatura: valori}).
+    """
+    if cols.size == 0 and (first is None or last is None):
+        return _to_dates([]), {eq: np.zeros(0, dtype=np.int64) for eq in EQUIPMENT}
+    lo = date_ordinal(first) if first else int(cols.start.min())
+    hi = date_ordinal(last) if last else int(cols.end.max())
+    days = hi - lo + 1
+    mask = (cols.end >= lo) & (cols.start <= hi)
+    starts = np.clip(cols.start[mask], lo, hi) - lo
+    ends = np.clip(cols.end[mask], lo, hi) - lo + 1
+    series = {}
+    for i, eq in enumerate(EQUIPMENT):
+        counts = cols.equipment[mask, i]
+        diff = (np.bincount(starts, weights=counts, minlength=days + 1)
+                - np.bincount(ends, weights=counts, minlength=days + 1))
+        series[eq] = np.cumsum(diff[:days]).astype(np.int64)
+    return _to_dates(np.arange(lo, hi + 1)), series
+
+
+def utilization(series, stock):
+    """Percentuale delle scorte in uso per ogni giorno"""
+    return {eq: values * (100.0 / stock[eq]) if stock.get(eq) else np.zeros(len(values))
+            for eq, values in series.items()}
+
+
+def average_duration(cols):
+    """Durata media in giorni (inizio e restituzione compresi)"""
+    return float((cols.end - cols.start + 1).mean()) if cols.size else 0.0
+
+
+def deposit_ratio(cols):
+    return float(cols.deposit_paid.mean()) if cols.size else 0.0
+
+
+def operator_breakdown(cols):
+    """Per operatore (created_by): noleggi, ricavi, media, completati, depositi pagati"""
+    k = len(cols.operator_names)
+    count = np.bincount(cols.operator, minlength=k)
+    revenue = np.bincount(cols.operator, weights=cols.price, minlength=k)
+    completed = np.bincount(cols.operator, weights=cols.completed, minlength=k)
+    deposits = np.bincount(cols.operator, weights=cols.deposit_paid, minlength=k)
+    order = np.argsort(-revenue, kind='stable')
+    return {
+        'Operatore': [cols.operator_names[i] for i in order],
+        'Noleggi': count[order],
+        'Ricavi (€)': np.round(revenue[order], 2),
+        'Media (€)': np.round(np.divide(revenue, count, out=np.zeros(k), where=count > 0)[order], 2),
+        'Completati': completed[order].astype(np.int64),
+        'Depositi pagati': deposits[order].astype(np.int64),
+    }
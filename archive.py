@@ -0,0 +1,278 @@
+"""
+Script description: Archivio per stagione dei noleggi completati.
+
+I noleggi completati e restituiti da più di un certo numero di giorni escono
+dall'archivio di lavoro e finiscono in un segmento compresso per stagione
+(archive/season-AAAA.json.gz). Un segmento viene letto solo quando un filtro,
+un report o un'esportazione tocca il suo intervallo di date, e resta in cache
+finché il file non cambia.
+
+Libraries imported:
+-------------------
+- json: Module for JSON data handling.
+- gzip: Support for gzip files.
+- os: Module for operating system interface.
+- re: Regular expression operations.
+- tempfile: Module for creating temporary files (scritture atomiche).
+- threading: Thread synchronization primitives.
+- datetime: Module for date and time operations.
+- records: Prenotazioni compatte con le date come giorni ordinali.
+- storage: Scrittura atomica dei file JSON.
+- availability: Intervallo di date occupato da un noleggio.
+- search_index: Confronto del testo cercato con nome, telefono ed email.
+- aggregates: Totali per stagione dei noleggi archiviati.
+- metrics: Conteggio dei byte scritti.
+"""
+
+import json
+import gzip
+import os
+import re
+import tempfile
+import threading
+from datetime import date
+
+from records import Reservation, as_dict, date_ordinal
+from storage import atomic_write_json
+from availability import rental_span
+from search_index import matches
+from aggregates import RunningAggregates
+import metrics
+
+# Giorni dopo la restituzione oltre i quali un noleggio completato viene archiviato
+DEFAULT_AFTER_DAYS = 180
+
+_SEGMENT = re.compile(r'^season-(\d{4})\.json\.gz$')
+
+# Id più alto mai archiviato, per non doverlo ricavare leggendo tutte le stagioni
+_IDS_FILE = 'ids.json'
+
+# Totali per stagione, ciascuno con la firma del segmento da cui è calcolato
+_TOTALS_FILE = 'totals.json'
+
+
+def archive_after_days(config):
+    """Età di archiviazione dalla sezione "archive" di config.yaml"""
+    return int(((config or {}).get('archive') or {}).get('after_days', DEFAULT_AFTER_DAYS))
+
+
+def season_of(record):
+    """Stagione (anno) di un noleggio, dalla data di inizio"""
+    ordinal = record.date_ord if isinstance(record, Reservation) else date_ordinal(record.get('date'))
+    return date.fromordinal(ordinal).year if ordinal else None
+
+
+class SeasonArchive:
+    """Segmenti compressi per stagione, caricati al primo utilizzo"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._cache = {}
+        self._totals = {}
+        self._lock = threading.Lock()
+
+    def path(self, season):
+        return os.path.join(self.directory, f"season-{season}.json.gz")
+
+    def seasons(self):
+        """Stagioni archiviate, in ordine"""
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return sorted(int(m.group(1)) for m in map(_SEGMENT.match, names) if m)
+
+    def _signature(self, season):
+        try:
+            stat = os.stat(self.path(season))
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def load(self, season):
+        """Record archiviati di una stagione (tupla vuota se non ce ne sono)"""
+        path = self.path(season)
+        signature = self._signature(season)
+        if signature is None:
+            return ()
+        with self._lock:
+            cached = self._cache.get(season)
+            if cached is not None and cached[0] == signature:
+                return cached[1]
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                records = tuple(Reservation.from_dict(r) for r in json.load(f))
+            self._cache[season] = (signature, records)
+            return records
+
+    def _write(self, season, records):
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix='.tmp-', dir=self.directory)
+        try:
+            with os.fdopen(fd, 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb') as f:
+                f.write(json.dumps(records, ensure_ascii=False, default=str).encode('utf-8'))
+            metrics.add('bytes_written', os.path.getsize(tmp_path))
+            os.replace(tmp_path, self.path(season))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def max_id(self):
+        """Id più alto archiviato (0 se l'archivio è vuoto).
+
+        Viene letto dal file ids.json; negli archivi creati prima di quel file
+        si ricava una volta leggendo tutte le stagioni e poi si salva.
+        """
+        try:
+            with open(os.path.join(self.directory, _IDS_FILE), 'r', encoding='utf-8') as f:
+                return int(json.load(f)['max_id'])
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        seasons = self.seasons()
+        highest = max((r.get('id') for season in seasons for r in self.load(season)
+                       if isinstance(r.get('id'), int)), default=0)
+        if seasons:
+            self._write_max_id(highest)
+        return highest
+
+    def _write_max_id(self, highest):
+        os.makedirs(self.directory, exist_ok=True)
+        atomic_write_json(os.path.join(self.directory, _IDS_FILE), {'max_id': highest})
+
+    def add(self, records):
+        """Aggiunge i record ai segmenti della loro stagione, sostituendo per id"""
+        highest = self.max_id()
+        by_season = {}
+        for record in records:
+            by_season.setdefault(season_of(record), []).append(as_dict(record))
+        for season, new in by_season.items():
+            merged = {r['id']: r for r in map(as_dict, self.load(season))}
+            merged.update((r['id'], r) for r in new)
+            self._write(season, sorted(merged.values(), key=lambda r: (str(r.get('date')), r['id'])))
+            highest = max([highest] + [r['id'] for r in new if isinstance(r['id'], int)])
+        self._write_max_id(highest)
+
+    def season_totals(self):
+        """Totali (RunningAggregates) di ogni stagione archiviata.
+
+        Vengono letti da totals.json; una stagione assente dal file o il cui
+        segmento è cambiato dopo il calcolo viene riletta una volta sola.
+        """
+        signatures = {season: self._signature(season) for season in self.seasons()}
+        if any(self._totals.get(season, (None,))[0] != signature
+               for season, signature in signatures.items()):
+            path = os.path.join(self.directory, _TOTALS_FILE)
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    saved = json.load(f)
+            except (OSError, ValueError):
+                saved = {}
+            changed = False
+            for season, signature in signatures.items():
+                entry = saved.get(str(season))
+                if not isinstance(entry, dict) or entry.get('signature') != list(signature):
+                    totals = RunningAggregates()
+                    for record in self.load(season):
+                        totals.add(record)
+                    entry = saved[str(season)] = {'signature': list(signature),
+                                                  'totals': totals.to_dict()}
+                    changed = True
+                self._totals[season] = (signature, RunningAggregates.from_dict(entry['totals']))
+            if changed:
+                atomic_write_json(path, saved)
+        return {season: self._totals[season][1] for season in signatures}
+
+    def totals(self):
+        """Totali di tutte le stagioni archiviate insieme"""
+        return RunningAggregates.total_of(self.season_totals().values())
+
+    def records_between(self, first=None, last=None, status=None):
+        """Record con data di inizio tra first e last, leggendo solo le stagioni coinvolte"""
+        lo = date_ordinal(first) if first else 1
+        hi = date_ordinal(last) if last else date.max.toordinal()
+        for season in self.seasons():
+            if date(season, 1, 1).toordinal() > hi or date(season, 12, 31).toordinal() < lo:
+                continue
+            for record in self.load(season):
+                if lo <= record.date_ord <= hi and _status_matches(record, status):
+                    yield record
+
+    def records_overlapping(self, first=None, last=None, status=None):
+        """Record fuori in almeno un giorno tra first e last, per data decrescente.
+
+        Un noleggio sta nel segmento della stagione in cui inizia e non dura più
+        di un anno: oltre alle stagioni del periodo basta leggere la precedente.
+        """
+        lo = date_ordinal(first) if first else 1
+        hi = date_ordinal(last) if last else date.max.toordinal()
+        first_season = date.fromordinal(lo).year - 1
+        last_season = date.fromordinal(hi).year
+        for season in reversed(self.seasons()):
+            if not first_season <= season <= last_season:
+                continue
+            for record in reversed(self.load(season)):
+                span = rental_span(record)
+                if span is not None and span[0] <= hi and span[1] >= lo \
+                        and _status_matches(record, status):
+                    yield record
+
+    def select(self, filter_date=None, status=None, equipment=None, search=None,
+               date_from=None, date_to=None, match=None):
+        """Record archiviati che soddisfano i filtri della lista noleggi: giorno di
+        inizio filter_date oppure fuori nel periodo date_from-date_to.
+
+        Senza filtri per data si leggono tutte le stagioni, solo se c'è un filtro
+        match sul singolo record (es. lo storico di un cliente).
+        """
+        if date_from or date_to:
+            records = self.records_overlapping(date_from, date_to, status)
+        elif filter_date:
+            records = self.records_between(filter_date, filter_date, status)
+        elif match is not None:
+            records = self.records_overlapping(None, None, status)
+        else:
+            return []
+        return [r for r in records
+                if (equipment is None or (r.get(equipment) or 0) > 0)
+                and (not search or matches(r, search))
+                and (match is None or match(r))]
+
+    def iter_records(self, date_from=None, date_to=None, status=None):
+        """Dizionari JSON dei record archiviati, per l'esportazione"""
+        for record in self.records_between(date_from, date_to, status):
+            yield record.to_dict()
+
+
+def _status_matches(record, status):
+    if status == 'active':
+        return not record.get('completed', False)
+    if status == 'completed':
+        return bool(record.get('completed', False))
+    return True
+
+
+def archive_completed(store, archive, after_days=DEFAULT_AFTER_DAYS, today=None):
+    """Sposta nell'archivio i noleggi completati restituiti da più di after_days giorni.
+
+    I segmenti vengono scritti prima di togliere i record dall'archivio di
+    lavoro: un'interruzione lascia al massimo un doppione, che il successivo
+    passaggio sostituisce per id. La sequenza degli id viene portata oltre gli
+    id archiviati prima di cancellarli, perché non vengano riassegnati a
+    noleggi nuovi (che poi sostituirebbero quelli archiviati).
+    Restituisce il numero di noleggi archiviati.
+    """
+    cutoff = (today or date.today()).toordinal() - after_days
+    with store.writing():
+        old = []
+        for record in store.records():
+            span = rental_span(record)
+            if record.get('completed', False) and record.get('id') is not None \
+                    and span is not None and span[1] < cutoff:
+                old.append(record)
+        if not old:
+            return 0
+        store.reserve_ids(max(r['id'] for r in old))
+        archive.add(old)
+        store.delete_many([r['id'] for r in old])
+        store.compact()
+    return len(old)
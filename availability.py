@@ -0,0 +1,221 @@
+"""
+Script description: Disponibilità delle attrezzature sugli intervalli di date dei noleggi.
+
+Ogni noleggio attivo occupa le sue attrezzature dal giorno di inizio al giorno di
+restituzione compresi. Per ogni tipo di attrezzatura un segment tree sui giorni
+(aggiunta su intervallo, massimo su intervallo) risponde in tempo logaritmico a
+"quante unità sono libere il giorno D" o "nell'intervallo [a, b]". La timeline
+della stagione è calcolata in analytics.py.
+
+Libraries imported:
+-------------------
+- datetime: Module for date and time operations.
+- records: Prenotazioni compatte con le date come giorni ordinali.
+"""
+
+from datetime import date
+
+from records import Reservation
+
+EQUIPMENT = ['ombrellone', 'sdraio', 'lettino', 'regista']
+
+# Scorte predefinite, sovrascrivibili dalla sezione "inventory" di config.yaml
+DEFAULT_STOCK = {'ombrellone': 60, 'sdraio': 120, 'lettino': 80, 'regista': 40}
+
+# Campi di un noleggio che cambiano l'occupazione delle attrezzature
+OCCUPANCY_FIELDS = frozenset(['date', 'return_date', 'completed', *EQUIPMENT])
+
+# Giorni aggiunti ai margini quando il dominio del tree va ampliato
+DOMAIN_PADDING = 64
+
+
+class AvailabilityError(Exception):
+    """Attrezzatura insufficiente nel periodo del noleggio"""
+
+    def __init__(self, shortages):
+        self.shortages = shortages
+        details = ', '.join(f"{eq} richiesti {requested}, disponibili {free}"
+                            for eq, (requested, free) in shortages.items())
+        super().__init__(f"Attrezzatura non disponibile nel periodo ({details})")
+
+
+def to_ordinal(value):
+    """Giorno ordinale da date o stringa ISO, None se non valido"""
+    if isinstance(value, date):
+        return value.toordinal()
+    try:
+        return date.fromisoformat(str(value)[:10]).toordinal()
+    except ValueError:
+        return None
+
+
+def rental_span(record):
+    """Intervallo (inizio, fine) in giorni ordinali, fine compresa"""
+    if isinstance(record, Reservation):
+        start, end = record.date_ord or None, record.return_ord or None
+    else:
+        start, end = to_ordinal(record.get('date')), to_ordinal(record.get('return_date'))
+    if start is None:
+        return None
+    return start, max(start, end if end is not None else start)
+
+
+def load_stock(config):
+    """Scorte per attrezzatura dalla configurazione, con i valori predefiniti"""
+    stock = dict(DEFAULT_STOCK)
+    for eq, value in ((config or {}).get('inventory') or {}).items():
+        if eq in stock:
+            stock[eq] = int(value)
+    return stock
+
+
+class OccupancyTree:
+    """Segment tree su un intervallo di giorni: somma su intervallo e massimo"""
+
+    def __init__(self, start, size):
+        self.start = start
+        self.size = size
+        self.maxv = [0] * (2 * size)
+        self.lazy = [0] * (2 * size)
+
+    def covers(self, lo, hi):
+        return self.start <= lo and hi < self.start + self.size
+
+    def add(self, lo, hi, value):
+        self._add(1, 0, self.size - 1, lo - self.start, hi - self.start, value)
+
+    def _add(self, node, left, right, lo, hi, value):
+        if hi < left or right < lo:
+            return
+        if lo <= left and right <= hi:
+            self.maxv[node] += value
+            self.lazy[node] += value
+            return
+        mid = (left + right) // 2
+        self._add(2 * node, left, mid, lo, hi, value)
+        self._add(2 * node + 1, mid + 1, right, lo, hi, value)
+        self.maxv[node] = max(self.maxv[2 * node], self.maxv[2 * node + 1]) + self.lazy[node]
+
+    def max(self, lo, hi):
+        """Occupazione massima tra i giorni lo e hi compresi"""
+        lo = max(lo, self.start) - self.start
+        hi = min(hi, self.start + self.size - 1) - self.start
+        if lo > hi:
+            return 0
+        return self._max(1, 0, self.size - 1, lo, hi)
+
+    def _max(self, node, left, right, lo, hi):
+        if lo <= left and right <= hi:
+            return self.maxv[node]
+        mid = (left + right) // 2
+        best = None
+        if lo <= mid:
+            best = self._max(2 * node, left, mid, lo, hi)
+        if hi > mid:
+            other = self._max(2 * node + 1, mid + 1, right, lo, hi)
+            best = other if best is None else max(best, other)
+        return best + self.lazy[node]
+
+
+class AvailabilityEngine:
+    """Occupazione delle attrezzature da parte dei noleggi non ancora restituiti"""
+
+    def __init__(self):
+        self.spans = {}
+        self.trees = None
+
+    def _counts(self, record):
+        return {eq: int(record.get(eq) or 0) for eq in EQUIPMENT if (record.get(eq) or 0) > 0}
+
+    def add(self, key, record):
+        if record.get('completed', False):
+            # Attrezzatura restituita: non occupa più nulla
+            return
+        span = rental_span(record)
+        counts = self._counts(record)
+        if span is None or not counts:
+            return
+        self.spans[key] = (span, counts)
+        if self.trees is None or not self.trees[EQUIPMENT[0]].covers(*span):
+            self._rebuild()
+        else:
+            for eq, count in counts.items():
+                self.trees[eq].add(span[0], span[1], count)
+
+    def remove(self, key):
+        entry = self.spans.pop(key, None)
+        if entry is None:
+            return
+        (lo, hi), counts = entry
+        for eq, count in counts.items():
+            self.trees[eq].add(lo, hi, -count)
+
+    def replace(self, key, old, new):
+        if old is not None:
+            self.remove(key)
+        if new is not None:
+            self.add(key, new)
+
+    def _rebuild(self):
+        """Ricostruisce i tree su un dominio che copre tutti gli intervalli"""
+        lo = min(span[0] for span, _ in self.spans.values()) - DOMAIN_PADDING
+        hi = max(span[1] for span, _ in self.spans.values()) + DOMAIN_PADDING
+        size = 1
+        while size < hi - lo + 1:
+            size *= 2
+        self.trees = {eq: OccupancyTree(lo, size) for eq in EQUIPMENT}
+        for (start, end), counts in self.spans.values():
+            for eq, count in counts.items():
+                self.trees[eq].add(start, end, count)
+
+    def occupied(self, equipment, first, last=None):
+        """Unità impegnate al massimo tra first e last (date o ordinali)"""
+        if self.trees is None:
+            return 0
+        lo = first if isinstance(first, int) else to_ordinal(first)
+        hi = lo if last is None else (last if isinstance(last, int) else to_ordinal(last))
+        return self.trees[equipment].max(lo, hi)
+
+    def free(self, equipment, stock, first, last=None):
+        """Unità libere per tutto l'intervallo [first, last]"""
+        return stock.get(equipment, 0) - self.occupied(equipment, first, last)
+
+    def shortages(self, records, stock, ignore_keys=()):
+        """Attrezzature che mancherebbero se i noleggi records (nuovi o modificati)
+        prendessero il posto di quelli con chiave in ignore_keys: {eq: (richieste, libere)}.
+
+        I giorni vengono divisi in tratti in cui sia i noleggi ignorati sia quelli
+        nuovi restano costanti: in ogni tratto basta togliere e aggiungere le loro
+        unità al massimo del tree, senza modificarlo.
+        """
+        removed = [self.spans[key] for key in ignore_keys if key in self.spans]
+        added = []
+        for record in records:
+            span = rental_span(record)
+            counts = self._counts(record)
+            if span is not None and counts and not record.get('completed', False):
+                added.append((span, counts))
+        if not added:
+            return {}
+        lo = min(span[0] for span, _ in added)
+        hi = max(span[1] for span, _ in added)
+        cuts = {lo, hi + 1}
+        for (start, end), _ in removed + added:
+            cuts.update(day for day in (start, end + 1) if lo < day <= hi)
+        cuts = sorted(cuts)
+        result = {}
+        for eq in EQUIPMENT:
+            worst = None
+            for first, after in zip(cuts, cuts[1:]):
+                requested = sum(counts.get(eq, 0) for (start, end), counts in added
+                                if start <= first <= end)
+                if not requested:
+                    continue
+                released = sum(counts.get(eq, 0) for (start, end), counts in removed
+                               if start <= first <= end)
+                free = stock.get(eq, 0) - (self.occupied(eq, first, after - 1) - released)
+                if requested > free and (worst is None or requested - free > worst[0] - worst[1]):
+                    worst = (requested, free)
+            if worst is not None:
+                result[eq] = (worst[0], max(worst[1], 0))
+        return result
@@ -0,0 +1,125 @@
+"""
+Script description: Generatore di archivi di prenotazioni sintetici per i benchmark.
+
+Crea un reservations.json con lo schema dell'app: date distribuite sulle
+stagioni balneari (maggio-settembre) degli ultimi anni, durate brevi più
+frequenti di quelle lunghe, kit di attrezzature realistici, prezzi coerenti
+con kit e durata, noleggi passati quasi tutti completati e quelli in corso o
+futuri attivi. Con lo stesso seed e lo stesso giorno di riferimento (fisso, se
+non indicato) il file generato è sempre identico.
+
+Uso: python benchmarks/generate.py 10000 -o reservations.json [--seed 42] [--today 2025-08-15]
+     python benchmarks/generate.py 10000 --current-date
+
+Libraries imported:
+-------------------
+- argparse: Command-line parsing.
+- json: Module for JSON data handling.
+- random: Generate pseudo-random numbers.
+- datetime: Module for date and time operations.
+"""
+
+import argparse
+import json
+import random
+from datetime import date, datetime, timedelta
+
+FIRST_NAMES = ['Marco', 'Giulia', 'Luca', 'Francesca', 'Alessandro', 'Chiara', 'Matteo',
+               'Sara', 'Andrea', 'Elena', 'Davide', 'Martina', 'Simone', 'Valentina',
+               'Federico', 'Anna', 'Lorenzo', 'Giorgia', 'Riccardo', 'Silvia']
+LAST_NAMES = ['Rossi', 'Russo', 'Ferrari', 'Esposito', 'Bianchi', 'Romano', 'Colombo',
+              'Ricci', 'Marino', 'Greco', 'Bruno', 'Gallo', 'Conti', 'De Luca', 'Mancini',
+              'Costa', 'Giordano', 'Rizzo', 'Lombardi', 'Moretti']
+OPERATORS = ['Michele Land', 'John Smith', 'Rebecca Briggs', 'Yoa Mar']
+
+# Kit tipici (ombrellone, sdraio, lettino, regista) con il loro peso
+KITS = [
+    ((1, 2, 0, 0), 40),
+    ((1, 0, 2, 0), 20),
+    ((1, 1, 0, 0), 15),
+    ((2, 4, 0, 0), 8),
+    ((1, 0, 1, 1), 7),
+    ((0, 1, 0, 0), 5),
+    ((0, 0, 0, 2), 5),
+]
+# Prezzo giornaliero per unità, nello stesso ordine
+DAILY_PRICES = (8.0, 4.0, 6.0, 3.0)
+# Durate in giorni con il loro peso: soprattutto noleggi giornalieri o settimanali
+DURATIONS = [(1, 45), (2, 12), (3, 10), (5, 8), (7, 15), (14, 7), (30, 3)]
+# Giorno di riferimento predefinito: i dataset non cambiano da un giorno all'altro
+REFERENCE_DATE = date(2025, 8, 15)
+
+
+def _weighted(rng, choices):
+    values, weights = zip(*choices)
+    return rng.choices(values, weights=weights)[0]
+
+
+def generate(count, seed=42, today=None, seasons=3):
+    """Elenco di count prenotazioni sintetiche sulle ultime `seasons` stagioni"""
+    rng = random.Random(seed)
+    today = today or REFERENCE_DATE
+    first_season = today.year - seasons + 1
+    records = []
+    for rental_id in range(1, count + 1):
+        season = rng.randint(first_season, today.year)
+        start = date(season, 5, 1) + timedelta(days=rng.randint(0, 152))
+        duration = _weighted(rng, DURATIONS)
+        end = start + timedelta(days=duration - 1)
+        kit = _weighted(rng, KITS)
+        # Qualche cliente aggiunge un pezzo al kit standard
+        kit = tuple(n + (1 if n and rng.random() < 0.1 else 0) for n in kit)
+        price = round(sum(n * p for n, p in zip(kit, DAILY_PRICES)) * duration * rng.uniform(0.8, 1.0), 2)
+        if end < today:
+            completed = rng.random() < 0.97
+        else:
+            completed = start <= today and rng.random() < 0.1
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        created_at = datetime.combine(start - timedelta(days=rng.randint(0, 20)), datetime.min.time()) \
+            + timedelta(seconds=rng.randint(8 * 3600, 19 * 3600), microseconds=rng.randint(0, 999999))
+        records.append({
+            'id': rental_id,
+            'name': f"{first} {last}",
+            'phone': f"3{rng.randint(20, 99)}{rng.randint(1000000, 9999999)}",
+            'email': f"{first}.{last}{rng.randint(1, 99)}@esempio.it".lower().replace(' ', ''),
+            'date': start.isoformat(),
+            'return_date': end.isoformat(),
+            'ombrellone': kit[0],
+            'sdraio': kit[1],
+            'lettino': kit[2],
+            'regista': kit[3],
+            'price': price,
+            'deposit_paid': completed or rng.random() < 0.8,
+            'insurance': rng.random() < 0.3,
+            'notes': rng.choice(['', '', '', 'Fila 1', 'Vicino alla passerella', 'Cliente abituale']),
+            'completed': completed,
+            'created_at': created_at.isoformat(),
+            'created_by': rng.choice(OPERATORS),
+        })
+    return records
+
+
+def write_dataset(path, count, seed=42, today=None):
+    """Scrive il dataset con lo stesso formato di reservations.json"""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(generate(count, seed, today), f, ensure_ascii=False, indent=2)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Genera un reservations.json sintetico")
+    parser.add_argument('count', type=int, help="numero di prenotazioni")
+    parser.add_argument('-o', '--output', default='reservations.json')
+    parser.add_argument('--seed', type=int, default=42)
+    reference = parser.add_mutually_exclusive_group()
+    reference.add_argument('--today', type=date.fromisoformat, default=None,
+                           help=f"giorno di riferimento (predefinito: {REFERENCE_DATE})")
+    reference.add_argument('--current-date', action='store_true',
+                           help="usa la data di oggi come giorno di riferimento")
+    args = parser.parse_args(argv)
+    today = date.today() if args.current_date else args.today
+    write_dataset(args.output, args.count, args.seed, today)
+    print(f"{args.count} prenotazioni scritte in {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,317 @@
+"""
+Script description: Benchmark riproducibili dell'archivio prenotazioni e dell'app.
+
+Per ogni dimensione richiesta (predefinite 1k, 10k e 100k prenotazioni) genera
+un dataset sintetico in una cartella temporanea e misura: caricamento a
+freddo, salvataggio dopo un singolo "Restituito", ogni combinazione di filtri
+della lista noleggi, i filtri per periodo, totali della dashboard, statistiche,
+importazione ed esportazione, e i rerun completi delle pagine eseguiti senza browser con
+streamlit.testing. Il risultato è un JSON confrontabile tra versioni.
+
+Uso:
+    python benchmarks/run.py --sizes 1000 10000 -o risultati.json
+    python benchmarks/run.py --compare risultati_precedenti.json
+
+Libraries imported:
+-------------------
+- argparse: Command-line parsing.
+- json: Module for JSON data handling.
+- io: Core tools for working with streams.
+- os: Module for operating system interface.
+- sys: System-specific parameters and functions.
+- shutil: High-level file operations.
+- platform: Access to the underlying platform's identifying data.
+- statistics: Mathematical statistics functions.
+- subprocess: Subprocess management (commit corrente).
+- tempfile: Module for creating temporary files.
+- time: Module for time access and conversions.
+- itertools: Functions creating iterators for efficient looping.
+- datetime: Module for date and time operations.
+- yaml: Module implementing the data serialization used for human readable documents.
+"""
+
+import argparse
+import json
+import io
+import os
+import sys
+import shutil
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+from itertools import product
+from datetime import date, datetime, timedelta
+
+import yaml
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.generate import REFERENCE_DATE, write_dataset  # noqa: E402
+from datastore import open_store  # noqa: E402
+from importer import import_records  # noqa: E402
+from exporter import write_export  # noqa: E402
+from availability import DEFAULT_STOCK  # noqa: E402
+import analytics  # noqa: E402
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+# 'login' è la pagina di accesso, misurata senza sessione autenticata
+PAGES = ['login', 'home', 'rentals', 'stats', 'settings']
+
+
+def measure(fn, repeat, setup=None):
+    """Tempi di fn in millisecondi (setup, se c'è, non viene misurato)"""
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - started) * 1000)
+    return {
+        'min_ms': round(min(times), 3),
+        'median_ms': round(statistics.median(times), 3),
+        'max_ms': round(max(times), 3),
+        'repeat': repeat,
+    }
+
+
+def bench_data_layer(workdir, backend, repeat, today):
+    results = {}
+    aggregates_path = os.path.join(workdir, 'reservations.aggregates.json')
+
+    def forget_aggregates():
+        if os.path.exists(aggregates_path):
+            os.remove(aggregates_path)
+
+    results['cold_load'] = measure(lambda: open_store(workdir, backend), repeat, setup=forget_aggregates)
+    results['warm_load'] = measure(lambda: open_store(workdir, backend), repeat)
+    store = open_store(workdir, backend)
+    records = store.records()
+
+    # Salvataggio dopo un singolo "Restituito"
+    target = next(r for r in records if not r.get('completed'))['id']
+    state = {'completed': False}
+
+    def toggle():
+        state['completed'] = not state['completed']
+        store.update(target, {'completed': state['completed']})
+
+    results['toggle_save'] = measure(toggle, repeat)
+
+    # Ogni combinazione dei filtri della lista noleggi (prima pagina)
+    busy_day = max(store.index.by_date, key=lambda d: len(store.index.by_date[d]))
+    busy_day = date.fromordinal(busy_day)
+    for filter_date, status, equipment, search in product(
+            [None, busy_day], [None, 'active', 'completed'], [None, 'lettino'], [None, 'ros']):
+        name = 'filter[date={},status={},equipment={},search={}]'.format(
+            'day' if filter_date else '-', status or '-', equipment or '-', search or '-')
+        if backend == 'sqlite':
+            def run_filter():
+                filters = dict(filter_date=filter_date, status=status,
+                               search_name=search, equipment=equipment)
+                store.backend.count(**filters)
+                store.backend.query(**filters, limit=25, offset=0)
+        else:
+            def run_filter():
+                store.select(filter_date=filter_date, status=status, equipment=equipment,
+                             search=search, limit=25)
+        results[name] = measure(run_filter, repeat)
+
+    # Noleggi fuori in un giorno e in una settimana (sovrapposizione di periodi)
+    monday = busy_day - timedelta(days=busy_day.weekday())
+    for name, (date_from, date_to) in (('out_on_day', (busy_day, busy_day)),
+                                       ('period_week', (monday, monday + timedelta(days=6)))):
+        if backend == 'sqlite':
+            def run_period():
+                filters = dict(date_from=date_from, date_to=date_to,
+                               max_duration=store.index.max_duration())
+                store.backend.count(**filters)
+                store.backend.query(**filters, limit=25, offset=0)
+        else:
+            def run_period():
+                store.select(date_from=date_from, date_to=date_to, limit=25)
+        results[f'filter[{name}]'] = measure(run_period, repeat)
+
+    def dashboard():
+        aggregates = store.aggregates
+        return (aggregates.total, aggregates.active, aggregates.revenue,
+                store.today_count(today), store.latest(5))
+
+    results['dashboard_aggregates'] = measure(dashboard, repeat)
+
+    def stats():
+        columns = analytics.ReservationColumns(store.records())
+        analytics.revenue_by_day(columns)
+        analytics.revenue_by_week(columns)
+        analytics.revenue_by_month(columns)
+        _, occupancy = analytics.daily_occupancy(columns, date(today.year, 5, 1), date(today.year, 9, 30))
+        analytics.utilization(occupancy, DEFAULT_STOCK)
+        analytics.average_duration(columns)
+        analytics.deposit_ratio(columns)
+        analytics.operator_breakdown(columns)
+
+    results['stats'] = measure(stats, repeat)
+
+    for fmt in ('json', 'csv'):
+        results[f'export_{fmt}'] = measure(
+            lambda: write_export(store.iter_records(), fmt, io.BytesIO()), repeat)
+
+    jsonl = io.BytesIO()
+    write_export(store.iter_records(), 'jsonl', jsonl)
+    payload = jsonl.getvalue()
+    import_dir = os.path.join(workdir, 'import')
+
+    def fresh_import_dir():
+        shutil.rmtree(import_dir, ignore_errors=True)
+        os.makedirs(import_dir)
+        with open(os.path.join(import_dir, 'reservations.json'), 'w', encoding='utf-8') as f:
+            f.write('[]')
+
+    results['import_replace'] = measure(
+        lambda: import_records(open_store(import_dir, backend), io.BytesIO(payload), mode='replace'),
+        repeat, setup=fresh_import_dir)
+    return results
+
+
+def bench_app(workdir, backend, repeat, pages):
+    """Rerun completi delle pagine con streamlit.testing (sessione già autenticata, tranne login)"""
+    import streamlit as st
+    from streamlit.testing.v1 import AppTest
+
+    for name in os.listdir(ROOT):
+        if name.endswith('.py') or name == 'config.yaml':
+            shutil.copy(os.path.join(ROOT, name), workdir)
+    shutil.copytree(os.path.join(ROOT, 'views'), os.path.join(workdir, 'views'), dirs_exist_ok=True)
+    # Nessuna archiviazione automatica: si misura l'intero dataset
+    config_path = os.path.join(workdir, 'config.yaml')
+    with open(config_path, encoding='utf-8') as f:
+        config = yaml.safe_load(f)
+    config['archive'] = {'after_days': 100000}
+    with open(config_path, 'w', encoding='utf-8') as f:
+        yaml.dump(config, f, default_flow_style=False, allow_unicode=True)
+
+    results = {}
+    previous_dir = os.getcwd()
+    previous_backend = os.environ.get('CORMORANO_STORAGE')
+    os.chdir(workdir)
+    os.environ['CORMORANO_STORAGE'] = backend
+    try:
+        # Le risorse in cache appartengono al dataset precedente
+        st.cache_resource.clear()
+        st.cache_data.clear()
+        for page in pages:
+            app = AppTest.from_file(os.path.join(workdir, 'app.py'), default_timeout=600)
+            if page != 'login':
+                app.session_state['authentication_status'] = True
+                app.session_state['name'] = 'Michele Land'
+                app.session_state['username'] = 'admin'
+                app.session_state['roles'] = ['admin']
+                app.session_state['current_page'] = page
+            results[f'rerun_first[{page}]'] = measure(app.run, 1)
+            if app.exception:
+                raise RuntimeError(f"Pagina {page}: {app.exception[0].value}")
+            results[f'rerun[{page}]'] = measure(app.run, repeat)
+    finally:
+        os.chdir(previous_dir)
+        if previous_backend is None:
+            os.environ.pop('CORMORANO_STORAGE', None)
+        else:
+            os.environ['CORMORANO_STORAGE'] = previous_backend
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', '-C', ROOT, 'rev-parse', '--short', 'HEAD'],
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(sizes, backend='json', repeat=5, seed=42, today=None, app=True, pages=PAGES):
+    today = today or REFERENCE_DATE
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'backend': backend,
+            'repeat': repeat,
+            'seed': seed,
+            'today': today.isoformat(),
+        },
+        'results': [],
+    }
+    for size in sizes:
+        workdir = tempfile.mkdtemp(prefix=f'cormorano-bench-{size}-')
+        try:
+            write_dataset(os.path.join(workdir, 'reservations.json'), size, seed, today)
+            timings = bench_data_layer(workdir, backend, repeat, today)
+            if app:
+                timings.update(bench_app(workdir, backend, repeat, pages))
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+        for name, timing in timings.items():
+            report['results'].append({'size': size, 'benchmark': name, **timing})
+            print(f"{size:>7} {name:<66} {timing['median_ms']:>10.2f} ms", file=sys.stderr)
+    return report
+
+
+def compare(report, baseline, threshold):
+    """Stampa il rapporto tra le mediane; restituisce i benchmark peggiorati oltre threshold"""
+    previous = {(r['size'], r['benchmark']): r['median_ms'] for r in baseline['results']}
+    regressions = []
+    for result in report['results']:
+        key = (result['size'], result['benchmark'])
+        if key not in previous or not previous[key]:
+            continue
+        ratio = result['median_ms'] / previous[key]
+        marker = ' <-- peggiorato' if ratio > threshold else ''
+        print(f"{key[0]:>7} {key[1]:<66} {previous[key]:>10.2f} -> {result['median_ms']:>10.2f} ms "
+              f"(x{ratio:.2f}){marker}", file=sys.stderr)
+        if ratio > threshold:
+            regressions.append(key)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark dell'archivio prenotazioni")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--backend', choices=['json', 'sqlite'], default='json')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    reference = parser.add_mutually_exclusive_group()
+    reference.add_argument('--today', type=date.fromisoformat, default=None,
+                           help=f"giorno di riferimento del dataset (predefinito: {REFERENCE_DATE})")
+    reference.add_argument('--current-date', action='store_true',
+                           help="usa la data di oggi come giorno di riferimento")
+    parser.add_argument('--no-app', action='store_true', help="salta i rerun delle pagine")
+    parser.add_argument('--pages', nargs='+', default=PAGES, choices=PAGES)
+    parser.add_argument('-o', '--output', help="file JSON dei risultati (predefinito: stdout)")
+    parser.add_argument('--compare', help="risultati precedenti da confrontare")
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help="rapporto oltre il quale un benchmark è peggiorato")
+    args = parser.parse_args(argv)
+
+    today = date.today() if args.current_date else args.today
+    report = run_suite(args.sizes, args.backend, args.repeat, args.seed, today,
+                       app=not args.no_app, pages=args.pages)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
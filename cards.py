@@ -0,0 +1,125 @@
+"""
+Script description: HTML delle card dei noleggi, generato una volta per versione.
+
+Il frammento HTML di ogni card viene costruito al primo utilizzo e tenuto in
+cache per id e versione del noleggio: i campi inseriti dagli operatori (nome,
+telefono, email, note, autore) vengono sottoposti a escape una sola volta, qui.
+Le card in sola lettura consecutive vengono poi unite e inviate al browser con
+un unico elemento.
+
+Libraries imported:
+-------------------
+- html: HTML escaping.
+- threading: Thread synchronization primitives.
+- collections: Container datatypes (cache LRU).
+- records: Prenotazioni compatte tipizzate.
+"""
+
+import html
+import threading
+from collections import OrderedDict
+
+from records import Reservation
+
+# Frammenti tenuti in cache (i meno usati di recente escono per primi)
+CACHE_SIZE = 5000
+
+RECENT_BADGES = [('ombrellone', '☂️'), ('sdraio', '🪑'), ('lettino', '🛏️'), ('regista', '🎬')]
+RENTAL_BADGES = [('ombrellone', '☂️', 'Ombrelloni'), ('sdraio', '🪑', 'Sdraio'),
+                 ('lettino', '🛏️', 'Lettini'), ('regista', '🎬', 'Regista')]
+
+
+def _text(value):
+    return html.escape(str(value), quote=True)
+
+
+def _count(rental, field):
+    try:
+        return int(rental.get(field, 0) or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def recent_card(rental):
+    """Card compatta della dashboard (noleggi recenti)"""
+    completed = rental.get('completed', False)
+    status_class = "completed-rental" if completed else "rental-card"
+    status_icon = "✅" if completed else "⏳"
+    equipment_badges = ''.join(
+        f'<span class="equipment-badge">{emoji} {_count(rental, field)}</span>'
+        for field, emoji in RECENT_BADGES if _count(rental, field) > 0)
+    return f"""
+<div class="{status_class}">
+    <h4>{status_icon} {_text(rental['name'])}</h4>
+    <p><strong>📅 Data:</strong> {_text(rental['date'])}</p>
+    <p><strong>🏖️ Kit:</strong> {equipment_badges}</p>
+    <small>👤 Creato da: {_text(rental.get('created_by', 'N/A'))}</small>
+</div>
+"""
+
+
+def rental_card(rental, archived=False):
+    """Card completa della lista noleggi"""
+    completed = rental.get('completed', False)
+    status_class = "completed-rental" if completed else "rental-card"
+    status_icon = "✅ COMPLETATO" if completed else "⏳ ATTIVO"
+    if archived:
+        status_icon += " · 📦 ARCHIVIATO"
+    equipment_badges = ' '.join(
+        f'<span class="equipment-badge">{emoji} {_count(rental, field)} {label}</span>'
+        for field, emoji, label in RENTAL_BADGES if _count(rental, field) > 0)
+    payment_status = "💳 Deposito Pagato" if rental.get('deposit_paid') else "💳 Deposito NON Pagato"
+    insurance_status = "🛡️ Assicurato" if rental.get('insurance') else ""
+    notes = rental.get('notes')
+    # Nessuna riga vuota dentro la card: chiuderebbe il blocco HTML del markdown
+    notes_html = f"\n    <p><strong>📝 Note:</strong> {_text(notes)}</p>" if notes else ""
+    return f"""
+<div class="{status_class}">
+    <div style="display: flex; justify-content: space-between; align-items: center;">
+        <h3>👤 {_text(rental['name'])}</h3>
+        <span><strong>{status_icon}</strong></span>
+    </div>
+    <p><strong>📅 Dal:</strong> {_text(rental['date'])} <strong>Al:</strong> {_text(rental.get('return_date', 'N/A'))}</p>
+    <p><strong>📞:</strong> {_text(rental.get('phone', 'N/A'))} <strong>📧:</strong> {_text(rental.get('email', 'N/A'))}</p>
+    <p><strong>🏖️ Kit Mare:</strong></p>
+    <div>{equipment_badges}</div>
+    <p><strong>💰 Prezzo:</strong> €{_text(rental.get('price', 0))} - {payment_status} {insurance_status}</p>{notes_html}
+</div>
+"""
+
+
+class CardCache:
+    """Frammenti HTML per (tipo di card, id, versione), condivisi tra le sessioni"""
+
+    def __init__(self, size=CACHE_SIZE):
+        self.size = size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, kind, rental, render, *args):
+        """HTML della card; render(rental, *args) viene chiamata solo se manca"""
+        key = (kind, rental.get('id'), rental.get('version', 0) or 0, args)
+        with self._lock:
+            entry = self._entries.get(key)
+            # Stesso record (i Reservation sono immutabili) o stesso contenuto
+            # (i dizionari letti da SQLite sono nuovi a ogni interrogazione)
+            if entry is not None and (entry[0] is rental or (
+                    not isinstance(rental, Reservation) and entry[0] == rental)):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+        fragment = render(rental, *args)
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = (rental, fragment)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+        return fragment
+
+
+def batch(fragments):
+    """Un solo blocco HTML per più card consecutive"""
+    return ''.join(fragments)
@@ -0,0 +1,295 @@
+"""
+Script description: Riga di comando per importazioni massive e manutenzione dell'archivio.
+
+Usa lo stesso archivio condiviso dell'app (stessi file, stesso lock su file e
+stessa sequenza degli id), quindi si può eseguire mentre l'app è in uso: ogni
+scrittura prende il lock per il tempo di un lotto e le sessioni aperte vedono
+le modifiche al loro prossimo aggiornamento.
+
+Uso:
+    python cli.py ingest prenotazioni_agenzia.csv
+    python cli.py ingest backup.jsonl.gz --batch-size 2000
+    python cli.py check
+    python cli.py dedupe --dry-run
+    python cli.py reindex
+    python cli.py compact
+    python cli.py archive --after-days 120
+
+Libraries imported:
+-------------------
+- argparse: Command-line parsing.
+- gzip: Support for gzip files.
+- os: Module for operating system interface.
+- re: Regular expression operations.
+- sys: System-specific parameters and functions.
+- time: Module for time access and conversions.
+- collections: Container datatypes.
+- storage: Journal append-only delle prenotazioni.
+- sqlite_store: Backend SQLite opzionale.
+- shared_store: Versione dei record.
+- datastore: File dei dati e archivio prenotazioni condiviso con l'app.
+- aggregates: Totali di dashboard e statistiche.
+- importer: Importazione in streaming e validata.
+- archive: Archivio compresso per stagione dei noleggi completati.
+- config_store: Lettura di config.yaml.
+"""
+
+import argparse
+import gzip
+import os
+import re
+import sys
+import time
+from collections import Counter
+
+from storage import JournalStore
+from sqlite_store import SqliteStore
+from shared_store import record_version
+from datastore import BACKENDS, CONFIG_FILE, open_archive, open_store
+from aggregates import RunningAggregates
+from importer import BATCH_SIZE, FORMATS, import_records, iter_json_records, validate_record
+from archive import archive_after_days, archive_completed
+from config_store import ConfigStore
+
+# Scarti stampati per esteso da ingest e check
+MAX_SHOWN = 20
+
+
+def detect_format(filename):
+    """Formato dall'estensione del file (anche compresso con gzip)"""
+    name = filename.lower()
+    if name.endswith('.gz'):
+        name = name[:-3]
+    extension = os.path.splitext(name)[1].lstrip('.')
+    return extension if extension in FORMATS else 'json'
+
+
+def _show_rejected(report):
+    for position, reason in report['rejected'][:MAX_SHOWN]:
+        print(f"  record {position}: {reason}", file=sys.stderr)
+    hidden = report['rejected_count'] - min(len(report['rejected']), MAX_SHOWN)
+    if hidden > 0:
+        print(f"  ... e altri {hidden}", file=sys.stderr)
+
+
+def cmd_ingest(store, args):
+    """Importa un file JSON, JSON Lines o CSV, con un salvataggio per lotto"""
+    fmt = args.format or detect_format(args.file)
+    opener = gzip.open if args.file.lower().endswith('.gz') else open
+    started = time.perf_counter()
+
+    def progress(bytes_read, imported):
+        elapsed = time.perf_counter() - started
+        print(f"\r{imported} importati ({imported / elapsed if elapsed else 0:.0f}/s)",
+              end='', file=sys.stderr)
+
+    with opener(args.file, 'rb') as f:
+        report = import_records(store, f, mode='replace' if args.replace else 'merge',
+                                batch_size=args.batch_size, progress=progress, fmt=fmt,
+                                archive=open_archive(args.data_dir))
+    elapsed = time.perf_counter() - started
+    print(file=sys.stderr)
+    print(f"{report['imported']} noleggi importati in {elapsed:.1f} s, "
+          f"{report['rejected_count']} scartati")
+    _show_rejected(report)
+    return 0 if report['imported'] or not report['rejected_count'] else 1
+
+
+def _snapshot_duplicates(store):
+    """Id ripetuti nello snapshot JSON (il caricamento terrebbe solo l'ultimo)"""
+    if not isinstance(store.backend, JournalStore):
+        return []
+    try:
+        with open(store.backend.snapshot_path, 'rb') as f:
+            ids = Counter(r.get('id') for r, _ in iter_json_records(f) if isinstance(r, dict))
+    except FileNotFoundError:
+        return []
+    return sorted(i for i, n in ids.items() if n > 1 and i is not None)
+
+
+def duplicate_key(record):
+    """Chiave di un noleggio inserito due volte: cliente, date e kit"""
+    return (
+        ' '.join(str(record.get('name', '')).lower().split()),
+        re.sub(r'\D', '', str(record.get('phone', ''))),
+        str(record.get('date')), str(record.get('return_date')),
+        tuple(record.get(eq) or 0 for eq in ('ombrellone', 'sdraio', 'lettino', 'regista')),
+    )
+
+
+def duplicate_groups(records):
+    """Gruppi di noleggi doppi, ciascuno ordinato per id (il primo si tiene)"""
+    groups = {}
+    for record in records:
+        if record.get('id') is not None:
+            groups.setdefault(duplicate_key(record), []).append(record)
+    return [sorted(group, key=lambda r: r['id']) for group in groups.values() if len(group) > 1]
+
+
+def cmd_check(store, args):
+    """Controlla schema, id, sequenza, totali e archivio; esce con 1 se trova errori"""
+    records = store.records()
+    errors = []
+    warnings = []
+
+    invalid = []
+    for record in records:
+        try:
+            validate_record(record.to_dict())
+        except ValueError as e:
+            invalid.append(f"noleggio {record.get('id')}: {e}")
+    if invalid:
+        errors.append(f"{len(invalid)} noleggi non validi")
+        errors.extend(f"  {line}" for line in invalid[:MAX_SHOWN])
+
+    missing_id = sum(1 for r in records if r.get('id') is None)
+    if missing_id:
+        errors.append(f"{missing_id} noleggi senza id")
+    repeated = _snapshot_duplicates(store)
+    if repeated:
+        errors.append(f"id ripetuti nello snapshot: {', '.join(map(str, repeated[:MAX_SHOWN]))}")
+
+    highest = max((r['id'] for r in records if isinstance(r.get('id'), int)), default=0)
+    highest = max(highest, open_archive(args.data_dir).max_id())
+    if store.sequence is not None and store.sequence.current() < highest:
+        # Gli id eliminati o archiviati potrebbero essere riassegnati
+        warnings.append(f"sequenza degli id ferma a {store.sequence.current()}, id massimo {highest} "
+                        f"(eseguire reindex)")
+
+    expected = RunningAggregates()
+    for record in records:
+        expected.add(record)
+    if expected.to_dict() != store.aggregates.to_dict():
+        errors.append("totali salvati diversi da quelli ricalcolati (eseguire reindex)")
+
+    archive = open_archive(args.data_dir)
+    live_ids = {r.get('id') for r in records}
+    both = sorted(r['id'] for season in archive.seasons() for r in archive.load(season)
+                  if r['id'] in live_ids)
+    if both:
+        warnings.append(f"{len(both)} noleggi sia nell'archivio di lavoro sia in quello "
+                        f"stagionale (verranno sostituiti alla prossima archiviazione)")
+
+    duplicates = duplicate_groups(records)
+    if duplicates:
+        warnings.append(f"{sum(len(g) - 1 for g in duplicates)} possibili doppioni "
+                        f"(vedere dedupe --dry-run)")
+
+    print(f"{len(records)} noleggi controllati")
+    for line in warnings:
+        print(f"ATTENZIONE: {line}")
+    for line in errors:
+        print(line if line.startswith('  ') else f"ERRORE: {line}")
+    if not errors and not warnings:
+        print("Nessun problema trovato")
+    return 1 if errors else 0
+
+
+def cmd_dedupe(store, args):
+    """Elimina i noleggi doppi tenendo quello con l'id più basso"""
+    with store.writing():
+        groups = duplicate_groups(store.records())
+        extra = [record for group in groups for record in group[1:]]
+        for group in groups[:MAX_SHOWN]:
+            ids = ', '.join(str(r['id']) for r in group[1:])
+            print(f"{group[0]['name']} {group[0]['date']}: tengo {group[0]['id']}, doppioni {ids}")
+        if len(groups) > MAX_SHOWN:
+            print(f"... e altri {len(groups) - MAX_SHOWN} gruppi")
+        if args.dry_run or not extra:
+            print(f"{len(extra)} doppioni trovati" + (" (nessuna modifica)" if args.dry_run else ""))
+            return 0
+        removed = store.delete_many([r['id'] for r in extra],
+                                    {r['id']: record_version(r) for r in extra})
+    print(f"{removed} doppioni eliminati")
+    return 0
+
+
+def cmd_reindex(store, args):
+    """Ricalcola totali salvati, sequenza degli id e indici del database"""
+    with store.writing():
+        if os.path.exists(store.aggregates_path):
+            os.remove(store.aggregates_path)
+        if isinstance(store.backend, SqliteStore):
+            store.backend.reindex()
+        # Ricarica completa: indici in memoria e totali ricostruiti da zero
+        store.reload()
+        highest = max((k for k in (r.get('id') for r in store.records()) if isinstance(k, int)),
+                      default=0)
+        highest = max(highest, open_archive(args.data_dir).max_id())
+        if store.sequence is not None:
+            store.sequence.advance(highest)
+    print(f"Indici e totali ricostruiti su {len(store.records())} noleggi")
+    return 0
+
+
+def _data_size(store):
+    backend = store.backend
+    if isinstance(backend, SqliteStore):
+        paths = [backend.db_path]
+    else:
+        paths = [backend.snapshot_path, backend.journal_path]
+    return sum(os.path.getsize(p) for p in paths if os.path.exists(p))
+
+
+def cmd_compact(store, args):
+    """Ripiega il journal nello snapshot (JSON) o libera lo spazio del database (SQLite)"""
+    before = _data_size(store)
+    store.compact()
+    print(f"Compattazione completata: {before / 1024:.0f} KB -> {_data_size(store) / 1024:.0f} KB")
+    return 0
+
+
+def cmd_archive(store, args):
+    """Sposta nell'archivio per stagione i completati restituiti da tempo"""
+    after_days = args.after_days
+    if after_days is None:
+        try:
+            config = ConfigStore(os.path.join(args.data_dir, CONFIG_FILE)).get()
+        except FileNotFoundError:
+            config = None
+        after_days = archive_after_days(config)
+    archive = open_archive(args.data_dir)
+    moved = archive_completed(store, archive, after_days)
+    print(f"{moved} noleggi archiviati (completati da più di {after_days} giorni)")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manutenzione dell'archivio prenotazioni del Cormorano")
+    parser.add_argument('--data-dir', default='.', help="cartella dei dati dell'app (predefinita: corrente)")
+    parser.add_argument('--storage', choices=BACKENDS,
+                        default=os.environ.get('CORMORANO_STORAGE', 'json'),
+                        help="backend di salvataggio (predefinito: CORMORANO_STORAGE o json)")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    ingest = commands.add_parser('ingest', help="importa noleggi da JSON, JSON Lines o CSV")
+    ingest.add_argument('file', help="file da importare (anche .gz)")
+    ingest.add_argument('--format', choices=FORMATS, help="formato (predefinito: dall'estensione)")
+    ingest.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                        help="noleggi salvati per ogni scrittura")
+    ingest.add_argument('--replace', action='store_true',
+                        help="sostituisce l'intero archivio invece di aggiungere/aggiornare per id")
+    ingest.set_defaults(handler=cmd_ingest)
+
+    commands.add_parser('check', help="controlla l'integrità dei dati").set_defaults(handler=cmd_check)
+
+    dedupe = commands.add_parser('dedupe', help="elimina i noleggi inseriti due volte")
+    dedupe.add_argument('--dry-run', action='store_true', help="mostra i doppioni senza eliminarli")
+    dedupe.set_defaults(handler=cmd_dedupe)
+
+    commands.add_parser('reindex', help="ricostruisce totali, sequenza e indici").set_defaults(
+        handler=cmd_reindex)
+    commands.add_parser('compact', help="compatta journal o database").set_defaults(handler=cmd_compact)
+
+    archive = commands.add_parser('archive', help="archivia per stagione i noleggi completati")
+    archive.add_argument('--after-days', type=int, default=None,
+                         help="giorni dalla restituzione (predefinito: da config.yaml)")
+    archive.set_defaults(handler=cmd_archive)
+
+    args = parser.parse_args(argv)
+    store = open_store(args.data_dir, args.storage)
+    return args.handler(store, args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
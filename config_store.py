@@ -0,0 +1,122 @@
+"""
+Script description: Gestione del file config.yaml con salvataggi solo quando serve.
+
+La configurazione viene letta una volta e tenuta in memoria finché il file non
+cambia su disco. Viene riscritta solo dopo una modifica (registrazione utente,
+cambio password), in modo atomico e sotto lock, così più processi possono
+condividere lo stesso file: sotto il lock il file viene riletto e le modifiche
+di questo processo vengono unite a quelle scritte dagli altri nel frattempo.
+
+Libraries imported:
+-------------------
+- yaml: Module implementing the data serialization used for human readable documents.
+- os: Module for operating system interface.
+- copy: Deep copies (configurazione letta, base dell'unione).
+- tempfile: Module for creating temporary files (scritture atomiche).
+- threading: Thread synchronization primitives.
+- file_lock: Lock su file condiviso tra processi.
+- metrics: Conteggio dei byte scritti.
+"""
+
+import yaml
+import os
+import copy
+import tempfile
+import threading
+from yaml.loader import SafeLoader
+
+from file_lock import FileLock
+import metrics
+
+# Chiave assente in uno dei lati dell'unione
+_MISSING = object()
+
+
+def merge_changes(base, ours, theirs):
+    """Applica a theirs le modifiche fatte da ours rispetto a base.
+
+    I dizionari vengono uniti chiave per chiave: quello che questo processo
+    non ha toccato resta come l'hanno scritto gli altri; se entrambi hanno
+    cambiato lo stesso valore vince questo processo.
+    """
+    if ours is _MISSING:
+        return _MISSING if theirs == base else theirs
+    if isinstance(ours, dict) and isinstance(theirs, dict):
+        base = base if isinstance(base, dict) else {}
+        result = dict(theirs)
+        for key in set(ours) | set(base):
+            mine = ours.get(key, _MISSING)
+            if mine == base.get(key, _MISSING):
+                continue
+            merged = merge_changes(base.get(key, _MISSING), mine, theirs.get(key, _MISSING))
+            if merged is _MISSING:
+                result.pop(key, None)
+            else:
+                result[key] = merged
+        return result
+    return ours if ours != base else theirs
+
+
+class ConfigStore:
+    """Configurazione YAML in cache con tracciamento delle modifiche"""
+
+    def __init__(self, path):
+        self.path = path
+        self.dirty = False
+        self._lock = threading.RLock()
+        self._config = None
+        # Configurazione come letta dal file: base per unire le modifiche altrui
+        self._base = None
+        self._mtime = None
+
+    def _file_mtime(self):
+        return os.stat(self.path).st_mtime_ns
+
+    def get(self):
+        """Configurazione corrente; la rilegge solo se il file è cambiato"""
+        with self._lock:
+            mtime = self._file_mtime()
+            if self._config is None or (mtime != self._mtime and not self.dirty):
+                self._config = self._read()
+                self._base = copy.deepcopy(self._config)
+                self._mtime = mtime
+            return self._config
+
+    def _read(self):
+        with open(self.path, 'r', encoding='utf-8') as file:
+            return yaml.load(file, Loader=SafeLoader)
+
+    def mark_dirty(self):
+        self.dirty = True
+
+    def save(self):
+        """Scrive il file solo se ci sono modifiche; restituisce True se ha scritto.
+
+        Il file viene riletto sotto il lock: se un altro processo l'ha cambiato
+        (ad esempio registrando un altro utente) le sue modifiche restano.
+        """
+        with self._lock:
+            if not self.dirty or self._config is None:
+                return False
+            directory = os.path.dirname(os.path.abspath(self.path))
+            with FileLock(self.path):
+                merged = merge_changes(self._base, self._config, self._read())
+                # Stesso dizionario di prima: chi lo usa vede l'unione
+                self._config.clear()
+                self._config.update(merged)
+                fd, tmp_path = tempfile.mkstemp(prefix='.tmp-', dir=directory)
+                try:
+                    with os.fdopen(fd, 'w', encoding='utf-8') as file:
+                        yaml.dump(self._config, file, default_flow_style=False, allow_unicode=True)
+                        file.flush()
+                        os.fsync(file.fileno())
+                        metrics.add('bytes_written', os.fstat(file.fileno()).st_size)
+                    os.replace(tmp_path, self.path)
+                except BaseException:
+                    if os.path.exists(tmp_path):
+                        os.remove(tmp_path)
+                    raise
+                self._mtime = self._file_mtime()
+            self._base = copy.deepcopy(self._config)
+            self.dirty = False
+            return True
@@ -0,0 +1,207 @@
+"""
+Script description: Anagrafica clienti ricavata dalle prenotazioni.
+
+I noleggi con lo stesso telefono o la stessa email (normalizzati) appartengono
+allo stesso cliente. L'anagrafica tiene due dizionari telefono -> cliente ed
+email -> cliente, aggiornati a ogni inserimento, modifica e cancellazione come
+gli altri indici dell'archivio: trovare un cliente e i suoi noleggi non
+richiede di scandire le prenotazioni. La ricerca per nome riusa l'indice a
+n-grammi dei noleggi e ne raggruppa i risultati per cliente.
+
+Libraries imported:
+-------------------
+- heapq: Heap queue algorithm (clienti più assidui).
+- itertools: Functions creating iterators for efficient looping.
+- collections: Container datatypes.
+- search_index: Cifre dei numeri di telefono.
+- records: Prenotazioni compatte tipizzate.
+"""
+
+import heapq
+from itertools import count
+from collections import Counter
+
+from search_index import digits
+from records import Reservation
+
+# Clienti proposti al massimo per una ricerca
+SUGGESTIONS = 8
+
+
+def phone_key(phone):
+    """Telefono normalizzato: solo cifre, senza prefisso internazionale italiano"""
+    number = digits(phone)
+    if number.startswith('00'):
+        number = number[2:]
+    if number.startswith('39') and len(number) > 10:
+        number = number[2:]
+    return number if len(number) >= 6 else ''
+
+
+def email_key(email):
+    """Email normalizzata: senza spazi ai lati e in minuscolo"""
+    email = str(email or '').strip().casefold()
+    return email if '@' in email else ''
+
+
+def _identity(record):
+    """Dati del noleggio che contano per l'anagrafica: (creazione, nome, telefono, email)"""
+    if isinstance(record, Reservation):
+        return (record.created_us, record.name, record.phone, record.email)
+    created = record.get('created_at')
+    created_us = Reservation.from_dict({'created_at': created}).created_us if created else 0
+    return (created_us, record.get('name', ''), record.get('phone', ''), record.get('email', ''))
+
+
+class Customer:
+    """Un cliente: i suoi noleggi e i recapiti con cui compaiono"""
+
+    __slots__ = ('id', 'rentals', 'phones', 'emails')
+
+    def __init__(self, customer_id):
+        self.id = customer_id
+        # chiave noleggio -> (creazione in microsecondi, nome, telefono, email)
+        self.rentals = {}
+        self.phones = Counter()
+        self.emails = Counter()
+
+    @property
+    def latest(self):
+        """Dati del noleggio creato più di recente (nome e recapiti attuali)"""
+        return max(self.rentals.values())
+
+    @property
+    def name(self):
+        return self.latest[1]
+
+    @property
+    def phone(self):
+        return self.latest[2]
+
+    @property
+    def email(self):
+        return self.latest[3]
+
+    @property
+    def token(self):
+        """Riferimento stabile tra i rerun: il recapito principale normalizzato"""
+        phone = phone_key(self.phone)
+        if phone:
+            return f"tel:{phone}"
+        email = email_key(self.email)
+        if email:
+            return f"email:{email}"
+        return f"tel:{next(iter(self.phones))}" if self.phones else f"email:{next(iter(self.emails))}"
+
+    def summary(self):
+        """Dati del cliente per la pagina, staccati dall'indice"""
+        _, name, phone, email = self.latest
+        contact = ' · '.join(c for c in (phone, email) if c)
+        rentals = "1 noleggio" if len(self.rentals) == 1 else f"{len(self.rentals)} noleggi"
+        return {'token': self.token, 'name': name, 'phone': phone, 'email': email,
+                'rentals': len(self.rentals),
+                'phones': sorted(self.phones), 'emails': sorted(self.emails),
+                'label': f"{name} · {contact} · {rentals}"}
+
+
+class CustomerDirectory:
+    """Clienti indicizzati per telefono ed email, aggiornati a ogni modifica"""
+
+    def __init__(self):
+        self.by_phone = {}
+        self.by_email = {}
+        self.customers = {}
+        self._customer_of = {}
+        self._ids = count(1)
+
+    def __len__(self):
+        return len(self.customers)
+
+    def _find(self, identity):
+        phone, email = phone_key(identity[2]), email_key(identity[3])
+        found = {c for c in (self.by_phone.get(phone), self.by_email.get(email)) if c is not None}
+        return phone, email, found
+
+    def _merge(self, target, other):
+        """Unisce due clienti che si sono rivelati la stessa persona"""
+        for key, identity in other.rentals.items():
+            target.rentals[key] = identity
+            self._customer_of[key] = target
+        target.phones.update(other.phones)
+        target.emails.update(other.emails)
+        for phone in other.phones:
+            self.by_phone[phone] = target
+        for email in other.emails:
+            self.by_email[email] = target
+        del self.customers[other.id]
+
+    def add(self, key, record):
+        identity = _identity(record)
+        phone, email, found = self._find(identity)
+        if not phone and not email:
+            # Senza recapiti non si può riconoscere il cliente
+            return
+        if found:
+            customer = max(found, key=lambda c: len(c.rentals))
+            for other in found - {customer}:
+                self._merge(customer, other)
+        else:
+            customer = Customer(next(self._ids))
+            self.customers[customer.id] = customer
+        customer.rentals[key] = identity
+        self._customer_of[key] = customer
+        if phone:
+            customer.phones[phone] += 1
+            self.by_phone[phone] = customer
+        if email:
+            customer.emails[email] += 1
+            self.by_email[email] = customer
+
+    def remove(self, key, record):
+        customer = self._customer_of.pop(key, None)
+        if customer is None:
+            return
+        _, _, phone, email = customer.rentals.pop(key)
+        for contacts, index, value in ((customer.phones, self.by_phone, phone_key(phone)),
+                                       (customer.emails, self.by_email, email_key(email))):
+            if value and contacts[value] > 0:
+                contacts[value] -= 1
+                if not contacts[value]:
+                    del contacts[value]
+                    if index.get(value) is customer:
+                        del index[value]
+        if not customer.rentals:
+            del self.customers[customer.id]
+
+    def replace(self, key, old, new):
+        """Aggiorna l'anagrafica solo se nome, recapiti o data di creazione cambiano"""
+        if old is not None and new is not None and _identity(old) == _identity(new):
+            return
+        if old is not None:
+            self.remove(key, old)
+        if new is not None:
+            self.add(key, new)
+
+    def lookup(self, phone=None, email=None):
+        """Cliente con questo telefono o questa email (None se sconosciuto)"""
+        return self.by_phone.get(phone_key(phone)) or self.by_email.get(email_key(email))
+
+    def get(self, token):
+        """Cliente da un riferimento Customer.token"""
+        kind, _, value = (token or '').partition(':')
+        if kind == 'tel':
+            return self.by_phone.get(value)
+        if kind == 'email':
+            return self.by_email.get(value)
+        return None
+
+    def ranked(self, rental_keys, limit=SUGGESTIONS):
+        """Clienti dei noleggi indicati (es. trovati dalla ricerca), i più assidui prima"""
+        found = {self._customer_of[k] for k in rental_keys if k in self._customer_of}
+        return heapq.nsmallest(limit, found, key=lambda c: (-len(c.rentals), c.id))
+
+
+def same_customer(summary, record):
+    """Vero se il noleggio (anche archiviato) ha un recapito del cliente (Customer.summary)"""
+    phone, email = phone_key(record.get('phone')), email_key(record.get('email'))
+    return bool((phone and phone in summary['phones']) or (email and email in summary['emails']))
@@ -0,0 +1,61 @@
+"""
+Script description: File dei dati e costruzione dell'archivio prenotazioni condiviso.
+
+App, riga di comando e benchmark aprono l'archivio da qui: stessi nomi di
+file, stesso lock su file e stessa sequenza degli id, così un processo non
+può finire a scrivere su file diversi da quelli degli altri. Il modulo non
+importa streamlit.
+
+Libraries imported:
+-------------------
+- os: Module for operating system interface.
+- storage: Journal append-only per il salvataggio incrementale delle prenotazioni.
+- sqlite_store: Backend SQLite opzionale con interrogazioni indicizzate.
+- shared_store: Copia delle prenotazioni condivisa tra tutte le sessioni.
+- archive: Archivio compresso per stagione dei noleggi completati.
+"""
+
+import os
+
+from storage import JournalStore
+from sqlite_store import SqliteStore, migrate_from_json
+from shared_store import SharedReservationStore
+from archive import SeasonArchive
+
+# File di configurazione e dati, relativi alla cartella dei dati
+CONFIG_FILE = 'config.yaml'
+RESERVATIONS_FILE = 'reservations.json'
+RESERVATIONS_JOURNAL = 'reservations.journal'
+RESERVATIONS_DB = 'reservations.db'
+RESERVATIONS_AGGREGATES = 'reservations.aggregates.json'
+RESERVATIONS_SEQUENCE = 'reservations.seq'
+ARCHIVE_DIR = 'archive'
+
+# Backend di salvataggio: "json" (snapshot + journal) oppure "sqlite"
+BACKENDS = ('json', 'sqlite')
+
+
+def open_store(directory='', backend='json'):
+    """Archivio condiviso sopra i file della cartella (quella corrente se vuota).
+
+    La sequenza degli id parte oltre l'id più alto sia dei noleggi di lavoro sia
+    di quelli archiviati: un id non viene mai riassegnato.
+    """
+    path = lambda name: os.path.join(directory, name)
+    if backend == 'sqlite':
+        if not os.path.exists(path(RESERVATIONS_DB)):
+            migrate_from_json(path(RESERVATIONS_FILE), path(RESERVATIONS_DB))
+        store_backend = SqliteStore(path(RESERVATIONS_DB))
+    else:
+        store_backend = JournalStore(path(RESERVATIONS_FILE), path(RESERVATIONS_JOURNAL))
+    store = SharedReservationStore(store_backend,
+                                   aggregates_path=path(RESERVATIONS_AGGREGATES),
+                                   lock_path=path(RESERVATIONS_FILE),
+                                   sequence_path=path(RESERVATIONS_SEQUENCE))
+    store.reserve_ids(open_archive(directory).max_id())
+    return store
+
+
+def open_archive(directory=''):
+    """Segmenti per stagione dei noleggi archiviati della cartella"""
+    return SeasonArchive(os.path.join(directory, ARCHIVE_DIR))
@@ -0,0 +1,113 @@
+"""
+Script description: Esportazione a blocchi delle prenotazioni in JSON, JSON Lines o CSV.
+
+L'esportazione viene generata record per record e scritta su file (anche
+compresso con gzip) a mano a mano, senza costruire l'intero backup come unica
+stringa. Si può limitare a un intervallo di date o a uno stato.
+
+Libraries imported:
+-------------------
+- json: Module for JSON data handling.
+- csv: CSV file reading and writing.
+- io: Core tools for working with streams.
+- gzip: Support for gzip files.
+- textwrap: Text wrapping and indentation.
+- tempfile: Module for creating temporary files.
+"""
+
+import json
+import csv
+import io
+import gzip
+import textwrap
+import tempfile
+
+CSV_FIELDS = [
+    'id', 'name', 'phone', 'email', 'date', 'return_date',
+    'ombrellone', 'sdraio', 'lettino', 'regista', 'price',
+    'deposit_paid', 'insurance', 'notes', 'completed', 'created_at', 'created_by',
+]
+
+FORMATS = {
+    'json': ('application/json', 'json'),
+    'jsonl': ('application/x-ndjson', 'jsonl'),
+    'csv': ('text/csv', 'csv'),
+}
+
+# Righe CSV scritte per ogni blocco
+CSV_ROWS_PER_CHUNK = 500
+
+
+def iter_json(records):
+    """Blocchi di testo identici a json.dumps(records, indent=2)"""
+    separator = '[\n'
+    for record in records:
+        text = json.dumps(record, ensure_ascii=False, indent=2, default=str)
+        yield separator + textwrap.indent(text, '  ')
+        separator = ',\n'
+    yield '[]' if separator == '[\n' else '\n]'
+
+
+def iter_jsonl(records):
+    for record in records:
+        yield json.dumps(record, ensure_ascii=False, default=str) + '\n'
+
+
+def iter_csv(records):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=CSV_FIELDS, extrasaction='ignore')
+    writer.writeheader()
+    for i, record in enumerate(records, 1):
+        writer.writerow(record)
+        if i % CSV_ROWS_PER_CHUNK == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+EXPORTERS = {'json': iter_json, 'jsonl': iter_jsonl, 'csv': iter_csv}
+
+
+def write_export(records, fmt, fileobj, compress=False):
+    """Scrive l'esportazione su un file binario; restituisce il numero di byte scritti"""
+    if fmt not in EXPORTERS:
+        raise ValueError(f"Formato di esportazione sconosciuto: {fmt}")
+    target = gzip.GzipFile(fileobj=fileobj, mode='wb') if compress else fileobj
+    written = 0
+    try:
+        for chunk in EXPORTERS[fmt](records):
+            data = chunk.encode('utf-8')
+            target.write(data)
+            written += len(data)
+    finally:
+        if compress:
+            target.close()
+    return written
+
+
+def export_to_tempfile(records, fmt, compress=False):
+    """Esporta su un file temporaneo (in memoria finché piccolo, poi su disco)"""
+    fileobj = tempfile.SpooledTemporaryFile(max_size=4 * 1024 * 1024)
+    write_export(records, fmt, fileobj, compress)
+    fileobj.seek(0)
+    return fileobj
+
+
+def export_bytes(records, fmt, compress=False):
+    """Esportazione completa come bytes, il tipo accettato da st.download_button.
+
+    Streamlit tiene comunque in memoria l'intero file da scaricare: il file
+    temporaneo evita solo di avere insieme blocchi di testo e risultato.
+    """
+    with export_to_tempfile(records, fmt, compress) as fileobj:
+        return fileobj.read()
+
+
+def export_filename(fmt, compress, suffix):
+    extension = FORMATS[fmt][1] + ('.gz' if compress else '')
+    return f"noleggi_backup_{suffix}.{extension}"
+
+
+def export_mime(fmt, compress):
+    return 'application/gzip' if compress else FORMATS[fmt][0]
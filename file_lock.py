@@ -0,0 +1,133 @@
+"""
+Script description: Lock su file condiviso tra processi.
+
+Il lock è un file creato in modo esclusivo accanto al file protetto: funziona su
+qualsiasi sistema operativo e un lock abbandonato da un processo terminato viene
+rimosso dopo un tempo massimo. Il file contiene un token del proprietario: chi
+tiene il lock ne rinnova la data di modifica a intervalli regolari (anche
+durante un import lungo), e lo cancella al rilascio solo se è ancora il suo.
+
+Libraries imported:
+-------------------
+- os: Module for operating system interface.
+- threading: Thread-based parallelism (rinnovo del lock).
+- time: Module for time access and conversions.
+- uuid: UUID objects (token del proprietario).
+"""
+
+import os
+import threading
+import time
+import uuid
+
+
+class LockTimeout(Exception):
+    """Il lock non è stato ottenuto entro il tempo di attesa"""
+
+
+def _read_token(path):
+    try:
+        with open(path, 'rb') as f:
+            return f.read().decode('utf-8', 'replace')
+    except OSError:
+        return None
+
+
+class FileLock:
+    """Lock esclusivo tra processi basato su un file .lock"""
+
+    def __init__(self, path, timeout=10.0, stale_after=30.0, poll=0.02):
+        self.lock_path = path + '.lock'
+        self.timeout = timeout
+        self.stale_after = stale_after
+        self.poll = poll
+        self._fd = None
+        self._token = None
+        self._stop = None
+
+    def acquire(self):
+        deadline = time.monotonic() + self.timeout
+        token = f"{os.getpid()}:{uuid.uuid4().hex}"
+        while True:
+            try:
+                fd = os.open(self.lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                self._break_if_stale()
+                if time.monotonic() >= deadline:
+                    raise LockTimeout(f"Lock {self.lock_path} occupato")
+                time.sleep(self.poll)
+                continue
+            try:
+                os.write(fd, token.encode())
+            except BaseException:
+                # Un lock vuoto farebbe aspettare gli altri fino alla scadenza
+                os.close(fd)
+                os.remove(self.lock_path)
+                raise
+            self._fd = fd
+            self._token = token
+            self._start_heartbeat()
+            return self
+
+    def _start_heartbeat(self):
+        """Rinnova la data del lock finché è tenuto, così non sembra abbandonato"""
+        self._stop = stop = threading.Event()
+        token, interval = self._token, self.stale_after / 3
+
+        def beat():
+            while not stop.wait(interval):
+                if _read_token(self.lock_path) != token:
+                    return
+                try:
+                    os.utime(self.lock_path)
+                except OSError:
+                    return
+
+        threading.Thread(target=beat, name='file-lock-heartbeat', daemon=True).start()
+
+    def _break_if_stale(self):
+        try:
+            age = time.time() - os.path.getmtime(self.lock_path)
+        except OSError:
+            return
+        if age <= self.stale_after:
+            return
+        stale_token = _read_token(self.lock_path)
+        # Si sposta il lock con un rename atomico e lo si elimina solo se è
+        # proprio quello giudicato abbandonato: un lock appena preso da un
+        # altro processo viene rimesso al suo posto
+        moved = f"{self.lock_path}.{uuid.uuid4().hex}.stale"
+        try:
+            os.rename(self.lock_path, moved)
+        except OSError:
+            return
+        if _read_token(moved) == stale_token:
+            os.remove(moved)
+            return
+        try:
+            os.link(moved, self.lock_path)
+        except OSError:
+            pass
+        os.remove(moved)
+
+    @property
+    def held(self):
+        return self._fd is not None
+
+    def release(self):
+        if self._fd is not None:
+            self._stop.set()
+            os.close(self._fd)
+            self._fd = None
+            try:
+                if _read_token(self.lock_path) == self._token:
+                    os.remove(self.lock_path)
+            except OSError:
+                pass
+            self._token = None
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, *exc):
+        self.release()
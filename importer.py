@@ -0,0 +1,285 @@
+"""
+Script description: Importazione in streaming e con validazione dei backup di prenotazioni.
+
+Il file viene letto a blocchi e decodificato un record alla volta (elenco JSON,
+un oggetto per riga oppure CSV con le colonne dell'esportazione), ogni record
+viene validato sullo schema delle prenotazioni e scritto in lotti: in memoria
+c'è sempre al massimo un lotto, mai l'intero file accanto all'intero archivio.
+
+Libraries imported:
+-------------------
+- json: Module for JSON data handling.
+- csv: CSV file reading and writing.
+- io: Core tools for working with streams.
+- codecs: Incremental decoders for byte streams.
+- datetime: Module for date and time operations.
+- records: Dizionario JSON dei record compatti.
+- shared_store: Versione dei record.
+"""
+
+import json
+import csv
+import io
+import codecs
+from datetime import date, datetime
+
+from records import as_dict
+from shared_store import record_version
+
+CHUNK_SIZE = 64 * 1024
+BATCH_SIZE = 500
+
+EQUIPMENT = ['ombrellone', 'sdraio', 'lettino', 'regista']
+BOOL_FIELDS = ['deposit_paid', 'insurance', 'completed']
+TEXT_FIELDS = ['phone', 'email', 'notes', 'created_by']
+# Formati accettati: elenco JSON, JSON Lines e CSV
+FORMATS = ('json', 'jsonl', 'csv')
+
+
+class ImportFormatError(ValueError):
+    """Il file non è un elenco JSON né una sequenza di oggetti JSON"""
+
+
+def iter_json_records(fileobj, chunk_size=CHUNK_SIZE):
+    """Genera (oggetto, byte letti) da un elenco JSON o da JSON Lines, a blocchi"""
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    buffer = ''
+    consumed = 0
+    pos = 0
+    started = False
+    finished = False
+    eof = False
+    while True:
+        # Salta spazi, virgole e l'apertura/chiusura dell'elenco
+        while pos < len(buffer) and not finished:
+            char = buffer[pos]
+            if char.isspace() or (char == ',' and started):
+                pos += 1
+            elif char == '[' and not started:
+                started = True
+                pos += 1
+            elif char == ']' and started:
+                finished = True
+                pos += 1
+            else:
+                break
+        if finished:
+            return
+        if pos < len(buffer):
+            try:
+                obj, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise ImportFormatError(f"JSON non valido vicino al byte {consumed}")
+                obj = None
+            if obj is not None:
+                pos = end
+                yield obj, consumed
+                started = True
+                continue
+        elif eof:
+            return
+        # Serve altro testo: scarta la parte già consumata e leggi un blocco
+        buffer = buffer[pos:]
+        pos = 0
+        chunk = fileobj.read(chunk_size)
+        if not chunk:
+            eof = True
+            buffer += text_decoder.decode(b'', final=True)
+            continue
+        consumed += len(chunk)
+        buffer += text_decoder.decode(chunk) if isinstance(chunk, bytes) else chunk
+
+
+def _csv_value(field, value):
+    """Tipo dello schema per una cella CSV; le celle non convertibili restano
+    testo e verranno scartate dalla validazione con il loro motivo"""
+    if value is None or value == '':
+        return None
+    if field == 'id' or field in EQUIPMENT:
+        try:
+            return int(value)
+        except ValueError:
+            return value
+    if field == 'price':
+        try:
+            return float(value.replace(',', '.'))
+        except ValueError:
+            return value
+    if field in BOOL_FIELDS:
+        return value.strip().lower() in ('true', '1', 'si', 'sì', 'yes')
+    return value
+
+
+def iter_csv_records(fileobj):
+    """Genera (record, byte letti) da un CSV con intestazione (come l'esportazione)"""
+    text = io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline='')
+    try:
+        for row in csv.DictReader(text):
+            record = {field: _csv_value(field, value) for field, value in row.items()
+                      if field is not None}
+            yield {k: v for k, v in record.items() if v is not None}, fileobj.tell()
+    finally:
+        # Il file resta di chi l'ha aperto
+        text.detach()
+
+
+def iter_records(fileobj, fmt='json'):
+    """Record del file nel formato indicato, come (oggetto, byte letti)"""
+    if fmt not in FORMATS:
+        raise ValueError(f"Formato di importazione sconosciuto: {fmt}")
+    if fmt == 'csv':
+        return iter_csv_records(fileobj)
+    return iter_json_records(fileobj)
+
+
+def _iso_date(value, field):
+    if isinstance(value, date):
+        return value.isoformat()
+    try:
+        return date.fromisoformat(str(value)).isoformat()
+    except ValueError:
+        raise ValueError(f"{field} non è una data valida: {value!r}")
+
+
+def validate_record(raw):
+    """Controlla e normalizza un record sullo schema delle prenotazioni.
+
+    Restituisce il record pulito o solleva ValueError con il motivo dello scarto.
+    """
+    if not isinstance(raw, dict):
+        raise ValueError("il record non è un oggetto")
+    record = dict(raw)
+    rental_id = record.get('id')
+    if rental_id is not None:
+        if isinstance(rental_id, bool) or not isinstance(rental_id, int) or rental_id < 1:
+            raise ValueError(f"id non valido: {rental_id!r}")
+    name = record.get('name')
+    if not isinstance(name, str) or not name.strip():
+        raise ValueError("nome cliente mancante")
+    record['name'] = name.strip()
+    if 'date' not in record:
+        raise ValueError("data mancante")
+    record['date'] = _iso_date(record['date'], 'date')
+    record['return_date'] = _iso_date(record.get('return_date') or record['date'], 'return_date')
+    if record['return_date'] < record['date']:
+        raise ValueError("restituzione precedente alla data di noleggio")
+    for eq in EQUIPMENT:
+        value = record.get(eq, 0)
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0 or value != int(value):
+            raise ValueError(f"{eq} deve essere un intero non negativo")
+        record[eq] = int(value)
+    price = record.get('price', 0)
+    if isinstance(price, bool) or not isinstance(price, (int, float)) or price < 0:
+        raise ValueError(f"prezzo non valido: {price!r}")
+    record['price'] = float(price)
+    for field in BOOL_FIELDS:
+        record[field] = bool(record.get(field, False))
+    for field in TEXT_FIELDS:
+        value = record.get(field)
+        record[field] = '' if value is None else str(value)
+    created_at = record.get('created_at') or datetime.now().isoformat()
+    try:
+        datetime.fromisoformat(str(created_at))
+    except ValueError:
+        raise ValueError(f"created_at non valido: {created_at!r}")
+    record['created_at'] = str(created_at)
+    return record
+
+
+def import_records(store, fileobj, mode='merge', batch_size=BATCH_SIZE, progress=None,
+                   max_rejected=1000, fmt='json', archive=None):
+    """Importa un backup nello store in streaming.
+
+    mode: 'merge' aggiorna/aggiunge per id con un commit per lotto, 'replace'
+    sostituisce l'intero archivio. progress(byte_letti, importati) viene
+    chiamata dopo ogni lotto. fmt: 'json', 'jsonl' o 'csv'. Restituisce un
+    resoconto con i record scartati.
+
+    In 'merge' i record senza id entrano nel lotto corrente e ricevono l'id
+    dallo store al momento del salvataggio, così non si scontrano con i
+    noleggi inseriti nel frattempo. Se più avanti il file contiene proprio un
+    id assegnato così, il noleggio già salvato viene spostato su un id nuovo.
+    In 'replace' gli id mancanti si assegnano alla fine, dopo quelli del file.
+
+    Un noleggio già presente prende la versione successiva a quella salvata.
+    Con archive (SeasonArchive) vengono scartati gli id non più tra i noleggi
+    di lavoro e non oltre l'id più alto archiviato: sono stati archiviati (o
+    eliminati) e non vanno riusati, altrimenti l'archivio avrebbe un doppione.
+    """
+    report = {'imported': 0, 'rejected': [], 'rejected_count': 0, 'bytes': 0}
+    seen_ids = set()
+    next_id = store.next_id()
+    archived_max = archive.max_id() if archive is not None else 0
+
+    def valid_records():
+        nonlocal next_id
+        missing_id = []
+        for position, (raw, consumed) in enumerate(iter_records(fileobj, fmt)):
+            report['bytes'] = consumed
+            try:
+                record = validate_record(raw)
+                rental_id = record.get('id')
+                if rental_id in seen_ids:
+                    raise ValueError(f"id duplicato nel file: {rental_id}")
+                current = store.get(rental_id) if rental_id is not None else None
+                if current is None and rental_id is not None and rental_id <= archived_max:
+                    raise ValueError(f"id {rental_id} già usato da un noleggio archiviato")
+            except ValueError as e:
+                report['rejected_count'] += 1
+                if len(report['rejected']) < max_rejected:
+                    report['rejected'].append((position + 1, str(e)))
+                continue
+            if record.get('id') is None:
+                if mode == 'replace':
+                    missing_id.append(record)
+                    continue
+            else:
+                seen_ids.add(record['id'])
+                next_id = max(next_id, record['id'] + 1)
+                if current is not None and mode == 'replace':
+                    # In 'merge' la versione la assegna lo store, sotto il lock
+                    record['version'] = record_version(current) + 1
+            yield record
+        for record in missing_id:
+            record['id'] = next_id
+            next_id += 1
+            yield record
+
+    def batches():
+        batch = []
+        for record in valid_records():
+            batch.append(record)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def counted(batch_iter):
+        for batch in batch_iter:
+            yield batch
+            report['imported'] += len(batch)
+            if progress is not None:
+                progress(report['bytes'], report['imported'])
+
+    if mode == 'replace':
+        store.rewrite_batches(counted(batches()))
+    elif mode == 'merge':
+        # Id assegnati dallo store ai record senza id di questo import
+        assigned = set()
+        for batch in counted(batches()):
+            moved = []
+            for rental_id in [r['id'] for r in batch if r.get('id') in assigned]:
+                record = store.get(rental_id)
+                if record is not None:
+                    moved.append({**as_dict(record), 'id': None, 'version': 0})
+                assigned.discard(rental_id)
+            records = batch + moved
+            ids = store.create_many(records)
+            assigned.update(rental_id for record, rental_id in zip(records, ids)
+                            if record.get('id') is None)
+    else:
+        raise ValueError(f"Modalità di importazione sconosciuta: {mode}")
+    return report
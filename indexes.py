@@ -0,0 +1,244 @@
+"""
+Script description: Indici secondari in memoria per i filtri della lista noleggi
+e per i noleggi più recenti della dashboard.
+
+Gli indici vengono aggiornati a ogni inserimento, modifica e cancellazione, così
+i filtri diventano intersezioni di insiemi già pronti e i risultati escono già
+ordinati per data, senza scandire né riordinare l'intero elenco a ogni rerun.
+
+I filtri per periodo ("fuori in quel giorno", "dal/al") cercano i noleggi che si
+sovrappongono all'intervallo: un noleggio che finisce dopo l'inizio del periodo
+può essere cominciato al massimo "durata massima" giorni prima, quindi basta una
+ricerca binaria sull'elenco ordinato delle date di inizio per limitare i giorni
+da esaminare.
+
+Libraries imported:
+-------------------
+- bisect: Array bisection algorithms (elenco ordinato delle date).
+- collections: Container datatypes (durate dei noleggi).
+- records: Prenotazioni compatte con le date come giorni ordinali.
+- availability: Intervallo di date occupato da un noleggio.
+"""
+
+import bisect
+from collections import Counter
+
+from records import Reservation, date_ordinal
+from availability import rental_span
+
+EQUIPMENT = ['ombrellone', 'sdraio', 'lettino', 'regista']
+
+
+def date_key(record):
+    """Giorno ordinale di inizio del noleggio (0 se mancante)"""
+    if isinstance(record, Reservation):
+        return record.date_ord
+    return date_ordinal(record.get('date'))
+
+
+class ReservationIndex:
+    """Indici per data, stato e attrezzatura sulle chiavi dei record"""
+
+    def __init__(self):
+        self.by_date = {}
+        self.sorted_dates = []
+        # Ultimo giorno di ogni noleggio e numero di noleggi per durata in giorni
+        self.ends = {}
+        self.durations = Counter()
+        self.active = set()
+        self.completed = set()
+        self.equipment = {eq: set() for eq in EQUIPMENT}
+        # Ordine di inserimento dei record, per l'ordine stabile dentro la stessa data
+        self.positions = {}
+        self._next_position = 0
+
+    def add(self, key, record):
+        if key not in self.positions:
+            self.positions[key] = self._next_position
+            self._next_position += 1
+        self._add_to_date(key, record)
+        self._add_attributes(key, record)
+
+    def _add_to_date(self, key, record):
+        rental_date = date_key(record)
+        bucket = self.by_date.get(rental_date)
+        if bucket is None:
+            bucket = self.by_date[rental_date] = {}
+            bisect.insort(self.sorted_dates, rental_date)
+        span = rental_span(record) or (0, 0)
+        self.ends[key] = span[1]
+        self.durations[span[1] - span[0]] += 1
+        position = self.positions[key]
+        if bucket and self.positions[next(reversed(bucket))] > position:
+            # Record spostato su una data già presente: riordina il giorno
+            items = sorted([*bucket, key], key=self.positions.__getitem__)
+            bucket.clear()
+            bucket.update(dict.fromkeys(items))
+        else:
+            bucket[key] = None
+
+    def _remove_from_date(self, key, record):
+        rental_date = date_key(record)
+        end = self.ends.pop(key, None)
+        if end is not None:
+            duration = end - rental_date
+            self.durations[duration] -= 1
+            if not self.durations[duration]:
+                del self.durations[duration]
+        bucket = self.by_date.get(rental_date)
+        if bucket is not None:
+            bucket.pop(key, None)
+            if not bucket:
+                del self.by_date[rental_date]
+                position = bisect.bisect_left(self.sorted_dates, rental_date)
+                del self.sorted_dates[position]
+
+    def _add_attributes(self, key, record):
+        (self.completed if record.get('completed', False) else self.active).add(key)
+        for eq in EQUIPMENT:
+            if (record.get(eq) or 0) > 0:
+                self.equipment[eq].add(key)
+
+    def _remove_attributes(self, key):
+        self.active.discard(key)
+        self.completed.discard(key)
+        for keys in self.equipment.values():
+            keys.discard(key)
+
+    def remove(self, key, record):
+        self._remove_from_date(key, record)
+        self._remove_attributes(key)
+        self.positions.pop(key, None)
+
+    def replace(self, key, old, new):
+        """Aggiorna gli indici dopo un'operazione (old o new None per insert/delete)"""
+        if old is None:
+            self.add(key, new)
+        elif new is None:
+            self.remove(key, old)
+        else:
+            if rental_span(old) != rental_span(new):
+                self._remove_from_date(key, old)
+                self._add_to_date(key, new)
+            self._remove_attributes(key)
+            self._add_attributes(key, new)
+
+    def candidates(self, status=None, equipment=None, within=None):
+        """Insieme delle chiavi per stato e attrezzatura (None = nessun vincolo)"""
+        sets = []
+        if status == 'active':
+            sets.append(self.active)
+        elif status == 'completed':
+            sets.append(self.completed)
+        if equipment:
+            sets.append(self.equipment[equipment])
+        if within is not None:
+            sets.append(within)
+        if not sets:
+            return None
+        sets.sort(key=len)
+        return sets[0].intersection(*sets[1:]) if len(sets) > 1 else sets[0]
+
+    def max_duration(self):
+        """Durata del noleggio più lungo, in giorni oltre il primo"""
+        return max(self.durations, default=0)
+
+    def select(self, filter_date=None, status=None, equipment=None, within=None,
+               date_from=None, date_to=None):
+        """Restituisce (totale, generatore di chiavi in ordine di data decrescente)
+
+        within: insieme opzionale di chiavi ammesse (es. risultato di una ricerca).
+        date_from/date_to: noleggi fuori in almeno un giorno del periodo (un estremo
+        mancante lascia il periodo aperto da quel lato).
+        """
+        keys = self.candidates(status, equipment, within)
+        if date_from or date_to:
+            result = self.keys_overlapping(date_from, date_to, keys)
+            return len(result), iter(result)
+        if filter_date:
+            bucket = self.by_date.get(date_ordinal(filter_date), {})
+            if keys is None:
+                return len(bucket), iter(bucket)
+            return len(keys & bucket.keys()), (k for k in bucket if k in keys)
+        if keys is None:
+            return len(self.positions), self._iter_dates(None)
+        return len(keys), self._iter_dates(keys)
+
+    def keys_between(self, first=None, last=None, status=None):
+        """Chiavi con data di inizio tra first e last (compresi), in ordine crescente"""
+        lo = bisect.bisect_left(self.sorted_dates, date_ordinal(first)) if first else 0
+        hi = (bisect.bisect_right(self.sorted_dates, date_ordinal(last)) if last
+              else len(self.sorted_dates))
+        keys = self.candidates(status)
+        result = []
+        for rental_date in self.sorted_dates[lo:hi]:
+            bucket = self.by_date[rental_date]
+            result.extend(bucket if keys is None else (k for k in bucket if k in keys))
+        return result
+
+    def keys_overlapping(self, first=None, last=None, keys=None):
+        """Chiavi dei noleggi che si sovrappongono a [first, last], per data decrescente
+
+        Solo i giorni di inizio tra first - durata massima e last possono
+        contenere noleggi ancora in corso a first: il resto dell'elenco non
+        viene toccato.
+        """
+        lo = date_ordinal(first) if first else 1
+        hi = date_ordinal(last) if last else None
+        start = bisect.bisect_left(self.sorted_dates, max(1, lo - self.max_duration()))
+        stop = bisect.bisect_right(self.sorted_dates, hi) if hi is not None else len(self.sorted_dates)
+        ends = self.ends
+        result = []
+        for rental_date in reversed(self.sorted_dates[start:stop]):
+            bucket = self.by_date[rental_date]
+            if rental_date >= lo:
+                # Iniziato dentro il periodo: si sovrappone di sicuro
+                result.extend(bucket if keys is None else (k for k in bucket if k in keys))
+            else:
+                result.extend(k for k in bucket if ends[k] >= lo and (keys is None or k in keys))
+        return result
+
+    def _iter_dates(self, keys):
+        for rental_date in reversed(self.sorted_dates):
+            bucket = self.by_date[rental_date]
+            if keys is None:
+                yield from bucket
+            else:
+                for key in bucket:
+                    if key in keys:
+                        yield key
+
+
+class RecentIndex:
+    """Prenotazioni ordinate per data di creazione, per servire le più recenti"""
+
+    def __init__(self):
+        self.entries = []
+        self.by_key = {}
+        self._counter = 0
+
+    def add(self, key, record):
+        # A parità di created_at vince l'ordine di inserimento, come il sort stabile
+        self._counter += 1
+        entry = (str(record.get('created_at', '')), -self._counter, key)
+        self.by_key[key] = entry
+        bisect.insort(self.entries, entry)
+
+    def remove(self, key):
+        entry = self.by_key.pop(key, None)
+        if entry is not None:
+            del self.entries[bisect.bisect_left(self.entries, entry)]
+
+    def replace(self, key, old, new):
+        if old is not None and new is not None and old.get('created_at') == new.get('created_at'):
+            return
+        if old is not None:
+            self.remove(key)
+        if new is not None:
+            self.add(key, new)
+
+    def latest(self, limit, offset=0):
+        """Chiavi delle prenotazioni più recenti, dalla più nuova"""
+        end = len(self.entries) - offset
+        start = max(0, end - limit)
+        return [entry[2] for entry in reversed(self.entries[start:max(end, 0)])]
@@ -0,0 +1,171 @@
+"""
+Script description: Misurazione dei tempi delle operazioni più frequenti dell'app.
+
+Ogni esecuzione dello script è un "run": al suo interno gli span misurano il
+tempo di caricamento, salvataggio, filtri, rendering della pagina e
+salvataggio della configurazione, insieme a contatori come i record elaborati
+e i byte scritti. Ogni span chiuso viene scritto come riga JSON in un log a
+rotazione e sommato alle statistiche del processo mostrate nel pannello admin.
+
+Libraries imported:
+-------------------
+- json: Module for JSON data handling.
+- time: Module for time access and conversions.
+- threading: Thread synchronization primitives (un run per thread di sessione).
+- logging: Logging facility (log a rotazione delle metriche).
+- itertools: Functions creating iterators for efficient looping.
+- collections: Container datatypes.
+- contextlib: Utilities for with-statement contexts.
+- datetime: Module for date and time operations.
+"""
+
+import json
+import time
+import threading
+import logging
+import logging.handlers
+from itertools import count
+from collections import Counter, deque
+from contextlib import contextmanager
+from datetime import datetime
+
+# Durate conservate per span, per medie e percentili del pannello
+RECENT_SAMPLES = 200
+
+_local = threading.local()
+_run_ids = count(1)
+
+
+class MetricsRecorder:
+    """Statistiche degli span del processo e log a rotazione su file"""
+
+    def __init__(self, log_path=None, max_bytes=5 * 1024 * 1024, backups=5):
+        self._lock = threading.Lock()
+        self.samples = {}
+        self.totals = Counter()
+        self.logger = None
+        if log_path:
+            self.logger = logging.getLogger(f"cormorano.metrics.{log_path}")
+            self.logger.setLevel(logging.INFO)
+            self.logger.propagate = False
+            if not self.logger.handlers:
+                handler = logging.handlers.RotatingFileHandler(
+                    log_path, maxBytes=max_bytes, backupCount=backups, encoding='utf-8')
+                handler.setFormatter(logging.Formatter('%(message)s'))
+                self.logger.addHandler(handler)
+
+    def observe(self, run, name, ms, counts):
+        with self._lock:
+            samples = self.samples.get(name)
+            if samples is None:
+                samples = self.samples[name] = deque(maxlen=RECENT_SAMPLES)
+            samples.append(ms)
+        if self.logger is not None:
+            self.logger.info(json.dumps({
+                'ts': datetime.now().isoformat(timespec='milliseconds'),
+                'run': run.run_id, 'page': run.page, 'span': name,
+                'ms': round(ms, 3), **counts,
+            }, ensure_ascii=False, default=str))
+
+    def add(self, name, value):
+        with self._lock:
+            self.totals[name] += value
+
+    def summary(self):
+        """Righe per il pannello: chiamate, media, p95 e massimo per span"""
+        with self._lock:
+            items = [(name, list(samples)) for name, samples in self.samples.items()]
+        rows = []
+        for name, samples in sorted(items):
+            ordered = sorted(samples)
+            rows.append({
+                'Span': name,
+                'Campioni': len(ordered),
+                'Media (ms)': round(sum(ordered) / len(ordered), 2),
+                'p95 (ms)': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 2),
+                'Max (ms)': round(ordered[-1], 2),
+            })
+        return rows
+
+
+class Run:
+    """Span e contatori di una singola esecuzione dello script"""
+
+    def __init__(self, recorder, page):
+        self.recorder = recorder
+        self.page = page
+        self.run_id = next(_run_ids)
+        self.started = time.perf_counter()
+        self.spans = []
+        self.counts = Counter()
+        self.open = {}
+
+
+def start_run(recorder, page=None):
+    """Inizia un nuovo run nel thread corrente (quello precedente viene scartato)"""
+    _local.run = Run(recorder, page)
+    return _local.run
+
+
+def current_run():
+    return getattr(_local, 'run', None)
+
+
+def finish_run():
+    """Chiude il run corrente registrando la durata totale e i contatori"""
+    run = current_run()
+    if run is not None:
+        _close(run, 'run', run.started, Counter(), dict(run.counts))
+        _local.run = None
+    return run
+
+
+def add(name, value=1):
+    """Somma value al contatore name (es. bytes_written) del run e del processo"""
+    run = current_run()
+    if run is not None:
+        run.counts[name] += value
+        if run.recorder is not None:
+            run.recorder.add(name, value)
+
+
+def _close(run, name, started, before, counts):
+    ms = (time.perf_counter() - started) * 1000
+    # Contatori aggiunti con add() mentre lo span era aperto
+    counts = {**counts, **(run.counts - before)}
+    run.spans.append((name, ms, counts))
+    if run.recorder is not None:
+        run.recorder.observe(run, name, ms, counts)
+
+
+@contextmanager
+def span(name, **counts):
+    """Misura il blocco; i contatori si possono completare nel dizionario restituito.
+
+    I contatori dichiarati (es. records) si sommano anche ai totali del processo.
+    """
+    run = current_run()
+    started = time.perf_counter()
+    before = Counter(run.counts) if run is not None else None
+    try:
+        yield counts
+    finally:
+        if run is not None:
+            for key, value in counts.items():
+                if isinstance(value, (int, float)) and run.recorder is not None:
+                    run.recorder.add(key, value)
+            _close(run, name, started, before, counts)
+
+
+def begin(name):
+    """Apre uno span che non si può racchiudere in un blocco with"""
+    run = current_run()
+    if run is not None:
+        run.open[name] = (time.perf_counter(), Counter(run.counts))
+
+
+def end(name, **counts):
+    run = current_run()
+    if run is not None and name in run.open:
+        started, before = run.open.pop(name)
+        _close(run, name, started, before, counts)
@@ -0,0 +1,210 @@
+"""
+Script description: Rappresentazione compatta e tipizzata delle prenotazioni in memoria.
+
+Ogni prenotazione è un oggetto con __slots__ invece di un dizionario con 17
+chiavi: le date sono giorni ordinali, created_at è in microsecondi, i flag
+(deposito, assicurazione, completato) sono bit di un intero e le attrezzature
+piccoli interi. L'oggetto si legge come il dizionario originale (r['name'],
+r.get('completed')) e si riconverte senza perdite nello schema JSON: i valori
+che non rientrano nella forma compatta vengono conservati così come sono.
+
+Libraries imported:
+-------------------
+- datetime: Module for date and time operations.
+- sys: System-specific parameters (interning delle stringhe ripetute).
+"""
+
+import sys
+from datetime import date, datetime, timedelta
+
+FIELDS = [
+    'id', 'name', 'phone', 'email', 'date', 'return_date',
+    'ombrellone', 'sdraio', 'lettino', 'regista', 'price',
+    'deposit_paid', 'insurance', 'notes', 'completed', 'created_at', 'created_by',
+]
+TEXT_FIELDS = ('name', 'phone', 'email', 'notes', 'created_by')
+EQUIPMENT = ('ombrellone', 'sdraio', 'lettino', 'regista')
+FLAG_BITS = {'deposit_paid': 1, 'insurance': 2, 'completed': 4}
+
+_EPOCH = datetime(1, 1, 1)
+_MISSING = object()
+
+
+def date_ordinal(value):
+    """Giorno ordinale da date o stringa ISO; 0 se mancante o non valido"""
+    if isinstance(value, date):
+        return value.toordinal()
+    try:
+        return date.fromisoformat(str(value)[:10]).toordinal()
+    except ValueError:
+        return 0
+
+
+def _compact_date(value):
+    """Ordinale se la stringa è una data ISO canonica, altrimenti None"""
+    if isinstance(value, str) and len(value) == 10:
+        try:
+            parsed = date.fromisoformat(value)
+        except ValueError:
+            return None
+        return parsed.toordinal() if parsed.isoformat() == value else None
+    return None
+
+
+def _compact_timestamp(value):
+    """Microsecondi dall'anno 1 se la stringa ISO si ricostruisce identica"""
+    if not isinstance(value, str):
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if parsed.tzinfo is not None or parsed.isoformat() != value:
+        return None
+    return (parsed - _EPOCH) // timedelta(microseconds=1)
+
+
+class Reservation:
+    """Prenotazione compatta, leggibile come il dizionario dello schema JSON"""
+
+    __slots__ = ('id', 'name', 'phone', 'email', 'date_ord', 'return_ord',
+                 'ombrellone', 'sdraio', 'lettino', 'regista', 'price', 'flags',
+                 'notes', 'created_us', 'created_by', 'raw')
+
+    @classmethod
+    def from_dict(cls, data):
+        self = cls.__new__(cls)
+        # Valori originali che la forma compatta non rappresenta esattamente
+        raw = {}
+        self.id = data.get('id')
+        if 'id' not in data:
+            raw['id'] = _MISSING
+        for field in TEXT_FIELDS:
+            value = data.get(field, _MISSING)
+            if isinstance(value, str):
+                setattr(self, field, value)
+            else:
+                raw[field] = value
+                setattr(self, field, '' if value is _MISSING or value is None else str(value))
+        self.created_by = sys.intern(self.created_by)
+        for field, attr in (('date', 'date_ord'), ('return_date', 'return_ord')):
+            value = data.get(field, _MISSING)
+            ordinal = _compact_date(value)
+            if ordinal is None:
+                raw[field] = value
+                ordinal = 0 if value is _MISSING else date_ordinal(value)
+            setattr(self, attr, ordinal)
+        for field in EQUIPMENT:
+            value = data.get(field, _MISSING)
+            if type(value) is int and value >= 0:
+                setattr(self, field, value)
+            else:
+                raw[field] = value
+                setattr(self, field, int(value) if isinstance(value, (int, float)) else 0)
+        price = data.get('price', _MISSING)
+        if type(price) is float:
+            self.price = price
+        else:
+            raw['price'] = price
+            self.price = float(price) if isinstance(price, (int, float)) else 0.0
+        flags = 0
+        for field, bit in FLAG_BITS.items():
+            value = data.get(field, _MISSING)
+            if type(value) is not bool:
+                raw[field] = value
+            if value is not _MISSING and value:
+                flags |= bit
+        self.flags = flags
+        created_at = data.get('created_at', _MISSING)
+        created_us = _compact_timestamp(created_at)
+        if created_us is None:
+            raw['created_at'] = created_at
+            created_us = 0
+        self.created_us = created_us
+        for key, value in data.items():
+            if key not in _GETTERS:
+                raw[key] = value
+        self.raw = raw or None
+        return self
+
+    # Accesso in stile dizionario, con i valori dello schema JSON
+    def __getitem__(self, key):
+        raw = self.raw
+        if raw is not None and key in raw:
+            value = raw[key]
+            if value is _MISSING:
+                raise KeyError(key)
+            return value
+        getter = _GETTERS.get(key)
+        if getter is None:
+            raise KeyError(key)
+        return getter(self)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key):
+        raw = self.raw
+        if raw is not None and key in raw:
+            return raw[key] is not _MISSING
+        return key in _GETTERS
+
+    def keys(self):
+        raw = self.raw
+        keys = [f for f in FIELDS if raw is None or raw.get(f, None) is not _MISSING]
+        if raw is not None:
+            keys.extend(k for k in raw if k not in _GETTERS)
+        return keys
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def items(self):
+        return [(key, self[key]) for key in self.keys()]
+
+    def to_dict(self):
+        """Dizionario identico a quello letto dal JSON"""
+        return dict(self.items())
+
+    def updated(self, fields):
+        """Nuova prenotazione con i campi modificati (l'originale non cambia)"""
+        return Reservation.from_dict({**self.to_dict(), **fields})
+
+    @property
+    def completed(self):
+        return bool(self.flags & FLAG_BITS['completed'])
+
+    def __repr__(self):
+        return f"Reservation(id={self.id!r}, name={self.name!r}, date={self['date']!r})"
+
+
+_GETTERS = {
+    'id': lambda r: r.id,
+    'name': lambda r: r.name,
+    'phone': lambda r: r.phone,
+    'email': lambda r: r.email,
+    'date': lambda r: date.fromordinal(r.date_ord).isoformat() if r.date_ord else '',
+    'return_date': lambda r: date.fromordinal(r.return_ord).isoformat() if r.return_ord else '',
+    'ombrellone': lambda r: r.ombrellone,
+    'sdraio': lambda r: r.sdraio,
+    'lettino': lambda r: r.lettino,
+    'regista': lambda r: r.regista,
+    'price': lambda r: r.price,
+    'deposit_paid': lambda r: bool(r.flags & 1),
+    'insurance': lambda r: bool(r.flags & 2),
+    'notes': lambda r: r.notes,
+    'completed': lambda r: bool(r.flags & 4),
+    'created_at': lambda r: (_EPOCH + timedelta(microseconds=r.created_us)).isoformat(),
+    'created_by': lambda r: r.created_by,
+}
+
+
+def as_dict(record):
+    """Dizionario JSON di un record, compatto o già dizionario"""
+    return record.to_dict() if isinstance(record, Reservation) else record
@@ -0,0 +1,165 @@
+"""
+Script description: Risorse dell'app create una volta per processo.
+
+Archivio prenotazioni, configurazione, archivio stagionale, cache delle card e
+metriche sono condivisi da tutte le sessioni tramite st.cache_resource. Stando
+in un modulo importato e non nello script dell'app, i decoratori vengono
+applicati una volta sola e non a ogni rerun; le pagine (views) li importano da
+qui insieme alle funzioni di salvataggio.
+
+Libraries imported:
+-------------------
+- streamlit: Framework used to build pure Python web applications.
+- os: Module for operating system interface.
+- datastore: File dei dati e costruzione dell'archivio prenotazioni condiviso.
+- shared_store: Conflitti delle scritture concorrenti.
+- availability: Attrezzatura insufficiente per un noleggio.
+- config_store: Lettura in cache e salvataggio atomico di config.yaml.
+- archive: Archivio compresso per stagione dei noleggi completati.
+- metrics: Tempi delle operazioni principali e log a rotazione delle metriche.
+- cards: HTML delle card dei noleggi in cache per id e versione.
+- aggregates: Totali dei noleggi di lavoro e di quelli archiviati.
+"""
+
+import os
+
+import streamlit as st
+
+from datastore import CONFIG_FILE, open_archive, open_store
+from shared_store import ConflictError
+from availability import AvailabilityError
+from config_store import ConfigStore
+from archive import archive_after_days, archive_completed
+import metrics
+from metrics import MetricsRecorder
+from cards import CardCache
+from aggregates import RunningAggregates
+
+# Log delle metriche
+METRICS_LOG = 'metrics.log'
+
+# Backend di salvataggio: "json" (snapshot + journal) oppure "sqlite"
+STORAGE_BACKEND = os.environ.get('CORMORANO_STORAGE', 'json')
+
+
+@st.cache_resource
+def get_metrics():
+    """Statistiche dei tempi del processo e log a rotazione (metrics.log)"""
+    return MetricsRecorder(METRICS_LOG)
+
+
+@st.cache_resource
+def get_store():
+    """Archivio prenotazioni unico per processo, condiviso da tutte le sessioni"""
+    return open_store(backend=STORAGE_BACKEND)
+
+
+@st.cache_resource
+def get_config_store():
+    """Configurazione letta una volta per processo e salvata solo se modificata"""
+    return ConfigStore(CONFIG_FILE)
+
+
+@st.cache_resource
+def get_archive():
+    """Segmenti per stagione dei noleggi completati, condivisi tra le sessioni"""
+    return open_archive()
+
+
+@st.cache_resource
+def archive_old_rentals(day):
+    """Archiviazione dei noleggi completati, al massimo una volta al giorno per processo"""
+    try:
+        config = get_config_store().get()
+        return archive_completed(get_store(), get_archive(), archive_after_days(config), today=day)
+    except Exception:
+        # Si ritenta il giorno dopo o dalle impostazioni
+        return 0
+
+
+@st.cache_resource
+def get_card_cache():
+    """HTML delle card condiviso tra le sessioni, rigenerato solo se il noleggio cambia"""
+    return CardCache()
+
+
+def load_totals():
+    """Totali dei noleggi di lavoro più quelli delle stagioni archiviate"""
+    return RunningAggregates.total_of([get_store().aggregates, get_archive().totals()])
+
+
+def load_reservations():
+    """Vista in sola lettura delle prenotazioni, aggiornata con le modifiche altrui"""
+    try:
+        with metrics.span('load_reservations') as counts:
+            records = get_store().records()
+            counts['records'] = len(records)
+        return records
+    except OSError:
+        return ()
+
+
+def save_reservations(reservations):
+    """Riscrive l'intero archivio (solo per import e cancellazione totale)"""
+    try:
+        with metrics.span('save_reservations', records=len(reservations)):
+            get_store().rewrite(reservations)
+        return True
+    except Exception as e:
+        st.error(f"Errore nel salvataggio: {e}")
+        return False
+
+
+def add_reservation(rental, stock=None):
+    """Aggiunge un noleggio salvando solo il nuovo record (l'id viene dalla sequenza).
+
+    Con stock la disponibilità viene controllata sotto il lock di scrittura.
+    """
+    try:
+        with metrics.span('add_reservation', records=1):
+            get_store().create(rental, stock)
+        return True
+    except AvailabilityError as e:
+        for equipment, (requested, free) in e.shortages.items():
+            st.error(f"⚠️ {equipment.title()}: richiesti {requested}, "
+                     f"disponibili {free} nel periodo selezionato")
+        return False
+    except Exception as e:
+        st.error(f"Errore nel salvataggio: {e}")
+        return False
+
+
+def update_reservation(rental_id, expected_version=None, stock=None, **fields):
+    """Aggiorna i campi di un noleggio registrando solo la modifica.
+
+    Con expected_version la modifica riesce solo se nessun altro operatore ha
+    cambiato il noleggio dopo che è stato mostrato, con stock solo se
+    l'attrezzatura resta disponibile.
+    """
+    try:
+        with metrics.span('update_reservation', records=1):
+            get_store().update(rental_id, fields, expected_version, stock)
+        return True
+    except ConflictError as e:
+        st.session_state.conflict_notice = f"⚠️ {e}: i dati sono stati aggiornati, riprova"
+        return False
+    except AvailabilityError as e:
+        st.session_state.conflict_notice = f"⚠️ {e}"
+        return False
+    except Exception as e:
+        st.error(f"Errore nel salvataggio: {e}")
+        return False
+
+
+def delete_reservation(rental_id, expected_version=None):
+    """Elimina un noleggio salvando solo la cancellazione"""
+    try:
+        with metrics.span('delete_reservation', records=1):
+            get_store().delete(rental_id, expected_version)
+        return True
+    except ConflictError as e:
+        st.session_state.conflict_notice = f"⚠️ {e}: i dati sono stati aggiornati, riprova"
+        return False
+    except Exception as e:
+        st.error(f"Errore nel salvataggio: {e}")
+        return False
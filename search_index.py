@@ -0,0 +1,191 @@
+"""
+Script description: Indice di ricerca per nome, telefono ed email dei clienti.
+
+Indice a trigrammi sui testi normalizzati: una ricerca per sottostringa diventa
+l'intersezione di pochi elenchi invece di abbassare e confrontare ogni nome a
+ogni rerun. Le ricerche di 1 o 2 caratteri scorrono i trigrammi che iniziano
+con il testo cercato. Gli elenchi sono array compatti di posizioni, non insiemi
+di chiavi. L'ultima ricerca viene ricordata, così mentre si digita la nuova
+query filtra solo i risultati precedenti.
+
+Libraries imported:
+-------------------
+- unicodedata: Unicode database (rimozione degli accenti).
+- re: Regular expression operations.
+- array: Compact arrays of basic values (elenchi dei trigrammi).
+- bisect: Array bisection algorithm (trigrammi con un prefisso).
+"""
+
+import unicodedata
+import re
+from array import array
+from bisect import bisect_left
+
+GRAM = 3
+SEARCH_FIELDS = ['name', 'email']
+# Carattere aggiunto in coda ai testi: ogni posizione inizia almeno un trigramma
+_END = '\x00'
+_SPACES = re.compile(r'\s+')
+_PHONE_QUERY = re.compile(r'^[\d\s+()./-]+$')
+
+
+def normalize(text):
+    """Minuscolo, senza accenti e con gli spazi compattati"""
+    text = str(text or '')
+    if not text.isascii():
+        text = unicodedata.normalize('NFKD', text)
+        text = ''.join(c for c in text if not unicodedata.combining(c))
+    return _SPACES.sub(' ', text.casefold()).strip()
+
+
+def digits(text):
+    return ''.join(c for c in str(text or '') if c.isdigit())
+
+
+def query_terms(text):
+    """Testo cercato normalizzato e, se sembra un telefono, le sue sole cifre"""
+    query = normalize(text)
+    phone_query = digits(query) if _PHONE_QUERY.match(query) else ''
+    return query, phone_query
+
+
+def grams(text):
+    """Trigrammi del testo, completato in coda così da coprire ogni posizione"""
+    text += _END * (GRAM - 1)
+    return {text[i:i + GRAM] for i in range(len(text) - GRAM + 1)}
+
+
+def record_texts(record):
+    """Testi indicizzati di un record: nome, email e cifre del telefono"""
+    texts = [normalize(record.get(field)) for field in SEARCH_FIELDS]
+    texts.append(digits(record.get('phone')))
+    return tuple(t for t in texts if t)
+
+
+def search_text(record):
+    """Testi indicizzati uniti in un'unica stringa (colonna del backend SQLite)"""
+    return '\n'.join(record_texts(record))
+
+
+def matches(record, text):
+    """Stessa regola di NameSearchIndex.search per un singolo record, senza indice"""
+    query, phone_query = query_terms(text)
+    if not query:
+        return True
+    return any(query in t or (phone_query and phone_query in t) for t in record_texts(record))
+
+
+class NameSearchIndex:
+    """Indice a trigrammi su nome, email e telefono, aggiornato in modo incrementale.
+
+    Ogni record occupa una posizione; gli elenchi dei trigrammi sono array di
+    posizioni in ordine crescente. Un record rimosso o modificato lascia la
+    sua posizione vuota negli elenchi, che vengono ricostruiti quando le
+    posizioni vuote superano quelle occupate.
+    """
+
+    def __init__(self):
+        self.postings = {}
+        self.slots = {}
+        self._keys = []
+        self._texts = []
+        self._sorted = None
+        self._last = None
+
+    def add(self, key, record):
+        self._add(key, record_texts(record))
+        self._last = None
+
+    def _add(self, key, texts):
+        slot = len(self._keys)
+        self.slots[key] = slot
+        self._keys.append(key)
+        self._texts.append(texts)
+        for gram in set().union(*map(grams, texts)):
+            posting = self.postings.get(gram)
+            if posting is None:
+                posting = self.postings[gram] = array('I')
+                self._sorted = None
+            posting.append(slot)
+
+    def remove(self, key):
+        slot = self.slots.pop(key, None)
+        if slot is None:
+            return
+        self._keys[slot] = self._texts[slot] = None
+        if len(self._keys) > 2 * len(self.slots) + 1024:
+            self._rebuild()
+        self._last = None
+
+    def _rebuild(self):
+        """Elenchi ricostruiti con le sole posizioni occupate"""
+        entries = [(key, self._texts[slot]) for key, slot in self.slots.items()]
+        self.postings, self.slots, self._keys, self._texts = {}, {}, [], []
+        self._sorted = None
+        for key, texts in entries:
+            self._add(key, texts)
+
+    def replace(self, key, old, new):
+        """Aggiorna l'indice solo se nome, email o telefono sono cambiati"""
+        if old is not None and new is not None and record_texts(old) == record_texts(new):
+            return
+        if old is not None:
+            self.remove(key)
+        if new is not None:
+            self.add(key, new)
+
+    def texts(self, key):
+        """Testi indicizzati del record con chiave key"""
+        return self._texts[self.slots[key]]
+
+    def _prefixed(self, query):
+        """Posizioni dei trigrammi che iniziano con query (1 o 2 caratteri)"""
+        if self._sorted is None:
+            self._sorted = sorted(self.postings)
+        found = set()
+        i = bisect_left(self._sorted, query)
+        while i < len(self._sorted) and self._sorted[i].startswith(query):
+            found.update(self.postings[self._sorted[i]])
+            i += 1
+        return found
+
+    def _lookup(self, query):
+        if len(query) < GRAM:
+            slots = self._prefixed(query)
+        else:
+            parts = [self.postings.get(query[i:i + GRAM]) for i in range(len(query) - GRAM + 1)]
+            if not all(parts):
+                return set()
+            parts.sort(key=len)
+            slots = set(parts[0])
+            for part in parts[1:]:
+                slots.intersection_update(part)
+                if not slots:
+                    return set()
+            if len(query) > GRAM:
+                # I trigrammi possono comparire in campi o posizioni diverse: si verifica
+                slots = [s for s in slots
+                         if self._texts[s] is not None and any(query in t for t in self._texts[s])]
+        keys = self._keys
+        return {keys[s] for s in slots if keys[s] is not None}
+
+    def search(self, text):
+        """Chiavi dei record il cui nome, email o telefono contiene il testo"""
+        query, phone_query = query_terms(text)
+        if not query:
+            return None
+        last = self._last
+        if last is not None and last[0] == (query, phone_query):
+            return last[1]
+        if (last is not None and query.startswith(last[0][0])
+                and phone_query.startswith(last[0][1])):
+            # Ricerca mentre si digita: si restringono i risultati precedenti
+            result = {k for k in last[1]
+                      if any(query in t or (phone_query and phone_query in t)
+                             for t in self.texts(k))}
+        else:
+            result = self._lookup(query)
+            if phone_query and phone_query != query:
+                result |= self._lookup(phone_query)
+        self._last = ((query, phone_query), result)
+        return result
@@ -0,0 +1,505 @@
+"""
+Script description: Archivio prenotazioni condiviso da tutte le sessioni del processo.
+
+Una sola copia in memoria delle prenotazioni, creata una volta per processo
+(st.cache_resource) e tenuta allineata leggendo dal backend soltanto le modifiche
+registrate dopo l'ultima lettura. Le sessioni ricevono viste in sola lettura di
+prenotazioni compatte (records.Reservation).
+
+Le scritture avvengono sotto un breve lock su file: prima si rileggono le
+modifiche degli altri processi, poi si applica la propria. Ogni record porta un
+numero di versione; update e delete possono indicare la versione che
+l'operatore ha visto e falliscono con ConflictError se nel frattempo il
+noleggio è cambiato, mentre modifiche a noleggi diversi si sommano.
+
+Le ultime modifiche applicate restano in un registro numerato con la versione
+dell'archivio: ogni sessione ricorda l'ultima versione vista e chiede solo le
+modifiche successive per sapere se deve ridisegnare la pagina.
+
+Libraries imported:
+-------------------
+- threading: Thread synchronization primitives.
+- itertools: Functions creating iterators for efficient looping.
+- collections: Container datatypes (registro delle modifiche).
+- contextlib: Utilities for with-statement contexts.
+- storage: Chiave dei record del journal e sequenza degli id.
+- file_lock: Lock su file condiviso tra processi.
+- records: Prenotazioni compatte tipizzate (__slots__).
+- indexes: Indici secondari mantenuti a ogni modifica.
+- search_index: Indice a n-grammi per la ricerca di nome, telefono ed email.
+- customers: Anagrafica clienti per telefono ed email.
+- aggregates: Totali per dashboard e statistiche aggiornati a ogni modifica.
+- availability: Occupazione delle attrezzature per giorno.
+"""
+
+import threading
+from itertools import islice
+from collections import deque
+from contextlib import contextmanager
+
+from storage import IdSequence, record_key
+from file_lock import FileLock
+from records import Reservation, as_dict, date_ordinal
+from indexes import ReservationIndex, RecentIndex
+from search_index import NameSearchIndex
+from customers import SUGGESTIONS, CustomerDirectory
+from aggregates import RunningAggregates, load_aggregates, save_aggregates
+from availability import OCCUPANCY_FIELDS, AvailabilityEngine, AvailabilityError
+
+# Modifiche conservate nel registro per le sessioni rimaste indietro
+CHANGE_FEED_SIZE = 1000
+
+
+class ConflictError(Exception):
+    """Il noleggio è stato modificato o eliminato da un altro operatore"""
+
+
+def record_version(record):
+    """Versione di un record (0 se mai modificato dopo l'introduzione delle versioni)"""
+    return record.get('version', 0) or 0
+
+
+class SharedReservationStore:
+    """Prenotazioni in memoria condivise tra sessioni, sopra un backend
+
+    Il backend (JournalStore o SqliteStore) deve offrire load, create, update,
+    delete, apply, rewrite, cursor, changes_since e maybe_compact.
+    """
+
+    def __init__(self, backend, aggregates_path=None, lock_path=None, sequence_path=None):
+        self.backend = backend
+        self.aggregates_path = aggregates_path
+        self.file_lock = FileLock(lock_path) if lock_path else None
+        self.sequence = IdSequence(sequence_path) if sequence_path else None
+        self.version = 0
+        self._lock = threading.RLock()
+        self._records = {}
+        self.index = ReservationIndex()
+        self.search_index = NameSearchIndex()
+        self.customers = CustomerDirectory()
+        self.recent = RecentIndex()
+        self.availability = AvailabilityEngine()
+        self.aggregates = RunningAggregates()
+        self._view = None
+        self._derived = {}
+        self._cursor = None
+        # (versione, operazione, chiave) delle ultime modifiche; il registro è
+        # completo per le versioni successive a _feed_start
+        self._feed = deque()
+        self._feed_start = 0
+        self.reload()
+
+    def reload(self):
+        """Ricarica completa dal backend (avvio, compattazione, import)"""
+        with self._lock:
+            # Il cursore va letto prima dei dati: le modifiche intermedie
+            # verranno rilette, ma le operazioni sono idempotenti
+            cursor = self.backend.cursor()
+            self._records = {record_key(r, i): Reservation.from_dict(r)
+                             for i, r in enumerate(self.backend.load())}
+            self.index = ReservationIndex()
+            self.search_index = NameSearchIndex()
+            self.customers = CustomerDirectory()
+            self.recent = RecentIndex()
+            self.availability = AvailabilityEngine()
+            saved = load_aggregates(self.aggregates_path, cursor)
+            self.aggregates = saved or RunningAggregates()
+            for key, record in self._records.items():
+                self.index.add(key, record)
+                self.search_index.add(key, record)
+                self.customers.add(key, record)
+                self.recent.add(key, record)
+                self.availability.add(key, record)
+                if saved is None:
+                    self.aggregates.add(record)
+            self._cursor = cursor
+            self._seed_sequence()
+            self._changed()
+            self._feed.clear()
+            self._feed_start = self.version
+            if saved is None:
+                self._save_aggregates()
+
+    def refresh(self):
+        """Applica le modifiche scritte da altri processi dopo l'ultima lettura"""
+        with self._lock:
+            ops, cursor = self.backend.changes_since(self._cursor)
+            if ops is None:
+                self.reload()
+                return
+            self._cursor = cursor
+            if ops:
+                for op in ops:
+                    self._apply(op)
+                    self._record_change(self.version + 1, op)
+                self._changed()
+                self._save_aggregates()
+
+    def _record_change(self, version, op):
+        if len(self._feed) >= CHANGE_FEED_SIZE:
+            self._feed_start = max(self._feed_start, self._feed.popleft()[0])
+        self._feed.append((version, op.get('op'), op.get('id')))
+
+    def changes_since(self, version):
+        """Modifiche successive a version, come (modifiche, versione attuale).
+
+        Ogni modifica è (versione, operazione, id). Restituisce None al posto
+        delle modifiche se il registro non risale fino a version (sessione
+        rimasta troppo indietro, ricarica completa o archivio ricreato).
+        """
+        self.refresh()
+        with self._lock:
+            if version < self._feed_start or version > self.version:
+                return None, self.version
+            return [change for change in self._feed if change[0] > version], self.version
+
+    def _apply(self, op):
+        """Applica un'operazione ai record e aggiorna gli indici"""
+        kind = op.get('op')
+        key = op.get('id')
+        old = self._records.get(key)
+        if kind == 'create':
+            new = self._records[key] = Reservation.from_dict(op['data'])
+        elif kind == 'update' and old is not None:
+            new = self._records[key] = old.updated(op['data'])
+        elif kind == 'delete' and old is not None:
+            del self._records[key]
+            new = None
+        else:
+            return
+        if old is not new:
+            self.index.replace(key, old, new)
+            self.search_index.replace(key, old, new)
+            self.customers.replace(key, old, new)
+            self.recent.replace(key, old, new)
+            self.availability.replace(key, old, new)
+            self.aggregates.replace(old, new)
+
+    def _save_aggregates(self):
+        if not self.aggregates_path:
+            return
+        try:
+            save_aggregates(self.aggregates_path, self._cursor, self.aggregates)
+        except OSError:
+            # I totali si ricalcolano comunque al prossimo avvio
+            pass
+
+    def today_count(self, day):
+        """Noleggi che iniziano nel giorno indicato, dall'indice per data"""
+        return len(self.index.by_date.get(date_ordinal(day), ()))
+
+    def _changed(self):
+        self.version += 1
+        self._view = None
+        self._derived = {}
+
+    def records(self):
+        """Vista in sola lettura delle prenotazioni, condivisa finché non cambiano.
+
+        Gli aggiornamenti creano nuovi record invece di modificarli, quindi una
+        vista già distribuita resta coerente.
+        """
+        self.refresh()
+        view = self._view
+        if view is None:
+            with self._lock:
+                view = self._view = tuple(self._records.values())
+        return view
+
+    def derived(self, name, builder):
+        """Valore calcolato dalle prenotazioni, ricostruito solo quando cambiano"""
+        with self._lock:
+            records = self.records()
+            if name not in self._derived:
+                self._derived[name] = builder(records)
+            return self._derived[name]
+
+    def select(self, filter_date=None, status=None, equipment=None, search=None,
+               match=None, offset=0, limit=None, date_from=None, date_to=None, customer=None):
+        """Filtra tramite gli indici e restituisce (totale, record della pagina).
+
+        I record escono ordinati per data decrescente; filter_date è il giorno di
+        inizio, date_from/date_to il periodo in cui il noleggio è fuori; search
+        cerca nel nome, telefono ed email, customer (Customer.token) limita ai
+        noleggi di un cliente, match è un filtro opzionale sul singolo record
+        applicato dopo gli indici.
+        """
+        self.refresh()
+        with self._lock:
+            within = self.search_index.search(search) if search else None
+            if customer is not None:
+                found = self.customers.get(customer)
+                keys = set(found.rentals) if found is not None else set()
+                within = keys if within is None else within & keys
+            total, keys = self.index.select(filter_date, status, equipment, within,
+                                            date_from=date_from, date_to=date_to)
+            records = (self._records[k] for k in keys)
+            if match is not None:
+                matching = [r for r in records if match(r)]
+                total, records = len(matching), iter(matching)
+            stop = None if limit is None else offset + limit
+            return total, list(islice(records, offset, stop))
+
+    def iter_records(self, date_from=None, date_to=None, status=None):
+        """Record per l'esportazione: tutti nell'ordine originale, oppure quelli
+        nell'intervallo di date e nello stato richiesti, in ordine di data"""
+        self.refresh()
+        with self._lock:
+            if date_from is None and date_to is None and status is None:
+                keys = list(self._records)
+            else:
+                keys = self.index.keys_between(date_from, date_to, status)
+        for key in keys:
+            record = self._records.get(key)
+            if record is not None:
+                yield record.to_dict()
+
+    def find_customers(self, text, limit=SUGGESTIONS):
+        """Clienti il cui nome, telefono o email contiene il testo (Customer.summary)"""
+        self.refresh()
+        with self._lock:
+            keys = self.search_index.search(text) or ()
+            return [customer.summary() for customer in self.customers.ranked(keys, limit)]
+
+    def customer(self, token=None, phone=None, email=None):
+        """Cliente da riferimento, telefono o email (Customer.summary), o None"""
+        self.refresh()
+        with self._lock:
+            found = self.customers.get(token) if token else self.customers.lookup(phone, email)
+            return found.summary() if found is not None else None
+
+    def latest(self, limit, offset=0):
+        """Le prenotazioni create più di recente, senza ordinare l'intero elenco"""
+        self.refresh()
+        with self._lock:
+            return [self._records[k] for k in self.recent.latest(limit, offset)]
+
+    def get(self, rental_id):
+        return self._records.get(rental_id)
+
+    def next_id(self):
+        """Primo id libero (senza riservarlo)"""
+        with self._lock:
+            highest = max((k for k in self._records if isinstance(k, int)), default=0)
+            if self.sequence is not None:
+                highest = max(highest, self.sequence.current())
+            return highest + 1
+
+    @contextmanager
+    def writing(self):
+        """Sezione di scrittura: lock tra thread e tra processi, dati aggiornati"""
+        with self._lock:
+            if self.file_lock is None or self.file_lock.held:
+                self.refresh()
+                yield
+                self.refresh()
+                self._maybe_compact()
+                return
+            with self.file_lock:
+                self.refresh()
+                yield
+                self.refresh()
+                self._maybe_compact()
+
+    def compact(self):
+        """Compatta il backend (journal nello snapshot, spazio del database)"""
+        with self.writing():
+            self.backend.compact()
+            self._cursor = self.backend.cursor()
+            self._save_aggregates()
+
+    def _maybe_compact(self):
+        """Compattazione del backend fatta da chi scrive, senza ricaricare.
+
+        Sotto il lock e subito dopo il refresh i dati in memoria coincidono con
+        quelli del backend: dopo la compattazione basta spostare il cursore.
+        """
+        if self.backend.maybe_compact():
+            self._cursor = self.backend.cursor()
+            self._save_aggregates()
+
+    def _seed_sequence(self):
+        """Porta la sequenza almeno all'id più alto caricato.
+
+        Su un archivio creato prima della sequenza (o importato) il contatore
+        parte da 0: senza questo passo, cancellato il noleggio con l'id più
+        alto, il suo id verrebbe riassegnato a un noleggio nuovo.
+        """
+        if self.sequence is None:
+            return
+        highest = max((k for k in self._records if isinstance(k, int)), default=0)
+        if highest <= self.sequence.current():
+            return
+        if self.file_lock is None or self.file_lock.held:
+            self.sequence.advance(highest)
+        else:
+            with self.file_lock:
+                self.sequence.advance(highest)
+
+    def reserve_ids(self, highest):
+        """Gli id fino a highest non verranno più assegnati (es. noleggi archiviati)"""
+        if self.sequence is None or highest <= self.sequence.current():
+            return
+        with self.writing():
+            self.sequence.advance(highest)
+
+    def _allocate_id(self, count=1, floor=0):
+        """Primo di count id consecutivi mai usati (maggiori anche di floor)"""
+        highest = max((k for k in self._records if isinstance(k, int)), default=0)
+        highest = max(highest, floor)
+        if self.sequence is None:
+            return highest + 1
+        return self.sequence.allocate(floor=highest, count=count)
+
+    def _advance_sequence(self, records):
+        ids = [r.get('id') for r in records if isinstance(r.get('id'), int)]
+        if self.sequence is not None and ids:
+            self.sequence.advance(max(ids))
+
+    def _check_version(self, rental_id, expected_version):
+        """Solleva ConflictError se il record non è più quello visto dall'operatore"""
+        record = self._records.get(rental_id)
+        if record is None:
+            if expected_version is not None:
+                raise ConflictError(f"Il noleggio {rental_id} è stato eliminato da un altro operatore")
+            return None
+        if expected_version is not None and record_version(record) != expected_version:
+            raise ConflictError(f"Il noleggio {rental_id} è stato modificato da un altro operatore")
+        return record
+
+    def _check_stock(self, records, stock, ignore_keys=()):
+        """Solleva AvailabilityError se i noleggi non trovano l'attrezzatura.
+
+        Va chiamata dentro writing(): la disponibilità è quella appena
+        aggiornata e nessun altro può prenotare prima del salvataggio.
+        """
+        if stock is None:
+            return
+        shortages = self.availability.shortages(records, stock, ignore_keys)
+        if shortages:
+            raise AvailabilityError(shortages)
+
+    def create(self, record, stock=None):
+        """Aggiunge un record; senza id gliene assegna uno dalla sequenza.
+
+        Con stock (scorte per attrezzatura) il noleggio viene salvato solo se
+        l'attrezzatura è disponibile. Restituisce l'id del record salvato.
+        """
+        with self.writing():
+            self._check_stock([record], stock)
+            if record.get('id') is None:
+                record = {**record, 'id': self._allocate_id()}
+            else:
+                self._advance_sequence([record])
+            self.backend.create(record)
+        return record['id']
+
+    def create_many(self, records):
+        """Aggiunge o sovrascrive per id un lotto di record con un solo salvataggio.
+
+        I record senza id ricevono id nuovi dalla sequenza, sotto lo stesso lock.
+        Un record che ne sostituisce uno esistente prende la versione successiva
+        a quella salvata, così una modifica basata sulla versione vista prima
+        non passa il controllo. Restituisce gli id dei record salvati, nello
+        stesso ordine.
+        """
+        records = list(records)
+        with self.writing():
+            self._advance_sequence(records)
+            for i, record in enumerate(records):
+                current = self._records.get(record.get('id'))
+                if current is not None:
+                    records[i] = {**record, 'version': record_version(current) + 1}
+            missing = [i for i, record in enumerate(records) if record.get('id') is None]
+            if missing:
+                floor = max((r['id'] for r in records if isinstance(r.get('id'), int)), default=0)
+                first = self._allocate_id(len(missing), floor)
+                for offset, i in enumerate(missing):
+                    records[i] = {**records[i], 'id': first + offset}
+            self.backend.create_many(records)
+        return [r['id'] for r in records]
+
+    def update(self, rental_id, fields, expected_version=None, stock=None):
+        """Modifica i campi indicati (compare-and-swap se expected_version è dato).
+
+        Con stock, una modifica di date, attrezzatura o restituzione riesce solo
+        se l'attrezzatura resta disponibile.
+        """
+        with self.writing():
+            record = self._check_version(rental_id, expected_version)
+            if record is None:
+                return
+            if OCCUPANCY_FIELDS.intersection(fields):
+                self._check_stock([{**as_dict(record), **fields}], stock, [rental_id])
+            self.backend.update(rental_id, {**fields, 'version': record_version(record) + 1})
+
+    def delete(self, rental_id, expected_version=None):
+        with self.writing():
+            if self._check_version(rental_id, expected_version) is None:
+                return
+            self.backend.delete(rental_id)
+
+    def _batch_records(self, rental_ids, expected_versions):
+        """Record esistenti tra rental_ids, dopo aver controllato tutte le versioni"""
+        expected_versions = expected_versions or {}
+        conflicts = []
+        records = []
+        for rental_id in rental_ids:
+            try:
+                record = self._check_version(rental_id, expected_versions.get(rental_id))
+            except ConflictError:
+                conflicts.append(rental_id)
+                continue
+            if record is not None:
+                records.append((rental_id, record))
+        if conflicts:
+            ids = ', '.join(str(rental_id) for rental_id in conflicts)
+            raise ConflictError(f"Noleggi modificati da un altro operatore: {ids}")
+        return records
+
+    def update_many(self, rental_ids, fields, expected_versions=None, stock=None):
+        """Applica gli stessi campi a più noleggi con un solo salvataggio.
+
+        Tutto o niente: se anche un solo noleggio è cambiato rispetto alla
+        versione attesa, o con stock l'attrezzatura non basta per tutti, non
+        viene modificato nessuno. Restituisce il numero di noleggi aggiornati.
+        """
+        with self.writing():
+            records = self._batch_records(rental_ids, expected_versions)
+            if OCCUPANCY_FIELDS.intersection(fields):
+                self._check_stock([{**as_dict(record), **fields} for _, record in records],
+                                  stock, [rental_id for rental_id, _ in records])
+            ops = [{'op': 'update', 'id': rental_id,
+                    'data': {**fields, 'version': record_version(record) + 1}}
+                   for rental_id, record in records]
+            if ops:
+                self.backend.apply(ops)
+        return len(ops)
+
+    def delete_many(self, rental_ids, expected_versions=None):
+        """Elimina più noleggi con un solo salvataggio (tutto o niente)"""
+        with self.writing():
+            records = self._batch_records(rental_ids, expected_versions)
+            ops = [{'op': 'delete', 'id': rental_id} for rental_id, _ in records]
+            if ops:
+                self.backend.apply(ops)
+        return len(ops)
+
+    def rewrite(self, reservations):
+        with self.writing():
+            self._advance_sequence(reservations)
+            self.backend.rewrite(reservations)
+            self.reload()
+
+    def rewrite_batches(self, batches):
+        """Sostituisce l'intero archivio leggendo i record a lotti"""
+
+        def advancing(batches):
+            for batch in batches:
+                batch = list(batch)
+                self._advance_sequence(batch)
+                yield batch
+
+        with self.writing():
+            self.backend.rewrite_batches(advancing(batches))
+            self.reload()
@@ -0,0 +1,335 @@
+"""
+Script description: Backend SQLite opzionale per le prenotazioni del Cormorano.
+
+Espone la stessa interfaccia di storage.JournalStore (load, create, update,
+delete, rewrite, cursor, changes_since) e in più query(), che traduce i filtri della pagina noleggi in
+interrogazioni servite dagli indici su date, completed, name e created_at.
+
+Libraries imported:
+-------------------
+- sqlite3: Embedded SQL database engine.
+- json: Module for JSON data handling.
+- os: Module for operating system interface.
+- contextlib: Utilities for context managers.
+- datetime: Module for date and time operations.
+- search_index: Testi normalizzati per la ricerca di nome, telefono ed email.
+"""
+
+import sqlite3
+import json
+import os
+from contextlib import closing
+from datetime import date, timedelta
+
+from search_index import query_terms, search_text
+
+# Modifiche conservate nel registro changes (a ogni scrittura e dalla compattazione)
+CHANGES_KEPT = 10000
+
+# Colonne della tabella, nello stesso ordine dello schema JSON
+COLUMNS = [
+    ('id', 'INTEGER PRIMARY KEY'),
+    ('name', 'TEXT NOT NULL COLLATE NOCASE'),
+    ('phone', 'TEXT'),
+    ('email', 'TEXT'),
+    ('date', 'TEXT'),
+    ('return_date', 'TEXT'),
+    ('ombrellone', 'INTEGER NOT NULL DEFAULT 0'),
+    ('sdraio', 'INTEGER NOT NULL DEFAULT 0'),
+    ('lettino', 'INTEGER NOT NULL DEFAULT 0'),
+    ('regista', 'INTEGER NOT NULL DEFAULT 0'),
+    ('price', 'REAL NOT NULL DEFAULT 0'),
+    ('deposit_paid', 'INTEGER NOT NULL DEFAULT 0'),
+    ('insurance', 'INTEGER NOT NULL DEFAULT 0'),
+    ('notes', 'TEXT'),
+    ('completed', 'INTEGER NOT NULL DEFAULT 0'),
+    ('created_at', 'TEXT'),
+    ('created_by', 'TEXT'),
+]
+COLUMN_NAMES = [name for name, _ in COLUMNS]
+BOOL_COLUMNS = {'deposit_paid', 'insurance', 'completed'}
+EQUIPMENT = ['ombrellone', 'sdraio', 'lettino', 'regista']
+
+SCHEMA = [
+    # search: nome, email e cifre del telefono normalizzati come nella ricerca in memoria
+    "CREATE TABLE IF NOT EXISTS reservations ({}, extra TEXT, search TEXT)".format(
+        ', '.join(f'{name} {decl}' for name, decl in COLUMNS)),
+    "CREATE INDEX IF NOT EXISTS idx_reservations_date ON reservations(date)",
+    "CREATE INDEX IF NOT EXISTS idx_reservations_completed ON reservations(completed, date)",
+    "CREATE INDEX IF NOT EXISTS idx_reservations_name ON reservations(name)",
+    "CREATE INDEX IF NOT EXISTS idx_reservations_created_at ON reservations(created_at)",
+    # Registro delle modifiche, letto dalle altre sessioni per restare allineate
+    "CREATE TABLE IF NOT EXISTS changes (seq INTEGER PRIMARY KEY AUTOINCREMENT, op TEXT NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)",
+    "INSERT OR IGNORE INTO meta (key, value) VALUES ('epoch', '0')",
+] + [
+    # Indici parziali: solo le righe che noleggiano quell'attrezzatura
+    f"CREATE INDEX IF NOT EXISTS idx_reservations_{eq} ON reservations(date) WHERE {eq} > 0"
+    for eq in EQUIPMENT
+]
+
+
+def to_row(record):
+    """Converte un record JSON nei valori della riga (campi sconosciuti in extra)"""
+    row = []
+    for name in COLUMN_NAMES:
+        value = record.get(name)
+        if name in BOOL_COLUMNS:
+            value = int(bool(value))
+        elif name in EQUIPMENT:
+            value = int(value or 0)
+        elif name == 'price':
+            value = float(value or 0)
+        elif value is not None and name != 'id':
+            value = str(value)
+        row.append(value)
+    extra = {k: v for k, v in record.items() if k not in COLUMN_NAMES}
+    row.append(json.dumps(extra, ensure_ascii=False, default=str) if extra else None)
+    row.append(search_text(record))
+    return row
+
+
+def from_row(row):
+    """Converte una riga sqlite3.Row nel record con lo schema JSON originale"""
+    record = {}
+    for name in COLUMN_NAMES:
+        value = row[name]
+        if name in BOOL_COLUMNS:
+            value = bool(value)
+        record[name] = value
+    if row['extra']:
+        record.update(json.loads(row['extra']))
+    return record
+
+
+class SqliteStore:
+    """Prenotazioni salvate in un database SQLite indicizzato"""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        with closing(self.connect()) as conn, conn:
+            for statement in SCHEMA:
+                conn.execute(statement)
+            self._add_search_column(conn)
+
+    def _add_search_column(self, conn):
+        """Aggiunge e riempie la colonna search nei database creati senza"""
+        columns = {row['name'] for row in conn.execute("PRAGMA table_info(reservations)")}
+        if 'search' in columns:
+            return
+        conn.execute("ALTER TABLE reservations ADD COLUMN search TEXT")
+        rows = conn.execute("SELECT * FROM reservations").fetchall()
+        conn.executemany("UPDATE reservations SET search = ? WHERE id = ?",
+                         [(search_text(from_row(row)), row['id']) for row in rows])
+
+    def connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def load(self):
+        with closing(self.connect()) as conn:
+            rows = conn.execute("SELECT * FROM reservations ORDER BY rowid").fetchall()
+        return [from_row(row) for row in rows]
+
+    def _upsert(self, conn, records):
+        placeholders = ', '.join('?' * (len(COLUMN_NAMES) + 2))
+        conn.executemany(
+            f"INSERT OR REPLACE INTO reservations ({', '.join(COLUMN_NAMES)}, extra, search) "
+            f"VALUES ({placeholders})",
+            [to_row(r) for r in records])
+
+    def _log(self, conn, *ops):
+        conn.executemany("INSERT INTO changes (op) VALUES (?)",
+                         [(json.dumps(op, ensure_ascii=False, default=str),) for op in ops])
+        conn.execute("DELETE FROM changes WHERE seq <= (SELECT MAX(seq) FROM changes) - ?",
+                     (CHANGES_KEPT,))
+
+    def create(self, record):
+        with closing(self.connect()) as conn, conn:
+            self._upsert(conn, [record])
+            self._log(conn, {'op': 'create', 'id': record.get('id'), 'data': record})
+
+    def create_many(self, records):
+        """Aggiunge (o sovrascrive per id) più record in una sola transazione"""
+        with closing(self.connect()) as conn, conn:
+            self._upsert(conn, records)
+            self._log(conn, *({'op': 'create', 'id': r.get('id'), 'data': r} for r in records))
+
+    def update(self, rental_id, fields):
+        self.apply([{'op': 'update', 'id': rental_id, 'data': fields}])
+
+    def delete(self, rental_id):
+        self.apply([{'op': 'delete', 'id': rental_id}])
+
+    def apply(self, ops):
+        """Applica più operazioni (create, update, delete) in una sola transazione"""
+        with closing(self.connect()) as conn, conn:
+            for op in ops:
+                if op['op'] == 'create':
+                    self._upsert(conn, [op['data']])
+                elif op['op'] == 'update':
+                    row = conn.execute("SELECT * FROM reservations WHERE id = ?",
+                                       (op['id'],)).fetchone()
+                    if row is not None:
+                        self._upsert(conn, [{**from_row(row), **op['data']}])
+                elif op['op'] == 'delete':
+                    conn.execute("DELETE FROM reservations WHERE id = ?", (op['id'],))
+            self._log(conn, *ops)
+
+    def get(self, rental_id):
+        with closing(self.connect()) as conn:
+            row = conn.execute("SELECT * FROM reservations WHERE id = ?", (rental_id,)).fetchone()
+        return from_row(row) if row else None
+
+    def rewrite(self, reservations):
+        """Sostituisce l'intero contenuto della tabella in una transazione"""
+        self.rewrite_batches([reservations])
+
+    def rewrite_batches(self, batches):
+        """Come rewrite, inserendo un lotto alla volta nella stessa transazione"""
+        with closing(self.connect()) as conn, conn:
+            conn.execute("DELETE FROM reservations")
+            for batch in batches:
+                self._upsert(conn, batch)
+            # Nuova epoca: chi legge il registro deve ricaricare tutto
+            conn.execute("DELETE FROM changes")
+            conn.execute("UPDATE meta SET value = CAST(value AS INTEGER) + 1 WHERE key = 'epoch'")
+
+    def maybe_compact(self):
+        """Niente da ripiegare: le modifiche sono già nella tabella"""
+        return False
+
+    def compact(self, keep_changes=CHANGES_KEPT):
+        """Recupera lo spazio lasciato dalle righe eliminate e accorcia il registro.
+
+        Restano le ultime keep_changes modifiche: chi è rimasto più indietro
+        ricarica tutto, come dopo una riscrittura.
+        """
+        with closing(self.connect()) as conn:
+            with conn:
+                conn.execute("DELETE FROM changes WHERE seq <= (SELECT MAX(seq) FROM changes) - ?",
+                             (keep_changes,))
+            conn.execute("VACUUM")
+
+    def reindex(self):
+        """Ricostruisce gli indici e aggiorna le statistiche del pianificatore"""
+        with closing(self.connect()) as conn:
+            conn.execute("REINDEX")
+            conn.execute("ANALYZE")
+
+    def _position(self, conn):
+        epoch = conn.execute("SELECT value FROM meta WHERE key = 'epoch'").fetchone()[0]
+        row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'changes'").fetchone()
+        return epoch, row[0] if row else 0
+
+    def cursor(self):
+        """Posizione corrente dei dati: epoca e ultima modifica registrata"""
+        with closing(self.connect()) as conn:
+            return self._position(conn)
+
+    def changes_since(self, cursor):
+        """Operazioni registrate dopo cursor e il nuovo cursore.
+
+        Restituisce None al posto delle operazioni quando il registro non copre
+        più cursor (riscrittura completa o modifiche troppo vecchie).
+        """
+        epoch, seq = cursor
+        with closing(self.connect()) as conn:
+            current_epoch, last_seq = self._position(conn)
+            if current_epoch != epoch:
+                return None, (current_epoch, last_seq)
+            if last_seq == seq:
+                return [], cursor
+            oldest = conn.execute("SELECT MIN(seq) FROM changes").fetchone()[0]
+            if oldest is None or oldest > seq + 1:
+                return None, (current_epoch, last_seq)
+            rows = conn.execute("SELECT seq, op FROM changes WHERE seq > ? ORDER BY seq",
+                                (seq,)).fetchall()
+        return [json.loads(row['op']) for row in rows], (epoch, rows[-1]['seq'])
+
+    def _where(self, filter_date=None, status=None, search_name=None, equipment=None,
+               date_from=None, date_to=None, max_duration=None):
+        clauses, params = [], []
+        if filter_date:
+            clauses.append("date = ?")
+            params.append(str(filter_date))
+        if date_to:
+            clauses.append("date <= ?")
+            params.append(str(date_to)[:10])
+        if date_from:
+            # Noleggi ancora fuori a date_from; con la durata massima nota anche
+            # l'inizio è limitato, così l'indice su date non scandisce il passato
+            if max_duration is not None:
+                clauses.append("date >= ?")
+                earliest = date.fromisoformat(str(date_from)[:10]) - timedelta(days=max_duration)
+                params.append(earliest.isoformat())
+            clauses.append("MAX(date, COALESCE(NULLIF(return_date, ''), date)) >= ?")
+            params.append(str(date_from)[:10])
+        if status == 'active':
+            clauses.append("completed = 0")
+        elif status == 'completed':
+            clauses.append("completed = 1")
+        query, phone_query = query_terms(search_name) if search_name else ('', '')
+        if query:
+            # Ricerca per sottostringa sui testi normalizzati della colonna search,
+            # con la stessa regola dell'indice in memoria (accenti, cifre del telefono)
+            terms = [query] + ([phone_query] if phone_query and phone_query != query else [])
+            clauses.append('(' + ' OR '.join(["search LIKE ? ESCAPE '\\'"] * len(terms)) + ')')
+            for term in terms:
+                escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+                params.append(f'%{escaped}%')
+        if equipment:
+            if equipment not in EQUIPMENT:
+                raise ValueError(f"Attrezzatura sconosciuta: {equipment}")
+            clauses.append(f"{equipment} > 0")
+        return (f"WHERE {' AND '.join(clauses)}" if clauses else ""), params
+
+    def query(self, filter_date=None, status=None, search_name=None, equipment=None,
+              limit=None, offset=0, date_from=None, date_to=None, max_duration=None):
+        """Filtra le prenotazioni usando gli indici, ordinate per data decrescente.
+
+        status: None, 'active' o 'completed'; equipment: chiave attrezzatura o None.
+        date_from/date_to: periodo in cui il noleggio è fuori; max_duration, se
+        nota, è la durata del noleggio più lungo in giorni oltre il primo.
+        Con limit restituisce solo la pagina richiesta.
+        """
+        where, params = self._where(filter_date, status, search_name, equipment,
+                                    date_from, date_to, max_duration)
+        page = ""
+        if limit is not None:
+            page = "LIMIT ? OFFSET ?"
+            params = params + [limit, offset]
+        with closing(self.connect()) as conn:
+            rows = conn.execute(
+                f"SELECT * FROM reservations {where} ORDER BY date DESC, rowid {page}", params
+            ).fetchall()
+        return [from_row(row) for row in rows]
+
+    def count(self, filter_date=None, status=None, search_name=None, equipment=None,
+              date_from=None, date_to=None, max_duration=None):
+        """Numero di prenotazioni che soddisfano i filtri"""
+        where, params = self._where(filter_date, status, search_name, equipment,
+                                    date_from, date_to, max_duration)
+        with closing(self.connect()) as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM reservations {where}", params).fetchone()[0]
+
+
+def migrate_from_json(json_path, db_path):
+    """Importa una volta sola reservations.json (snapshot + journal) nel database"""
+    from storage import JournalStore
+
+    reservations = JournalStore(json_path).load() if os.path.exists(json_path) else []
+    store = SqliteStore(db_path)
+    store.rewrite(reservations)
+    return len(reservations)
+
+
+if __name__ == '__main__':
+    import sys
+
+    source = sys.argv[1] if len(sys.argv) > 1 else 'reservations.json'
+    target = sys.argv[2] if len(sys.argv) > 2 else 'reservations.db'
+    count = migrate_from_json(source, target)
+    print(f"Migrati {count} noleggi da {source} a {target}")
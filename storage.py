@@ -0,0 +1,285 @@
+"""
+Script description: Motore di persistenza a journal per le prenotazioni del Cormorano.
+
+Ogni creazione, modifica o cancellazione viene aggiunta come singola riga al
+journal (JSON Lines) invece di riscrivere l'intero reservations.json. Periodicamente
+il journal viene compattato nello snapshot, che resta un normale elenco JSON
+compatibile con le versioni precedenti e con l'esportazione.
+
+Libraries imported:
+-------------------
+- json: Module for JSON data handling.
+- os: Module for operating system interface.
+- tempfile: Module for creating temporary files (scritture atomiche).
+- textwrap: Text wrapping and indentation (snapshot scritto a record).
+- metrics: Conteggio dei byte scritti.
+"""
+
+import json
+import os
+import tempfile
+import textwrap
+
+import metrics
+
+# Dimensione minima del journal oltre la quale viene compattato nello snapshot
+COMPACT_BYTES = 256 * 1024
+# Il journal viene compattato anche solo quando supera questa frazione dello
+# snapshot: riscrivere un archivio grande costa, e ogni altro processo lo ricarica
+COMPACT_RATIO = 0.5
+
+
+def record_key(record, position=None):
+    """Chiave di un record: l'id se presente, altrimenti la posizione"""
+    rental_id = record.get('id') if isinstance(record, dict) else None
+    return rental_id if rental_id is not None else ('_', position)
+
+
+def atomic_write_json(path, data, **dump_kwargs):
+    """Scrive un file JSON passando da un file temporaneo e rinominandolo"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix='.tmp-', dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, default=str, **dump_kwargs)
+            f.flush()
+            os.fsync(f.fileno())
+            metrics.add('bytes_written', os.fstat(f.fileno()).st_size)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def atomic_write_records(path, batches):
+    """Scrive uno snapshot JSON un lotto alla volta, con lo stesso formato di
+    json.dump(..., indent=2), passando da un file temporaneo"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix='.tmp-', dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            separator = '[\n'
+            for batch in batches:
+                for record in batch:
+                    text = json.dumps(record, ensure_ascii=False, indent=2, default=str)
+                    f.write(separator + textwrap.indent(text, '  '))
+                    separator = ',\n'
+            f.write('[]' if separator == '[\n' else '\n]')
+            f.flush()
+            os.fsync(f.fileno())
+            metrics.add('bytes_written', os.fstat(f.fileno()).st_size)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def apply_op(records, op):
+    """Applica una operazione del journal al dizionario id -> record.
+
+    Le operazioni sono idempotenti, quindi rigiocare il journal dopo una
+    compattazione interrotta non duplica i dati.
+    """
+    kind = op.get('op')
+    rental_id = op.get('id')
+    if kind == 'create':
+        records[rental_id] = op['data']
+    elif kind == 'update':
+        if rental_id in records:
+            records[rental_id] = {**records[rental_id], **op['data']}
+    elif kind == 'delete':
+        records.pop(rental_id, None)
+
+
+class JournalStore:
+    """Snapshot JSON + journal append-only delle operazioni"""
+
+    def __init__(self, snapshot_path, journal_path=None, compact_bytes=COMPACT_BYTES):
+        self.snapshot_path = snapshot_path
+        self.journal_path = journal_path or os.path.splitext(snapshot_path)[0] + '.journal'
+        self.compact_bytes = compact_bytes
+
+    def read_snapshot(self):
+        """Legge lo snapshot come dizionario ordinato id -> record"""
+        if not os.path.exists(self.snapshot_path):
+            return {}
+        with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+            try:
+                data = json.load(f)
+            except json.JSONDecodeError:
+                return {}
+        if not isinstance(data, list):
+            return {}
+        return {record_key(r, i): r for i, r in enumerate(data)}
+
+    def read_journal(self, offset=0):
+        """Restituisce le operazioni del journal a partire da offset (in byte)
+        e l'offset fino a cui è stato letto, ignorando righe troncate"""
+        if not os.path.exists(self.journal_path):
+            return [], 0
+        ops = []
+        with open(self.journal_path, 'rb') as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    # Riga ancora in scrittura: verrà letta al prossimo giro
+                    break
+                offset += len(line)
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    ops.append(json.loads(line))
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    # Riga scritta a metà (crash durante l'append)
+                    continue
+        return ops, offset
+
+    def load(self):
+        """Ricostruisce l'elenco delle prenotazioni: snapshot + coda del journal"""
+        records = self.read_snapshot()
+        for op in self.read_journal()[0]:
+            apply_op(records, op)
+        return list(records.values())
+
+    def snapshot_signature(self):
+        try:
+            stat = os.stat(self.snapshot_path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+    def cursor(self):
+        """Posizione corrente dei dati: firma dello snapshot e offset del journal"""
+        return (self.snapshot_signature(), self.journal_size())
+
+    def changes_since(self, cursor):
+        """Operazioni registrate dopo cursor e il nuovo cursore.
+
+        Restituisce None al posto delle operazioni quando lo snapshot è stato
+        riscritto (compattazione o import) e serve una ricarica completa.
+        """
+        signature, offset = cursor
+        if signature != self.snapshot_signature() or self.journal_size() < offset:
+            return None, self.cursor()
+        ops, offset = self.read_journal(offset)
+        return ops, (signature, offset)
+
+    def _complete_size(self):
+        """Dimensione del journal e fine dell'ultima riga completa (in byte)"""
+        try:
+            f = open(self.journal_path, 'rb')
+        except FileNotFoundError:
+            return 0, 0
+        with f:
+            size = position = f.seek(0, os.SEEK_END)
+            while position > 0:
+                step = min(4096, position)
+                f.seek(position - step)
+                newline = f.read(step).rfind(b'\n')
+                if newline >= 0:
+                    return size, position - step + newline + 1
+                position -= step
+            return size, 0
+
+    def append(self, *ops):
+        """Aggiunge una o più operazioni al journal con una sola scrittura.
+
+        Va chiamata sotto il lock di scrittura: una riga finale senza a capo
+        è quindi il resto di un append interrotto da un crash (mai confermato)
+        e viene tolta, altrimenti la nuova riga le verrebbe attaccata e alla
+        rilettura andrebbero perse entrambe.
+        """
+        payload = ''.join(json.dumps(op, ensure_ascii=False, default=str) + '\n' for op in ops)
+        data = payload.encode('utf-8')
+        size, complete = self._complete_size()
+        with open(self.journal_path, 'ab') as f:
+            if complete < size:
+                f.truncate(complete)
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        metrics.add('bytes_written', len(data))
+
+    def create(self, record):
+        self.append({'op': 'create', 'id': record.get('id'), 'data': record})
+
+    def create_many(self, records):
+        """Aggiunge (o sovrascrive per id) più record con una sola scrittura"""
+        self.append(*({'op': 'create', 'id': r.get('id'), 'data': r} for r in records))
+
+    def update(self, rental_id, fields):
+        self.append({'op': 'update', 'id': rental_id, 'data': fields})
+
+    def delete(self, rental_id):
+        self.append({'op': 'delete', 'id': rental_id})
+
+    def apply(self, ops):
+        """Applica più operazioni con una sola scrittura del journal"""
+        self.append(*ops)
+
+    def journal_size(self):
+        try:
+            return os.path.getsize(self.journal_path)
+        except OSError:
+            return 0
+
+    def maybe_compact(self):
+        """Compatta il journal quando supera la soglia; True se l'ha compattato.
+
+        Va chiamata da chi scrive, sotto il lock di scrittura: i dati non
+        cambiano, cambia solo la loro disposizione tra snapshot e journal.
+        """
+        try:
+            snapshot_size = os.path.getsize(self.snapshot_path)
+        except OSError:
+            snapshot_size = 0
+        if self.journal_size() >= max(self.compact_bytes, snapshot_size * COMPACT_RATIO):
+            self.compact()
+            return True
+        return False
+
+    def compact(self):
+        """Ripiega il journal nello snapshot e lo svuota"""
+        self.rewrite(self.load())
+
+    def rewrite(self, reservations):
+        """Sostituisce l'intero dataset (import, cancellazione totale, compattazione)"""
+        self.rewrite_batches([reservations])
+
+    def rewrite_batches(self, batches):
+        """Come rewrite, ma scrivendo lo snapshot un lotto alla volta"""
+        atomic_write_records(self.snapshot_path, batches)
+        with open(self.journal_path, 'w', encoding='utf-8'):
+            pass
+
+
+class IdSequence:
+    """Contatore persistente degli id: un id assegnato non viene mai riusato.
+
+    Va usato sotto il lock di scrittura dell'archivio, che rende atomica la
+    lettura e l'avanzamento del contatore tra processi diversi.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def current(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return int(json.load(f))
+        except (OSError, ValueError, TypeError):
+            return 0
+
+    def allocate(self, floor=0, count=1):
+        """Riserva count id consecutivi maggiori di floor; restituisce il primo"""
+        first = max(self.current(), floor) + 1
+        atomic_write_json(self.path, first + count - 1)
+        return first
+
+    def advance(self, value):
+        """Porta il contatore almeno a value (id inseriti dall'esterno)"""
+        if value > self.current():
+            atomic_write_json(self.path, value)
@@ -0,0 +1,73 @@
+"""
+Script description: Test dell'archivio per stagione e degli id dei noleggi archiviati.
+
+Libraries imported:
+-------------------
+- os: Module for operating system interface.
+- sys: System-specific parameters and functions.
+- json: Module for JSON data handling.
+- datetime: Module for date and time operations.
+- datastore: File dei dati e costruzione dell'archivio prenotazioni condiviso.
+- archive: Archivio compresso per stagione dei noleggi completati.
+"""
+
+import os
+import sys
+import json
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datastore import RESERVATIONS_FILE, open_archive, open_store  # noqa: E402
+from archive import archive_completed  # noqa: E402
+
+
+def rental(rental_id, day, completed):
+    return {'id': rental_id, 'name': f'Cliente {rental_id}', 'date': day, 'return_date': day,
+            'completed': completed, 'created_at': f'{day}T09:00:00'}
+
+
+def write_dataset(directory, records):
+    with open(os.path.join(directory, RESERVATIONS_FILE), 'w', encoding='utf-8') as f:
+        json.dump(records, f)
+
+
+def test_archived_ids_are_not_reused(tmp_path):
+    directory = str(tmp_path)
+    write_dataset(directory, [rental(1, '2025-08-01', False), rental(9, '2024-07-01', True)])
+    store, archive = open_store(directory), open_archive(directory)
+
+    assert archive_completed(store, archive, after_days=30, today=date(2025, 8, 2)) == 1
+    new_id = store.create({**rental(None, '2025-08-05', True), 'name': 'Nuovo'})
+    assert new_id == 10
+    assert [r['id'] for r in archive.load(2024)] == [9]
+
+
+def test_sequence_is_seeded_from_the_archive(tmp_path):
+    directory = str(tmp_path)
+    # Installazione precedente alla sequenza: il 9 è già nell'archivio per stagione
+    write_dataset(directory, [rental(1, '2025-08-01', False)])
+    archive = open_archive(directory)
+    archive.add([rental(9, '2024-07-01', True)])
+    ids_file = os.path.join(directory, 'archive', 'ids.json')
+    if os.path.exists(ids_file):
+        os.remove(ids_file)
+
+    store = open_store(directory)
+    assert store.create({**rental(None, '2025-08-05', False), 'name': 'Nuovo'}) == 10
+
+
+def test_season_totals_follow_the_segments(tmp_path):
+    directory = str(tmp_path)
+    archive = open_archive(directory)
+    archive.add([{**rental(1, '2023-07-01', True), 'price': 10.5},
+                 {**rental(2, '2024-07-01', True), 'price': 20}])
+
+    assert {season: t.total for season, t in archive.season_totals().items()} == {2023: 1, 2024: 1}
+    archive.add([{**rental(3, '2024-08-01', True), 'price': 4}])
+    totals = archive.totals()
+    assert (totals.total, totals.completed, totals.revenue) == (3, 3, 34.5)
+    # Un'altra istanza legge i totali salvati senza aprire i segmenti
+    reopened = open_archive(directory)
+    reopened.load = None
+    assert reopened.totals().revenue == 34.5
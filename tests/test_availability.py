@@ -0,0 +1,74 @@
+"""
+Script description: Test della disponibilità delle attrezzature per le modifiche dei noleggi.
+
+Libraries imported:
+-------------------
+- os: Module for operating system interface.
+- sys: System-specific parameters and functions.
+- pytest: Test framework.
+- availability: Disponibilità delle attrezzature per intervallo di date.
+- datastore: File dei dati e costruzione dell'archivio prenotazioni condiviso.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from availability import AvailabilityEngine, AvailabilityError  # noqa: E402
+from datastore import open_store  # noqa: E402
+
+STOCK = {'ombrellone': 10}
+
+
+def rental(rental_id, first, last, ombrelloni, completed=False):
+    return {'id': rental_id, 'name': f"Cliente {rental_id}", 'date': first, 'return_date': last,
+            'ombrellone': ombrelloni, 'completed': completed}
+
+
+def engine(*records):
+    result = AvailabilityEngine()
+    for record in records:
+        result.add(record['id'], record)
+    return result
+
+
+def test_edit_counts_own_units_only_where_they_were():
+    # Il noleggio 1 occupa 5 ombrelloni fino al 2, il 3 e il 4 sono pieni
+    availability = engine(rental(1, '2025-07-01', '2025-07-02', 5),
+                          rental(2, '2025-07-03', '2025-07-04', 10))
+
+    longer = rental(1, '2025-07-01', '2025-07-04', 5)
+    assert availability.shortages([longer], STOCK, [1]) == {'ombrellone': (5, 0)}
+    same_days = rental(1, '2025-07-01', '2025-07-02', 10)
+    assert availability.shortages([same_days], STOCK, [1]) == {}
+
+
+def test_bulk_change_adds_up_all_selected_rentals():
+    availability = engine(rental(1, '2025-07-01', '2025-07-01', 6),
+                          rental(2, '2025-07-05', '2025-07-05', 6))
+    moved = [rental(1, '2025-07-01', '2025-07-05', 6), rental(2, '2025-07-05', '2025-07-05', 6)]
+
+    assert availability.shortages(moved, STOCK, [1, 2]) == {'ombrellone': (12, 10)}
+    returned = [{**record, 'completed': True} for record in moved]
+    assert availability.shortages(returned, STOCK, [1, 2]) == {}
+
+
+def test_store_checks_stock_inside_the_write(tmp_path):
+    store = open_store(str(tmp_path))
+    store.create(rental(None, '2025-07-01', '2025-07-03', 8), STOCK)
+
+    with pytest.raises(AvailabilityError):
+        store.create(rental(None, '2025-07-02', '2025-07-02', 3), STOCK)
+    second = store.create(rental(None, '2025-07-04', '2025-07-05', 3), STOCK)
+    with pytest.raises(AvailabilityError):
+        store.update(second, {'date': '2025-07-03'}, stock=STOCK)
+    with pytest.raises(AvailabilityError):
+        store.update_many([1, second], {'return_date': '2025-07-05'}, stock=STOCK)
+    store.update(1, {'completed': True}, stock=STOCK)
+    store.update(second, {'date': '2025-07-03'}, stock=STOCK)
+
+    assert len(store.records()) == 2
+    assert store.get(second)['date'] == '2025-07-03'
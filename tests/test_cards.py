@@ -0,0 +1,79 @@
+"""
+Script description: Test dell'HTML delle card dei noleggi e della sua cache per versione.
+
+Libraries imported:
+-------------------
+- os: Module for operating system interface.
+- sys: System-specific parameters and functions.
+- cards: HTML delle card dei noleggi in cache per id e versione.
+- datastore: File dei dati e costruzione dell'archivio prenotazioni condiviso.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cards import CardCache, recent_card, rental_card  # noqa: E402
+from datastore import open_store  # noqa: E402
+
+SCRIPT = '<script>alert("x")</script>'
+
+
+def rental(**fields):
+    return {'name': 'Mario Rossi', 'phone': '333 1234567', 'email': 'mario@example.it',
+            'date': '2025-07-01', 'return_date': '2025-07-03', 'ombrellone': 1,
+            'price': 20.0, 'notes': '', 'created_by': 'Michele Land', **fields}
+
+
+def counting(render):
+    calls = []
+
+    def counted(rental, *args):
+        calls.append(rental['name'])
+        return render(rental, *args)
+    return counted, calls
+
+
+def test_operator_fields_are_escaped():
+    hostile = rental(id=1, name=SCRIPT, phone='"><img src=x onerror=alert(1)>',
+                     email="a'b@example.it", notes='<b>Tom & Jerry</b>', created_by=SCRIPT)
+
+    for html in (recent_card(hostile), rental_card(hostile), rental_card(hostile, True)):
+        assert '<script>' not in html and '<img' not in html and '<b>' not in html
+        assert '&lt;script&gt;alert(&quot;x&quot;)&lt;/script&gt;' in html
+    full = rental_card(hostile)
+    assert '&quot;&gt;&lt;img src=x onerror=alert(1)&gt;' in full
+    assert 'a&#x27;b@example.it' in full
+    assert '&lt;b&gt;Tom &amp; Jerry&lt;/b&gt;' in full
+
+
+def test_version_bump_rebuilds_the_cached_card(tmp_path):
+    store = open_store(str(tmp_path))
+    rental_id = store.create(rental())
+    cache = CardCache()
+    render, calls = counting(rental_card)
+
+    first = cache.get('rental', store.get(rental_id), render)
+    assert cache.get('rental', store.get(rental_id), render) is first
+    store.update(rental_id, {'name': SCRIPT})
+    second = cache.get('rental', store.get(rental_id), render)
+
+    assert calls == ['Mario Rossi', SCRIPT]
+    assert 'Mario Rossi' not in second and '&lt;script&gt;' in second
+    assert cache.get('rental', store.get(rental_id), render) is second
+    # Stesso noleggio, card diversa se cambiano gli argomenti (archiviato)
+    cache.get('rental', store.get(rental_id), render, True)
+    assert (cache.hits, cache.misses) == (2, 3)
+
+
+def test_dict_with_same_version_but_new_content_is_rebuilt():
+    cache = CardCache()
+    render, calls = counting(recent_card)
+
+    cache.get('recent', rental(id=1, version=2), render)
+    cache.get('recent', rental(id=1, version=2), render)
+    edited = cache.get('recent', rental(id=1, version=2, name='Anna Verdi'), render)
+
+    assert calls == ['Mario Rossi', 'Anna Verdi']
+    assert 'Anna Verdi' in edited
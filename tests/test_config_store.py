@@ -0,0 +1,69 @@
+"""
+Script description: Test del salvataggio di config.yaml condiviso tra più processi.
+
+Libraries imported:
+-------------------
+- os: Module for operating system interface.
+- sys: System-specific parameters and functions.
+- yaml: Module implementing the data serialization used for human readable documents.
+- config_store: Gestione del file config.yaml con salvataggi solo quando serve.
+"""
+
+import os
+import sys
+
+import yaml
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config_store import ConfigStore  # noqa: E402
+
+CONFIG = {
+    'credentials': {'usernames': {'admin': {'name': 'Admin', 'password': 'x', 'roles': None}}},
+    'cookie': {'name': 'cormorano', 'key': 'k', 'expiry_days': 30},
+    'archive': {'after_days': 180},
+}
+
+
+def write_config(tmp_path):
+    path = str(tmp_path / 'config.yaml')
+    with open(path, 'w', encoding='utf-8') as f:
+        yaml.dump(CONFIG, f)
+    return path
+
+
+def read_config(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return yaml.safe_load(f)
+
+
+def test_concurrent_registrations_are_both_kept(tmp_path):
+    path = write_config(tmp_path)
+    first, second = ConfigStore(path), ConfigStore(path)
+    first.get()['credentials']['usernames']['anna'] = {'name': 'Anna', 'password': 'a'}
+    second.get()['credentials']['usernames']['luca'] = {'name': 'Luca', 'password': 'l'}
+    first.mark_dirty()
+    second.mark_dirty()
+
+    assert first.save() and second.save()
+
+    users = read_config(path)['credentials']['usernames']
+    assert sorted(users) == ['admin', 'anna', 'luca']
+    assert sorted(second.get()['credentials']['usernames']) == ['admin', 'anna', 'luca']
+
+
+def test_merge_keeps_other_changes_and_removals(tmp_path):
+    path = write_config(tmp_path)
+    first, second = ConfigStore(path), ConfigStore(path)
+    first.get()['archive']['after_days'] = 90
+    del first.get()['credentials']['usernames']['admin']['roles']
+    second.get()['cookie']['expiry_days'] = 7
+    first.mark_dirty()
+    second.mark_dirty()
+    first.save()
+    second.save()
+
+    saved = read_config(path)
+    assert saved['archive'] == {'after_days': 90}
+    assert saved['cookie']['expiry_days'] == 7
+    assert 'roles' not in saved['credentials']['usernames']['admin']
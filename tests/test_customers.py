@@ -0,0 +1,110 @@
+"""
+Script description: Test dell'anagrafica clienti ricavata dalle prenotazioni.
+
+Libraries imported:
+-------------------
+- os: Module for operating system interface.
+- sys: System-specific parameters and functions.
+- customers: Anagrafica clienti ricavata dalle prenotazioni.
+- datastore: File dei dati e costruzione dell'archivio prenotazioni condiviso.
+- records: Prenotazioni compatte tipizzate.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from customers import CustomerDirectory  # noqa: E402
+from datastore import open_store  # noqa: E402
+from records import Reservation  # noqa: E402
+
+
+def rental(rental_id, name, phone='', email='', minute=0):
+    return {'id': rental_id, 'name': name, 'phone': phone, 'email': email,
+            'date': '2025-07-01', 'return_date': '2025-07-02',
+            'created_at': f"2025-06-20T10:{minute:02d}:00"}
+
+
+def directory(*records):
+    result = CustomerDirectory()
+    for record in records:
+        result.add(record['id'], Reservation.from_dict(record))
+    return result
+
+
+def rentals_of(customers, **contact):
+    found = customers.lookup(**contact)
+    return set(found.rentals) if found is not None else set()
+
+
+def test_rentals_are_grouped_by_phone_or_email():
+    customers = directory(
+        rental(1, 'Mario', '+39 333 123 4567', minute=1),
+        rental(2, 'Mario R.', '3331234567', 'mario@example.it', minute=3),
+        rental(3, 'M. Rossi', '', ' MARIO@Example.it ', minute=2),
+        rental(4, 'Anna Verdi', '0039 333 7654321', minute=4),
+        rental(5, 'Senza Recapiti'),
+    )
+
+    assert len(customers) == 2
+    assert rentals_of(customers, phone='333-123-4567') == {1, 2, 3}
+    assert rentals_of(customers, email='mario@example.it') == {1, 2, 3}
+    assert rentals_of(customers, phone='3337654321') == {4}
+    mario = customers.lookup(email='MARIO@EXAMPLE.IT').summary()
+    assert mario['name'] == 'Mario R.'
+    assert mario['token'] == 'tel:3331234567'
+    assert mario['phones'] == ['3331234567'] and mario['emails'] == ['mario@example.it']
+    assert customers.get(mario['token']) is customers.lookup(phone='3331234567')
+
+
+def test_rental_with_both_contacts_merges_two_customers():
+    customers = directory(rental(1, 'Lucia', '3330000001', minute=1),
+                          rental(2, 'Lucia B.', '', 'lucia@example.it', minute=2))
+    assert len(customers) == 2
+
+    customers.add(3, Reservation.from_dict(
+        rental(3, 'Lucia Bianchi', '3330000001', 'lucia@example.it', minute=3)))
+
+    assert len(customers) == 1
+    assert rentals_of(customers, phone='3330000001') == {1, 2, 3}
+    assert customers.lookup(phone='3330000001') is customers.lookup(email='lucia@example.it')
+
+
+def test_editing_contacts_moves_the_rental_to_the_new_key(tmp_path):
+    store = open_store(str(tmp_path))
+    store.create_many([rental(1, 'Mario', '3331234567', minute=1),
+                       rental(2, 'Mario', '3331234567', minute=2),
+                       rental(3, 'Anna', '', 'anna@example.it', minute=3)])
+
+    store.update(2, {'phone': '3339999999'})
+    assert store.customer(phone='3331234567')['rentals'] == 1
+    assert store.customer(phone='3339999999')['rentals'] == 1
+
+    store.update(1, {'phone': '', 'email': 'anna@example.it'})
+    assert store.customer(phone='3331234567') is None
+    anna = store.customer(email='anna@example.it')
+    assert anna['rentals'] == 2 and anna['phones'] == []
+    assert anna['name'] == 'Anna'
+    # Un nome cambiato sul noleggio più recente aggiorna il nome del cliente
+    store.update(3, {'name': 'Anna Verdi'})
+    assert store.customer(token=anna['token'])['name'] == 'Anna Verdi'
+
+
+def test_removing_the_last_rental_drops_the_customer(tmp_path):
+    store = open_store(str(tmp_path))
+    store.create_many([rental(1, 'Mario', '3331234567', 'mario@example.it', minute=1),
+                       rental(2, 'Mario', '3331234567', minute=2),
+                       rental(3, 'Anna', '3337654321', minute=3)])
+    token = store.customer(phone='3331234567')['token']
+
+    store.delete(1)
+    mario = store.customer(token=token)
+    assert mario['rentals'] == 1
+    assert mario['emails'] == [] and store.customer(email='mario@example.it') is None
+
+    store.delete(2)
+    assert store.customer(token=token) is None
+    assert store.customer(phone='3331234567') is None
+    assert [c['name'] for c in store.find_customers('333')] == ['Anna']
+    assert len(store.customers) == 1
@@ -0,0 +1,93 @@
+"""
+Script description: Test dell'esportazione delle prenotazioni e del download dalle impostazioni.
+
+Libraries imported:
+-------------------
+- os: Module for operating system interface.
+- sys: System-specific parameters and functions.
+- io: Core tools for working with streams.
+- csv: CSV file reading and writing.
+- gzip: Support for gzip files.
+- json: Module for JSON data handling.
+- pytest: Test framework.
+- datastore: File dei dati e costruzione dell'archivio prenotazioni condiviso.
+- exporter: Esportazione a blocchi delle prenotazioni in JSON, JSON Lines o CSV.
+"""
+
+import os
+import sys
+import io
+import csv
+import gzip
+import json
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datastore import RESERVATIONS_FILE, open_store  # noqa: E402
+from exporter import CSV_FIELDS, CSV_ROWS_PER_CHUNK, export_bytes, write_export  # noqa: E402
+
+RECORDS = [
+    {'id': i, 'name': f"Cliente {i} «è»", 'phone': '333 1234567', 'email': '',
+     'date': f"2025-07-{i:02d}", 'return_date': f"2025-07-{i + 1:02d}", 'ombrellone': 1,
+     'sdraio': 2, 'lettino': 0, 'regista': 0, 'price': 12.5 * i, 'deposit_paid': True,
+     'insurance': False, 'notes': 'riga 1\nriga 2, "virgolette"', 'completed': i % 2 == 0,
+     'created_at': '2025-06-20T10:00:00', 'created_by': 'Michele Land', 'extra': {'a': [1]}}
+    for i in range(1, 8)
+]
+
+
+def exported(records, fmt, compress=False):
+    fileobj = io.BytesIO()
+    write_export(records, fmt, fileobj, compress)
+    return fileobj.getvalue()
+
+
+def test_json_is_identical_to_json_dumps():
+    expected = json.dumps(RECORDS, ensure_ascii=False, indent=2).encode('utf-8')
+    assert exported(RECORDS, 'json') == expected
+    assert exported([], 'json') == json.dumps([], indent=2).encode('utf-8')
+
+
+def test_jsonl_and_csv_round_trip():
+    lines = exported(RECORDS, 'jsonl').decode('utf-8').splitlines()
+    assert [json.loads(line) for line in lines] == RECORDS
+
+    many = RECORDS * (CSV_ROWS_PER_CHUNK // len(RECORDS) + 1)
+    rows = list(csv.DictReader(io.StringIO(exported(many, 'csv').decode('utf-8'))))
+    assert len(rows) == len(many)
+    assert list(rows[0]) == CSV_FIELDS
+    assert rows[0]['notes'] == RECORDS[0]['notes']
+    assert rows[1]['price'] == '25.0'
+
+
+def test_gzip_contains_the_plain_export():
+    for fmt in ('json', 'jsonl', 'csv'):
+        assert gzip.decompress(exported(RECORDS, fmt, compress=True)) == exported(RECORDS, fmt)
+
+
+def test_date_and_status_filters(tmp_path):
+    with open(os.path.join(str(tmp_path), RESERVATIONS_FILE), 'w', encoding='utf-8') as f:
+        json.dump(RECORDS, f)
+    store = open_store(str(tmp_path))
+
+    def ids(*args):
+        return [r['id'] for r in json.loads(exported(store.iter_records(*args), 'json'))]
+
+    assert ids() == [1, 2, 3, 4, 5, 6, 7]
+    assert ids('2025-07-03', '2025-07-05') == [3, 4, 5]
+    assert ids(None, None, 'completed') == [2, 4, 6]
+    assert ids('2025-07-02', '2025-07-05', 'active') == [3, 5]
+
+
+def test_download_data_is_accepted_by_streamlit():
+    download_data_util = pytest.importorskip('streamlit.runtime.download_data_util')
+    for fmt in ('json', 'jsonl', 'csv'):
+        for compress in (False, True):
+            data = export_bytes(RECORDS, fmt, compress)
+            converted, _ = download_data_util.convert_data_to_bytes_and_infer_mime(
+                data, unsupported_error=TypeError(type(data)))
+            if compress:
+                converted = gzip.decompress(converted)
+            assert converted == exported(RECORDS, fmt)
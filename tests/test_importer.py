@@ -0,0 +1,122 @@
+"""
+Script description: Test dell'importazione in streaming dei backup.
+
+Libraries imported:
+-------------------
+- os: Module for operating system interface.
+- sys: System-specific parameters and functions.
+- io: Core tools for working with streams.
+- json: Module for JSON data handling.
+- pytest: Test framework.
+- datastore: File dei dati e costruzione dell'archivio prenotazioni condiviso.
+- importer: Importazione in streaming e con validazione dei backup di prenotazioni.
+- records: Dizionario JSON dei record compatti.
+- shared_store: Conflitti delle scritture concorrenti.
+"""
+
+import os
+import sys
+import io
+import json
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datastore import open_archive, open_store  # noqa: E402
+from importer import import_records  # noqa: E402
+from records import as_dict  # noqa: E402
+from shared_store import ConflictError  # noqa: E402
+
+
+def rental(rental_id, name):
+    record = {'name': name, 'date': '2025-07-01', 'return_date': '2025-07-03'}
+    if rental_id is not None:
+        record['id'] = rental_id
+    return record
+
+
+def backup(records):
+    return io.BytesIO(json.dumps(records).encode('utf-8'))
+
+
+def test_merge_saves_records_without_id_batch_by_batch(tmp_path):
+    store = open_store(str(tmp_path))
+    fileobj = backup([rental(None, f"Cliente {i}") for i in range(6)])
+    seen = []
+
+    def progress(consumed, imported):
+        seen.append((consumed, imported, len(store.records())))
+
+    report = import_records(store, fileobj, batch_size=2, progress=progress)
+
+    assert report['imported'] == 6
+    assert [imported for _, imported, _ in seen] == [2, 4, 6]
+    # Ogni lotto è già salvato quando viene segnalato, con i byte letti fin lì
+    assert [saved for _, _, saved in seen] == [2, 4, 6]
+    assert all(consumed > 0 for consumed, _, _ in seen)
+    assert seen[-1][0] == report['bytes'] == len(fileobj.getvalue())
+    assert sorted(r.id for r in store.records()) == [1, 2, 3, 4, 5, 6]
+
+
+def test_merge_moves_assigned_id_taken_later_in_file(tmp_path):
+    store = open_store(str(tmp_path))
+    fileobj = backup([rental(None, 'Senza Id'), rental(1, 'Con Id')])
+
+    report = import_records(store, fileobj, batch_size=1)
+
+    names = {r.id: as_dict(r)['name'] for r in store.records()}
+    assert report['imported'] == 2
+    assert sorted(names.values()) == ['Con Id', 'Senza Id']
+    assert names[1] == 'Con Id'
+
+
+def test_replace_assigns_missing_ids_after_file_ids(tmp_path):
+    store = open_store(str(tmp_path))
+    fileobj = backup([rental(None, 'Senza Id'), rental(7, 'Con Id')])
+
+    import_records(store, fileobj, mode='replace')
+
+    names = {r.id: as_dict(r)['name'] for r in store.records()}
+    assert names == {7: 'Con Id', 8: 'Senza Id'}
+
+
+def test_merge_upsert_moves_the_version_past_the_stored_one(tmp_path):
+    store = open_store(str(tmp_path))
+    store.create(rental(1, 'Mario Rossi'))
+    store.update(1, {'notes': 'prima'})
+    store.update(1, {'notes': 'seconda'})
+    seen_version = store.get(1)['version']
+
+    import_records(store, backup([{**rental(1, 'Altro Cliente'), 'version': 1}]))
+
+    assert store.get(1)['name'] == 'Altro Cliente'
+    assert store.get(1)['version'] == seen_version + 1
+    with pytest.raises(ConflictError):
+        store.update(1, {'notes': 'vecchia vista'}, expected_version=seen_version)
+
+
+def test_replace_moves_the_version_past_the_stored_one(tmp_path):
+    store = open_store(str(tmp_path))
+    store.create(rental(3, 'Mario Rossi'))
+    store.update(3, {'notes': 'modificato'})
+
+    import_records(store, backup([rental(3, 'Altro Cliente')]), mode='replace')
+
+    assert store.get(3)['version'] == 2
+
+
+def test_ids_of_archived_rentals_are_rejected(tmp_path):
+    directory = str(tmp_path)
+    archive = open_archive(directory)
+    archive.add([{**rental(5, 'Archiviato'), 'completed': True}])
+    store = open_store(directory)
+    store.create(rental(2, 'Ancora Attivo'))
+
+    report = import_records(store, backup([rental(5, 'Doppione'), rental(2, 'Aggiornato'),
+                                           rental(9, 'Nuovo')]), archive=archive)
+
+    assert report['imported'] == 2
+    assert report['rejected'] == [(1, "id 5 già usato da un noleggio archiviato")]
+    assert {r.id: as_dict(r)['name'] for r in store.records()} == {2: 'Aggiornato', 9: 'Nuovo'}
+    assert [r['name'] for r in archive.load(2025)] == ['Archiviato']
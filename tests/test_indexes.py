@@ -0,0 +1,155 @@
+"""
+Script description: Test dei filtri per periodo sugli indici in memoria e su SQLite,
+confrontati con una scansione completa dopo modifiche e cancellazioni.
+
+Libraries imported:
+-------------------
+- os: Module for operating system interface.
+- sys: System-specific parameters and functions.
+- random: Generate pseudo-random numbers.
+- datetime: Module for date and time operations.
+- availability: Intervallo di date occupato da un noleggio.
+- datastore: File dei dati e costruzione dell'archivio prenotazioni condiviso.
+- indexes: Indici secondari in memoria per i filtri della lista noleggi.
+- records: Prenotazioni compatte tipizzate.
+"""
+
+import os
+import sys
+import random
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from availability import rental_span  # noqa: E402
+from datastore import open_store  # noqa: E402
+from indexes import ReservationIndex  # noqa: E402
+from records import Reservation  # noqa: E402
+
+START = date(2025, 6, 1)
+LONGEST = 40
+
+
+def day(offset):
+    return (START + timedelta(days=offset)).isoformat()
+
+
+def sample(rng, count=300):
+    records = []
+    for rental_id in range(1, count + 1):
+        first = rng.randrange(90)
+        record = {'id': rental_id, 'name': f"Cliente {rental_id}", 'date': day(first),
+                  'return_date': day(first + rng.choice([0, 0, 1, 2, 3, 7, 14]))}
+        records.append(record)
+    # Un solo noleggio molto più lungo degli altri, che poi viene accorciato o cancellato
+    records[0]['date'] = day(0)
+    records[0]['return_date'] = day(LONGEST)
+    return records
+
+
+def odd_dates(rng, records):
+    """Date mancanti, rientri vuoti o precedenti alla partenza"""
+    for record in rng.sample(records[1:], 30):
+        kind = rng.randrange(3)
+        if kind == 0:
+            record['return_date'] = ''
+        elif kind == 1:
+            departure = date.fromisoformat(record['date'])
+            record['return_date'] = (departure - timedelta(days=rng.randrange(1, 5))).isoformat()
+        else:
+            record['date'] = ''
+    return records
+
+
+def periods(rng, count=60):
+    result = [(None, None), (day(45), None), (None, day(10)), (day(LONGEST), day(LONGEST))]
+    for _ in range(count):
+        first = rng.randrange(-10, 100)
+        result.append((day(first), day(first + rng.randrange(0, 15))))
+    return result
+
+
+def overlapping(records, first, last):
+    """Scansione completa: ordine per data decrescente, poi per inserimento"""
+    lo = date.fromisoformat(first).toordinal() if first else 1
+    hi = date.fromisoformat(last).toordinal() if last else None
+    found = []
+    for position, record in enumerate(records):
+        span = rental_span(record)
+        if span is not None and span[1] >= lo and (hi is None or span[0] <= hi):
+            found.append((-span[0], position, record['id']))
+    return [rental_id for _, _, rental_id in sorted(found)]
+
+
+def longest(records):
+    spans = [rental_span(r) for r in records]
+    return max((end - start for start, end in filter(None, spans)), default=0)
+
+
+def check_index(index, records, rng):
+    assert index.max_duration() == longest(records)
+    for first, last in periods(rng):
+        assert index.keys_overlapping(first, last) == overlapping(records, first, last), (first, last)
+
+
+def test_index_overlap_matches_full_scan_through_updates_and_deletes():
+    rng = random.Random(11)
+    records = odd_dates(rng, sample(rng))
+    index = ReservationIndex()
+    for record in records:
+        index.add(record['id'], Reservation.from_dict(record))
+    check_index(index, records, rng)
+
+    for i in rng.sample(range(1, len(records)), 80):
+        first = rng.randrange(90)
+        edited = {**records[i], 'date': day(first), 'return_date': day(first + rng.randrange(5))}
+        index.replace(edited['id'], Reservation.from_dict(records[i]), Reservation.from_dict(edited))
+        records[i] = edited
+    check_index(index, records, rng)
+
+    for i in sorted(rng.sample(range(1, len(records)), 60), reverse=True):
+        index.replace(records[i]['id'], Reservation.from_dict(records.pop(i)), None)
+    check_index(index, records, rng)
+
+    # Il noleggio più lungo accorciato e poi cancellato: il limite si restringe
+    shorter = {**records[0], 'return_date': day(20)}
+    index.replace(shorter['id'], Reservation.from_dict(records[0]), Reservation.from_dict(shorter))
+    records[0] = shorter
+    assert index.max_duration() == 20
+    check_index(index, records, rng)
+    index.replace(shorter['id'], Reservation.from_dict(records.pop(0)), None)
+    assert index.max_duration() == longest(records) < 20
+    check_index(index, records, rng)
+
+
+def check_sqlite(store, records, rng):
+    max_duration = store.index.max_duration()
+    assert max_duration == longest(records)
+    for first, last in periods(rng):
+        expected = overlapping(records, first, last)
+        found = store.backend.query(date_from=first, date_to=last, max_duration=max_duration)
+        assert [r['id'] for r in found] == expected, (first, last)
+        assert store.backend.count(date_from=first, date_to=last,
+                                   max_duration=max_duration) == len(expected)
+
+
+def test_sqlite_overlap_bound_matches_full_scan_through_updates_and_deletes(tmp_path):
+    rng = random.Random(5)
+    records = sample(rng, 200)
+    store = open_store(str(tmp_path), backend='sqlite')
+    store.create_many(records)
+    check_sqlite(store, records, rng)
+
+    for i in rng.sample(range(1, len(records)), 50):
+        first = rng.randrange(90)
+        fields = {'date': day(first), 'return_date': day(first + rng.randrange(5))}
+        store.update(records[i]['id'], fields)
+        records[i] = {**records[i], **fields}
+    for i in sorted(rng.sample(range(1, len(records)), 40), reverse=True):
+        store.delete(records.pop(i)['id'])
+    check_sqlite(store, records, rng)
+
+    # Senza il noleggio più lungo il limite inferiore sulla data si restringe
+    store.delete(records.pop(0)['id'])
+    assert store.index.max_duration() < LONGEST
+    check_sqlite(store, records, rng)
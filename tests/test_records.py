@@ -0,0 +1,91 @@
+"""
+Script description: Test della conversione senza perdite tra prenotazioni compatte e schema JSON.
+
+Libraries imported:
+-------------------
+- os: Module for operating system interface.
+- sys: System-specific parameters and functions.
+- json: Module for JSON data handling.
+- datastore: File dei dati e costruzione dell'archivio prenotazioni condiviso.
+- records: Rappresentazione compatta e tipizzata delle prenotazioni in memoria.
+"""
+
+import os
+import sys
+import json
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datastore import RESERVATIONS_FILE, open_store  # noqa: E402
+from records import Reservation  # noqa: E402
+
+COMPLETE = {
+    'id': 1, 'name': 'Mario Rossi', 'phone': '333 1234567', 'email': 'mario@example.it',
+    'date': '2025-07-01', 'return_date': '2025-07-03', 'ombrellone': 1, 'sdraio': 2,
+    'lettino': 0, 'regista': 1, 'price': 37.5, 'deposit_paid': True, 'insurance': False,
+    'notes': '', 'completed': False, 'created_at': '2025-06-20T10:15:30.123456',
+    'created_by': 'Michele Land',
+}
+
+# Valori che la forma compatta non rappresenta e che vanno restituiti identici
+IRREGULAR = [
+    {**COMPLETE, 'id': 2, 'version': 4, 'extra': {'ombrellone_n': [12, 13]}},
+    {**COMPLETE, 'id': 3, 'date': '01/07/2025', 'return_date': '2025-7-3'},
+    {**COMPLETE, 'id': 4, 'date': '2025-07-01T09:00:00', 'return_date': ''},
+    {**COMPLETE, 'id': 5, 'date': None, 'created_at': '2025-06-20 10:15'},
+    {**COMPLETE, 'id': 6, 'price': 40, 'sdraio': 2.0, 'lettino': -1, 'regista': None},
+    {**COMPLETE, 'id': 7, 'price': None, 'deposit_paid': 1, 'completed': 'sì'},
+    {**COMPLETE, 'id': 8, 'price': 0.1 + 0.2, 'created_at': '2025-06-20T10:15:30+02:00'},
+    {**COMPLETE, 'id': 9, 'name': None, 'phone': 3331234567, 'notes': None},
+    {'id': 10, 'name': 'Solo Nome', 'date': '2025-07-01'},
+    {'name': 'Senza Id', 'raw': 'chiave col nome di uno slot'},
+]
+
+
+def same_json(first, second):
+    """Confronto che distingue 1 da 1.0 e True da 1"""
+    return json.dumps(first, sort_keys=True) == json.dumps(second, sort_keys=True)
+
+
+def test_to_dict_returns_the_original_json():
+    for original in [COMPLETE] + IRREGULAR:
+        reservation = Reservation.from_dict(original)
+        assert same_json(reservation.to_dict(), original), original
+        assert set(reservation.keys()) == set(original)
+        assert len(reservation) == len(original)
+
+
+def test_missing_fields_stay_missing():
+    reservation = Reservation.from_dict(IRREGULAR[-2])
+
+    assert 'price' not in reservation and 'completed' not in reservation
+    assert reservation.get('price') is None
+    assert reservation.completed is False
+    assert 'id' not in Reservation.from_dict(IRREGULAR[-1])
+
+
+def test_updated_keeps_the_values_it_does_not_touch():
+    original = IRREGULAR[1]
+    edited = Reservation.from_dict(original).updated({'notes': 'ritardo'})
+
+    assert same_json(edited.to_dict(), {**original, 'notes': 'ritardo'})
+
+
+def test_reload_from_snapshot_and_journal(tmp_path):
+    directory = str(tmp_path)
+    with open(os.path.join(directory, RESERVATIONS_FILE), 'w', encoding='utf-8') as f:
+        json.dump([COMPLETE] + IRREGULAR[:-1], f)
+    store = open_store(directory)
+    store.update(3, {'notes': 'dal journal'})
+    created = store.create({**IRREGULAR[5], 'id': None})
+    store.create_many([{**IRREGULAR[0], 'id': 20}])
+    expected = {r['id']: r for r in [COMPLETE] + IRREGULAR[:-1]}
+    expected[3] = {**expected[3], 'notes': 'dal journal', 'version': 1}
+    expected[created] = {**IRREGULAR[5], 'id': created}
+    expected[20] = {**IRREGULAR[0], 'id': 20}
+
+    for reloaded in (store, open_store(directory)):
+        records = {r.id: r for r in reloaded.records()}
+        assert set(records) == set(expected)
+        for rental_id, original in expected.items():
+            assert same_json(records[rental_id].to_dict(), original), rental_id
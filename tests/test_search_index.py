@@ -0,0 +1,87 @@
+"""
+Script description: Test della ricerca per nome, telefono ed email, in memoria e su SQLite.
+
+Libraries imported:
+-------------------
+- os: Module for operating system interface.
+- sys: System-specific parameters and functions.
+- sqlite3: Embedded SQL database engine.
+- random: Generate pseudo-random numbers.
+- search_index: Indice di ricerca per nome, telefono ed email dei clienti.
+- sqlite_store: Backend SQLite opzionale con interrogazioni indicizzate.
+"""
+
+import os
+import sys
+import sqlite3
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from search_index import NameSearchIndex, matches  # noqa: E402
+from sqlite_store import SqliteStore  # noqa: E402
+
+NAMES = ['Mario Rossi', 'Lucia Rossì', 'Niccolò Bianchi', 'Anna Verdi', 'Zoë Neri', 'Al Bo']
+QUERIES = ['r', 'ro', 'ì', 'rossi', 'rossì', 'ROSSI', 'o b', 'niccolo', 'zoe', 'bo',
+           'al', '3', '3 2', '+39 33', '(333) 1', '12', 'mario@', '.it', '%', '_', 'xyz']
+
+
+def sample(count=300, seed=7):
+    rng = random.Random(seed)
+    records = []
+    for rental_id in range(1, count + 1):
+        name = rng.choice(NAMES)
+        phone = ''.join(rng.choice('0123456789') for _ in range(10))
+        if rng.random() < 0.3:
+            phone = f"+39 {phone[:3]} {phone[3:]}"
+        email = f"{name.split()[0].lower()}{rental_id}@example.it" if rng.random() < 0.5 else ''
+        records.append({'id': rental_id, 'name': name, 'phone': phone, 'email': email,
+                        'date': '2025-07-01', 'return_date': '2025-07-02'})
+    return records
+
+
+def expected(records, query):
+    return {r['id'] for r in records if matches(r, query)}
+
+
+def test_index_matches_every_query_and_follows_edits():
+    records = sample()
+    index = NameSearchIndex()
+    for record in records:
+        index.add(record['id'], record)
+    # Modifiche e cancellazioni lasciano posizioni vuote negli elenchi
+    for record in records[:100]:
+        edited = {**record, 'name': 'Giò Ferri'}
+        index.replace(record['id'], record, edited)
+        record.update(edited)
+    for record in records[100:150]:
+        index.remove(record['id'])
+    records = records[:100] + records[150:]
+
+    for query in QUERIES + ['gio', 'ferri']:
+        assert (index.search(query) or set()) == expected(records, query), query
+
+
+def test_sqlite_search_folds_accents_and_phones_like_the_index(tmp_path):
+    records = sample()
+    store = SqliteStore(str(tmp_path / 'reservations.db'))
+    store.rewrite(records)
+
+    assert expected(records, 'rossì') == expected(records, 'rossi') != set()
+    assert expected(records, '3 2')
+    for query in QUERIES:
+        found = {r['id'] for r in store.query(search_name=query)}
+        assert found == expected(records, query), query
+        assert store.count(search_name=query) == len(found)
+
+
+def test_sqlite_fills_search_column_of_older_databases(tmp_path):
+    path = str(tmp_path / 'reservations.db')
+    SqliteStore(path).rewrite(sample(20))
+    with sqlite3.connect(path) as conn:
+        conn.execute("ALTER TABLE reservations DROP COLUMN search")
+
+    store = SqliteStore(path)
+
+    records = store.load()
+    assert {r['id'] for r in store.query(search_name='rossi')} == expected(records, 'rossi')
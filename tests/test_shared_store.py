@@ -0,0 +1,99 @@
+"""
+Script description: Test dell'archivio condiviso: sequenza degli id e lock su file.
+
+Libraries imported:
+-------------------
+- os: Module for operating system interface.
+- sys: System-specific parameters and functions.
+- json: Module for JSON data handling.
+- time: Module for time access and conversions.
+- pytest: Test framework.
+- storage: Journal append-only per il salvataggio incrementale delle prenotazioni.
+- shared_store: Copia delle prenotazioni condivisa tra tutte le sessioni.
+- file_lock: Lock su file condiviso tra processi.
+"""
+
+import os
+import sys
+import json
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage import JournalStore  # noqa: E402
+from shared_store import ConflictError, SharedReservationStore  # noqa: E402
+from file_lock import FileLock, LockTimeout  # noqa: E402
+
+
+def rental(rental_id, name='Mario Rossi'):
+    return {'id': rental_id, 'name': name, 'date': '2025-07-01', 'return_date': '2025-07-03',
+            'completed': False, 'created_at': '2025-06-20T10:00:00'}
+
+
+def open_store(tmp_path, records):
+    snapshot = str(tmp_path / 'reservations.json')
+    with open(snapshot, 'w', encoding='utf-8') as f:
+        json.dump(records, f)
+    return SharedReservationStore(JournalStore(snapshot, str(tmp_path / 'reservations.journal')),
+                                  lock_path=snapshot,
+                                  sequence_path=str(tmp_path / 'reservations.seq'))
+
+
+def test_deleted_highest_id_is_not_reused(tmp_path):
+    store = open_store(tmp_path, [rental(1), rental(9)])
+    seen_version = store.get(9).get('version', 0)
+    store.delete(9)
+
+    new_id = store.create({**rental(None, 'Luca Verdi')})
+    assert new_id == 10
+    # La versione vista per il noleggio 9 non vale per un noleggio diverso
+    with pytest.raises(ConflictError):
+        store.update(9, {'completed': True}, seen_version)
+
+
+def test_release_keeps_a_lock_taken_over_by_another_owner(tmp_path):
+    lock = FileLock(str(tmp_path / 'data'))
+    lock.acquire()
+    with open(lock.lock_path, 'w', encoding='utf-8') as f:
+        f.write('altro-processo')
+    lock.release()
+    assert os.path.exists(lock.lock_path)
+
+
+def test_held_lock_is_refreshed_and_not_broken(tmp_path):
+    holder = FileLock(str(tmp_path / 'data'), stale_after=0.3)
+    waiter = FileLock(str(tmp_path / 'data'), stale_after=0.3, timeout=0.6)
+    with holder:
+        time.sleep(0.5)
+        with pytest.raises(LockTimeout):
+            waiter.acquire()
+    with waiter:
+        assert waiter.held
+
+
+def test_failed_token_write_leaves_no_lock(tmp_path, monkeypatch):
+    lock = FileLock(str(tmp_path / 'data'), timeout=0.2)
+
+    def failing_write(fd, data):
+        raise OSError('disco pieno')
+
+    monkeypatch.setattr(os, 'write', failing_write)
+    with pytest.raises(OSError):
+        lock.acquire()
+    monkeypatch.undo()
+
+    assert not os.path.exists(lock.lock_path)
+    with lock:
+        assert lock.held
+
+
+def test_abandoned_lock_is_broken(tmp_path):
+    lock = FileLock(str(tmp_path / 'data'), stale_after=0.1, timeout=1.0)
+    with open(lock.lock_path, 'w', encoding='utf-8') as f:
+        f.write('processo-terminato')
+    old = time.time() - 10
+    os.utime(lock.lock_path, (old, old))
+    with lock:
+        assert lock.held
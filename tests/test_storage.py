@@ -0,0 +1,58 @@
+"""
+Script description: Test del journal delle prenotazioni (storage).
+
+Libraries imported:
+-------------------
+- os: Module for operating system interface.
+- sys: System-specific parameters and functions.
+- storage: Journal append-only per il salvataggio incrementale delle prenotazioni.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage import JournalStore  # noqa: E402
+
+
+def make_store(tmp_path):
+    store = JournalStore(str(tmp_path / 'reservations.json'), str(tmp_path / 'reservations.journal'))
+    store.rewrite([{'id': 1, 'name': 'Mario Rossi'}])
+    return store
+
+
+def test_append_after_torn_write_is_not_lost(tmp_path):
+    store = make_store(tmp_path)
+    store.create({'id': 2, 'name': 'Giulia Bianchi'})
+    # Crash a metà di un append: l'ultima riga resta senza a capo
+    with open(store.journal_path, 'ab') as f:
+        f.write(b'{"op": "create", "id": 3, "data": {"id": 3, "na')
+    store.create({'id': 100, 'name': 'Luca Verdi'})
+
+    ids = [r['id'] for r in JournalStore(store.snapshot_path, store.journal_path).load()]
+    assert ids == [1, 2, 100]
+    with open(store.journal_path, 'rb') as f:
+        assert f.read().count(b'\n') == 2
+
+
+def test_torn_write_longer_than_read_block(tmp_path):
+    store = make_store(tmp_path)
+    with open(store.journal_path, 'ab') as f:
+        f.write(b'{"op": "create", "data": "' + b'x' * 10000)
+    store.create({'id': 100, 'name': 'Luca Verdi'})
+
+    ids = [r['id'] for r in JournalStore(store.snapshot_path, store.journal_path).load()]
+    assert ids == [1, 100]
+
+
+def test_reader_cursor_survives_trimmed_tail(tmp_path):
+    store = make_store(tmp_path)
+    store.create({'id': 2, 'name': 'Giulia Bianchi'})
+    cursor = store.cursor()
+    with open(store.journal_path, 'ab') as f:
+        f.write(b'{"op": "del')
+    store.delete(2)
+
+    ops, _ = store.changes_since(cursor)
+    assert ops == [{'op': 'delete', 'id': 2}]
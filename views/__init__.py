@@ -0,0 +1,29 @@
+"""
+Script description: Pagine dell'app, importate solo alla prima apertura.
+
+Ogni pagina è un modulo con una funzione render(store, config, authenticator).
+Lo script dell'app importa soltanto la pagina richiesta: le altre (e le loro
+dipendenze, come NumPy per le statistiche) non pesano sull'avvio né sui rerun,
+e una volta importata la pagina resta in sys.modules per tutto il processo.
+
+Libraries imported:
+-------------------
+- importlib: The implementation of import (import al primo utilizzo).
+"""
+
+import importlib
+
+# Pagine disponibili: chiave di st.session_state.current_page -> modulo
+PAGES = {
+    'home': 'views.home',
+    'rentals': 'views.rentals',
+    'stats': 'views.stats',
+    'profile': 'views.profile',
+    'settings': 'views.settings',
+}
+
+
+def load(page):
+    """Modulo della pagina, importato al primo utilizzo (None se la pagina non esiste)"""
+    module = PAGES.get(page)
+    return importlib.import_module(module) if module else None
@@ -0,0 +1,112 @@
+"""
+Script description: Pagina Dashboard: totali, noleggi di oggi e noleggi recenti.
+
+Libraries imported:
+-------------------
+- streamlit: Framework used to build pure Python web applications.
+- os: Module for operating system interface.
+- datetime: Module for date and time operations.
+- resources: Risorse dell'app create una volta per processo.
+- cards: HTML delle card dei noleggi in cache per id e versione.
+"""
+
+import os
+from datetime import date
+
+import streamlit as st
+
+from resources import get_card_cache, load_totals
+from cards import batch, recent_card
+
+# Noleggi recenti mostrati in dashboard (e aggiunti da "Carica altri")
+RECENT_COUNT = int(os.environ.get('CORMORANO_RECENT_COUNT', 5))
+
+# Testi scuri sulle card dei totali
+STATS_CARD_STYLE = """
+    <style>
+    .stats-card h2, .stats-card p {
+        color: #000000 !important;
+    }
+    </style>
+"""
+
+
+def render(store, config, authenticator):
+    """Pagina Dashboard: totali e noleggi recenti"""
+    card_cache = get_card_cache()
+    st.markdown("## 🏠 Dashboard Generale")
+
+    # Statistiche rapide
+    col1, col2 = st.columns(2)
+
+    # Totali mantenuti dall'archivio condiviso a ogni modifica, più le stagioni archiviate
+    totals = load_totals()
+    total_rentals = totals.total
+    completed_rentals = totals.completed
+    active_rentals = totals.active
+
+    # Stile CSS
+    st.markdown(STATS_CARD_STYLE, unsafe_allow_html=True)
+
+    # Colonna 1 - Elementi in verticale
+    with col1:
+        st.markdown("""
+        <div class="stats-card">
+            <h3>📋</h3>
+            <h2>{}</h2>
+            <p class="txt-card">Noleggi Totali</p>
+        </div>
+        """.format(total_rentals), unsafe_allow_html=True)
+
+        st.markdown("""
+        <div class="stats-card">
+            <h3>✅</h3>
+            <h2>{}</h2>
+            <p class="txt-card">Completati</p>
+        </div>
+        """.format(completed_rentals), unsafe_allow_html=True)
+
+    # Colonna 2 - Elementi in verticale
+    with col2:
+        st.markdown("""
+        <div class="stats-card">
+            <h3>⏳</h3>
+            <h2>{}</h2>
+            <p class="txt-card">Attivi</p>
+        </div>
+        """.format(active_rentals), unsafe_allow_html=True)
+
+        today_rentals = store.today_count(date.today())
+        st.markdown("""
+        <div class="stats-card">
+            <h3>📅</h3>
+            <h2>{}</h2>
+            <p class="txt-card">Oggi</p>
+        </div>
+        """.format(today_rentals), unsafe_allow_html=True)
+
+    archived_rentals = totals.total - store.aggregates.total
+    if archived_rentals:
+        st.caption(f"📦 I totali comprendono {archived_rentals} noleggi delle stagioni archiviate")
+
+    st.divider()
+
+    # Noleggi recenti
+    st.markdown("### 📅 Noleggi Recenti")
+    if "recent_limit" not in st.session_state:
+        st.session_state.recent_limit = RECENT_COUNT
+    st.markdown(f"##### Ultimi {st.session_state.recent_limit} noleggi")
+    recent_rentals = store.latest(st.session_state.recent_limit)
+
+    if recent_rentals:
+        # Card in sola lettura: un unico elemento per tutto l'elenco
+        st.markdown(batch(card_cache.get('recent', rental, recent_card) for rental in recent_rentals),
+                    unsafe_allow_html=True)
+
+        if (len(recent_rentals) == st.session_state.recent_limit
+                and store.aggregates.total > len(recent_rentals)):
+            if st.button("⬇️ Carica altri", key="recent_more"):
+                st.session_state.recent_limit += RECENT_COUNT
+                st.rerun()
+    else:
+        st.info("🌊 Nessun noleggio presente")
@@ -0,0 +1,34 @@
+"""
+Script description: Pagina Profilo: dati dell'utente e cambio password.
+
+Libraries imported:
+-------------------
+- streamlit: Framework used to build pure Python web applications.
+- streamlit_authenticator: Login, registrazione e gestione delle password.
+- resources: Risorse dell'app create una volta per processo.
+"""
+
+import streamlit as st
+from streamlit_authenticator.utilities import ResetError
+
+from resources import get_config_store
+
+
+def render(store, config, authenticator):
+    """Pagina Profilo: dati dell'utente e cambio password"""
+    config_store = get_config_store()
+    st.markdown("## 👤 Profilo Utente")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.info(f"**Nome:** {st.session_state['name']}")
+        st.info(f"**Username:** {st.session_state['username']}")
+
+    with col2:
+        st.markdown("### 🔒 Cambia Password")
+        try:
+            if authenticator.reset_password(st.session_state['username']):
+                st.success('✅ Password cambiata con successo')
+                config_store.mark_dirty()
+        except ResetError as e:
+            st.error(f"Errore: {e}")
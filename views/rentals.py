@@ -0,0 +1,401 @@
+"""
+Script description: Pagina Gestione Noleggi: nuovo noleggio, filtri, lista paginata e azioni.
+
+Libraries imported:
+-------------------
+- streamlit: Framework used to build pure Python web applications.
+- os: Module for operating system interface.
+- datetime: Module for date and time operations.
+- itertools: Functions creating iterators for efficient looping.
+- resources: Risorse dell'app create una volta per processo.
+- sqlite_store: Backend SQLite opzionale con interrogazioni indicizzate.
+- shared_store: Copia delle prenotazioni condivisa tra tutte le sessioni.
+- availability: Disponibilità delle attrezzature per intervallo di date.
+- metrics: Tempi delle operazioni principali e log a rotazione delle metriche.
+- cards: HTML delle card dei noleggi in cache per id e versione.
+- customers: Anagrafica clienti per telefono ed email.
+"""
+
+import os
+from datetime import datetime, date, timedelta
+from itertools import chain, groupby
+
+import streamlit as st
+
+from resources import (get_archive, get_card_cache, add_reservation, update_reservation,
+                       delete_reservation)
+from sqlite_store import SqliteStore
+from shared_store import ConflictError, record_version
+from availability import AvailabilityError, load_stock
+import metrics
+from cards import batch, rental_card
+from customers import same_customer
+
+# Noleggi mostrati per pagina nella lista
+PAGE_SIZES = [10, 25, 50, 100]
+DEFAULT_PAGE_SIZE = int(os.environ.get('CORMORANO_PAGE_SIZE', 25))
+
+
+def render(store, config, authenticator):
+    """Pagina Gestione Noleggi: inserimento, filtri, lista e azioni sui noleggi"""
+    archive = get_archive()
+    card_cache = get_card_cache()
+    st.markdown("## 📋 Gestione Noleggi")
+
+    # Form per nuovo noleggio
+    with st.expander("➕ Nuovo Noleggio", expanded=bool(st.session_state.get('customer_query'))):
+        # Cliente abituale: ricerca nell'anagrafica e dati copiati nel modulo
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            customer_query = st.text_input("🔎 Cliente abituale", key="customer_query",
+                                           placeholder="Nome, telefono o email")
+        suggestions = store.find_customers(customer_query) if len(customer_query.strip()) >= 2 else []
+        if suggestions:
+            with col1:
+                chosen = st.selectbox("Cliente trovato", suggestions, key="customer_choice",
+                                      format_func=lambda c: c['label'])
+            with col2:
+                st.write("")  # Spaziatura
+                if st.button("📋 Compila", key="customer_fill", use_container_width=True):
+                    st.session_state.new_name = chosen['name']
+                    st.session_state.new_phone = chosen['phone']
+                    st.session_state.new_email = chosen['email']
+                if st.button("📜 Storico", key="customer_history", use_container_width=True):
+                    st.session_state.customer_filter = chosen['token']
+        elif len(customer_query.strip()) >= 2:
+            st.caption("Nessun cliente trovato: i dati verranno inseriti da zero")
+
+        with st.form("new_rental"):
+            st.markdown("### 📝 Dettagli Cliente")
+            col1, col2 = st.columns(2)
+
+            with col1:
+                client_name = st.text_input("👤 Nome Cliente", placeholder="Nome e cognome", key="new_name")
+                rental_date = st.date_input("📅 Data Noleggio", value=date.today())
+                phone = st.text_input("📞 Telefono", placeholder="Numero di telefono", key="new_phone")
+
+            with col2:
+                email = st.text_input("📧 Email", placeholder="email@esempio.com", key="new_email")
+                return_date = st.date_input("📅 Data Restituzione", value=date.today())
+                price = st.number_input("💰 Prezzo Totale (€)", min_value=0.0, step=0.5)
+
+            st.divider()
+            st.markdown("### 🏖️ Kit Mare")
+
+            # Contatori per attrezzature
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                ombrellone = st.number_input("☂️ Ombrelloni", min_value=0, max_value=20, value=0)
+            with col2:
+                sdraio = st.number_input("🪑 Sedie Sdraio", min_value=0, max_value=50, value=0)
+            with col3:
+                lettino = st.number_input("🛏️ Lettini", min_value=0, max_value=30, value=0)
+            with col4:
+                regista = st.number_input("🎬 Sedie Regista", min_value=0, max_value=20, value=0)
+
+            notes = st.text_area("📝 Note Aggiuntive", placeholder="Eventuali note sul noleggio...")
+
+            col1, col2 = st.columns(2)
+            with col1:
+                deposit_paid = st.checkbox("💳 Deposito Pagato")
+            with col2:
+                insurance = st.checkbox("🛡️ Assicurazione")
+
+            if st.form_submit_button("💾 Salva Noleggio", use_container_width=True):
+                if client_name.strip():
+                    # L'id viene assegnato al salvataggio dalla sequenza condivisa
+                    new_rental = {
+                        'id': None,
+                        'name': client_name.strip(),
+                        'phone': phone,
+                        'email': email,
+                        'date': str(rental_date),
+                        'return_date': str(return_date),
+                        'ombrellone': ombrellone,
+                        'sdraio': sdraio,
+                        'lettino': lettino,
+                        'regista': regista,
+                        'price': price,
+                        'deposit_paid': deposit_paid,
+                        'insurance': insurance,
+                        'notes': notes,
+                        'completed': False,
+                        'created_at': datetime.now().isoformat(),
+                        'created_by': st.session_state['name']
+                    }
+
+                    # La disponibilità sulle date richieste è controllata al
+                    # salvataggio, sotto lo stesso lock della scrittura
+                    if add_reservation(new_rental, load_stock(config)):
+                        st.success("✅ Noleggio salvato con successo!")
+                        st.rerun()
+                else:
+                    st.error("⚠️ Il nome del cliente è obbligatorio")
+
+    st.divider()
+
+    # Filtri
+    st.markdown("### 🔍 Filtri di Ricerca")
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        # Giorno di inizio esatto, oppure noleggi fuori in un giorno o in un periodo
+        date_mode = st.selectbox("📅 Periodo", ["Giorno di inizio", "Fuori il giorno", "Dal - Al"],
+                                 key="date_mode")
+        filter_date = date_from = date_to = None
+        if date_mode == "Fuori il giorno":
+            date_from = date_to = st.date_input("Giorno", value=date.today(), key="filter_out_day")
+        elif date_mode == "Dal - Al":
+            monday = date.today() - timedelta(days=date.today().weekday())
+            period = st.date_input("Dal - Al", value=(monday, monday + timedelta(days=6)),
+                                   key="filter_period")
+            if period:
+                # Finché si sceglie la seconda data il periodo è di un solo giorno
+                date_from, date_to = period[0], period[-1]
+        else:
+            filter_date = st.date_input("Data", value=None, key="filter_date")
+    with col2:
+        filter_status = st.selectbox("Stato", ["Tutti", "Attivi", "Completati"])
+    with col3:
+        search_name = st.text_input("🔍 Cerca nome", key="search_name",
+                                    placeholder="Nome, telefono o email")
+    with col4:
+        equipment_filter = st.selectbox("Attrezzatura", ["Tutte", "Ombrelloni", "Sdraio", "Lettini", "Regista"])
+
+    # Lista noleggi
+    st.markdown("### 📋 Lista Noleggi")
+
+    # Applica filtri
+    status_map = {"Attivi": "active", "Completati": "completed"}
+    equipment_map = {
+        "Ombrelloni": "ombrellone",
+        "Sdraio": "sdraio", 
+        "Lettini": "lettino",
+        "Regista": "regista"
+    }
+    equipment_key = equipment_map.get(equipment_filter)
+
+    # Storico di un cliente: solo i suoi noleggi, dall'anagrafica
+    customer = None
+    if st.session_state.get('customer_filter'):
+        customer = store.customer(st.session_state.customer_filter)
+        if customer is None:
+            st.session_state.pop('customer_filter')
+    customer_token = customer['token'] if customer else None
+
+    filters = (filter_date, date_from, date_to, filter_status, search_name, equipment_filter,
+               customer_token)
+    if st.session_state.get('rentals_filters') != filters:
+        # Filtri cambiati: si riparte dalla prima pagina
+        st.session_state.rentals_filters = filters
+        st.session_state.rentals_page = 1
+
+    if "page_size" not in st.session_state:
+        st.session_state.page_size = DEFAULT_PAGE_SIZE if DEFAULT_PAGE_SIZE in PAGE_SIZES else PAGE_SIZES[1]
+    page_size = st.session_state.page_size
+    page = st.session_state.get('rentals_page', 1)
+
+    if isinstance(store.backend, SqliteStore) and customer is None:
+        # Filtri e paginazione eseguiti dal database sugli indici
+        query_filters = dict(filter_date=filter_date,
+                             date_from=date_from,
+                             date_to=date_to,
+                             max_duration=store.index.max_duration(),
+                             status=status_map.get(filter_status),
+                             search_name=search_name,
+                             equipment=equipment_key)
+
+        def hot_page(offset, limit):
+            return (store.backend.count(**query_filters),
+                    store.backend.query(**query_filters, limit=limit, offset=offset))
+    else:
+        # Filtri serviti dagli indici in memoria, già ordinati per data
+        select_filters = dict(filter_date=filter_date,
+                              date_from=date_from,
+                              date_to=date_to,
+                              status=status_map.get(filter_status),
+                              equipment=equipment_key,
+                              search=search_name,
+                              customer=customer_token)
+
+        def hot_page(offset, limit):
+            return store.select(**select_filters, offset=offset, limit=limit)
+
+    with metrics.span('filter') as filter_counts:
+        # Stagioni archiviate: lette solo se il filtro per data le riguarda
+        archived_rentals = []
+        if filter_date is not None or date_from is not None or customer is not None:
+            archived_rentals = archive.select(
+                filter_date, status_map.get(filter_status), equipment_key, search_name,
+                date_from=date_from, date_to=date_to,
+                match=(lambda r: same_customer(customer, r)) if customer else None)
+
+        hot_total, filtered_rentals = hot_page((page - 1) * page_size, page_size)
+        total_filtered = hot_total + len(archived_rentals)
+        total_pages = max(1, -(-total_filtered // page_size))
+        if page > total_pages:
+            page = total_pages
+            hot_total, filtered_rentals = hot_page((page - 1) * page_size, page_size)
+        if len(filtered_rentals) < page_size and archived_rentals:
+            # I noleggi archiviati seguono quelli dell'archivio di lavoro
+            start = max(0, (page - 1) * page_size - hot_total)
+            filtered_rentals = list(filtered_rentals) + \
+                archived_rentals[start:start + page_size - len(filtered_rentals)]
+        archived_ids = {r['id'] for r in archived_rentals}
+        filter_counts['records'] = total_filtered
+
+    if customer is not None:
+        # Riepilogo del cliente: tutti i suoi noleggi, anche quelli archiviati
+        history = store.select(customer=customer_token)[1]
+        spent = sum(float(r.get('price') or 0) for r in chain(history, archived_rentals))
+        rentals_count = len(history) + len(archived_rentals)
+        col1, col2 = st.columns([4, 1])
+        with col1:
+            st.info(f"📜 Storico di **{customer['name']}** "
+                    f"({' · '.join(c for c in (customer['phone'], customer['email']) if c)}): "
+                    f"{rentals_count} {'noleggio' if rentals_count == 1 else 'noleggi'}, €{spent:.2f} in totale")
+        with col2:
+            if st.button("✖️ Tutti i clienti", key="customer_clear", use_container_width=True):
+                st.session_state.pop('customer_filter', None)
+                st.rerun()
+
+    # Paginazione: solo la pagina visibile diventa widget
+    st.session_state.rentals_page = page
+    col1, col2, col3 = st.columns([2, 1, 1])
+    with col1:
+        first = (page - 1) * page_size + 1 if total_filtered else 0
+        last = min(page * page_size, total_filtered)
+        st.markdown(f"**{total_filtered}** noleggi trovati — mostrati {first}-{last}")
+    with col2:
+        st.number_input("Pagina", min_value=1, max_value=total_pages, key="rentals_page")
+    with col3:
+        st.selectbox("Per pagina", PAGE_SIZES, key="page_size")
+
+    # Modifica rifiutata perché un altro operatore ha cambiato il noleggio
+    conflict_notice = st.session_state.pop('conflict_notice', None)
+    if conflict_notice:
+        st.warning(conflict_notice)
+
+    if filtered_rentals:
+        # Versioni mostrate all'operatore nel run precedente: le modifiche
+        # partono da lì e falliscono se il noleggio è cambiato nel frattempo
+        seen_versions = st.session_state.get('seen_versions', {})
+        shown_versions = {}
+
+        # Azioni multiple sui noleggi selezionati nella pagina
+        selected_ids = [r['id'] for r in filtered_rentals
+                        if st.session_state.get(f"select_{r['id']}", False)]
+        with st.expander(f"☑️ Azioni sui selezionati ({len(selected_ids)})",
+                         expanded=bool(selected_ids)):
+            col1, col2, col3 = st.columns([2, 2, 1])
+            with col1:
+                bulk_action = st.selectbox("Azione", [
+                    "Segna come restituiti",
+                    "Segna deposito pagato",
+                    "Cambia data restituzione",
+                    "Elimina",
+                ], key="bulk_action")
+            with col2:
+                bulk_return_date = st.date_input("📅 Nuova restituzione", value=date.today(),
+                                                 key="bulk_return_date",
+                                                 disabled=bulk_action != "Cambia data restituzione")
+            with col3:
+                st.write("")  # Spaziatura
+                apply_bulk = st.button("Applica", key="bulk_apply", disabled=not selected_ids,
+                                       use_container_width=True)
+            if st.button("Seleziona tutta la pagina", key="bulk_select_page"):
+                for rental in filtered_rentals:
+                    st.session_state[f"select_{rental['id']}"] = True
+                st.rerun()
+
+            if apply_bulk and selected_ids:
+                expected_versions = {rental_id: seen_versions[rental_id]
+                                     for rental_id in selected_ids if rental_id in seen_versions}
+                bulk_fields = {
+                    "Segna come restituiti": {'completed': True, 'deposit_paid': True},
+                    "Segna deposito pagato": {'deposit_paid': True},
+                    "Cambia data restituzione": {'return_date': str(bulk_return_date)},
+                }
+                try:
+                    # Un solo salvataggio e un solo rerun per tutto il lotto
+                    if bulk_action == "Elimina":
+                        changed = store.delete_many(selected_ids, expected_versions)
+                    else:
+                        changed = store.update_many(selected_ids, bulk_fields[bulk_action],
+                                                    expected_versions, load_stock(config))
+                    st.session_state.bulk_notice = f"✅ {bulk_action}: {changed} noleggi aggiornati"
+                except ConflictError as e:
+                    st.session_state.conflict_notice = f"⚠️ {e}: i dati sono stati aggiornati, riprova"
+                except AvailabilityError as e:
+                    st.session_state.conflict_notice = f"⚠️ {e}"
+                except Exception as e:
+                    st.session_state.conflict_notice = f"Errore nel salvataggio: {e}"
+                for rental in filtered_rentals:
+                    st.session_state.pop(f"select_{rental['id']}", None)
+                    st.session_state.pop(f"completed_{rental['id']}", None)
+                st.rerun()
+
+        bulk_notice = st.session_state.pop('bulk_notice', None)
+        if bulk_notice:
+            st.success(bulk_notice)
+
+        for archived_group, group in groupby(filtered_rentals, key=lambda r: r['id'] in archived_ids):
+            if archived_group:
+                # Noleggi archiviati, in sola lettura: un unico elemento per gruppo
+                st.markdown(batch(card_cache.get('rental', rental, rental_card, True) for rental in group),
+                            unsafe_allow_html=True)
+                continue
+            for rental in group:
+                version = record_version(rental)
+                expected_version = seen_versions.get(rental['id'], version)
+                shown_versions[rental['id']] = version
+                col1, col2 = st.columns([4, 1])
+
+                with col1:
+                    # Card noleggio, dalla cache finché il noleggio non cambia
+                    st.markdown(card_cache.get('rental', rental, rental_card), unsafe_allow_html=True)
+
+                with col2:
+                    st.write("")  # Spaziatura
+                    st.write("")  # Spaziatura
+
+                    # Selezione per le azioni multiple
+                    st.checkbox("Seleziona", key=f"select_{rental['id']}")
+
+                    # Checkbox completamento
+                    completed = st.checkbox(
+                        "Restituito",
+                        value=rental.get('completed', False),
+                        key=f"completed_{rental['id']}"
+                    )
+
+                    # Aggiorna stato se cambiato
+                    if completed != rental.get('completed', False):
+                        fields = {'completed': completed}
+                        if completed:
+                            fields['deposit_paid'] = True
+                        if not update_reservation(rental['id'], expected_version,
+                                                  load_stock(config), **fields):
+                            # La casella torna allo stato salvato dall'altro operatore
+                            st.session_state.pop(f"completed_{rental['id']}", None)
+                        st.rerun()
+
+
+                    # Storico del cliente del noleggio
+                    if (customer is None and (rental.get('phone') or rental.get('email'))
+                            and st.button("👤 Storico", key=f"history_{rental['id']}",
+                                          help="Tutti i noleggi di questo cliente")):
+                        found = store.customer(phone=rental.get('phone'), email=rental.get('email'))
+                        if found is not None:
+                            st.session_state.customer_filter = found['token']
+                            st.rerun()
+
+                    # Bottone elimina
+                    if st.button("🗑️ Elimina", key=f"delete_{rental['id']}", help="Elimina noleggio"):
+                        if delete_reservation(rental['id'], expected_version):
+                            st.success("Noleggio eliminato!")
+                        st.rerun()
+
+        st.session_state.seen_versions = shown_versions
+        st.divider()
+    else:
+        st.info("🌊 Nessun noleggio trovato con i filtri applicati")
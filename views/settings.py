@@ -0,0 +1,155 @@
+"""
+Script description: Pagina Impostazioni: esportazione, importazione, archivio e prestazioni.
+
+Libraries imported:
+-------------------
+- streamlit: Framework used to build pure Python web applications.
+- datetime: Module for date and time operations.
+- itertools: Functions creating iterators for efficient looping.
+- resources: Risorse dell'app create una volta per processo.
+- importer: Importazione in streaming e validata dei backup.
+- exporter: Esportazione a blocchi in JSON, JSON Lines o CSV.
+- archive: Archivio compresso per stagione dei noleggi completati.
+"""
+
+from datetime import date
+from itertools import chain
+
+import streamlit as st
+
+from resources import (METRICS_LOG, get_archive, get_config_store, get_metrics,
+                       save_reservations)
+from importer import import_records
+from exporter import FORMATS, export_bytes, export_filename, export_mime
+from archive import archive_after_days, archive_completed
+
+
+def render(store, config, authenticator):
+    """Pagina Impostazioni: dati, archivio e prestazioni"""
+    archive = get_archive()
+    config_store = get_config_store()
+    st.markdown("## ⚙️ Impostazioni Sistema")
+
+    # Gestione dati
+    st.markdown("### 📊 Gestione Dati")
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        export_format = st.selectbox("Formato", list(FORMATS), format_func=str.upper,
+                                     key="export_format")
+        export_gzip = st.checkbox("Comprimi (gzip)", key="export_gzip")
+        export_status = st.selectbox("Stato", ["Tutti", "Attivi", "Completati"], key="export_status")
+        export_range = st.date_input("Periodo (opzionale)", value=(), key="export_range")
+        export_archive = st.checkbox("Includi stagioni archiviate", value=True, key="export_archive")
+        if store.aggregates.total or (export_archive and archive.totals().total):
+            date_from = export_range[0] if len(export_range) > 0 else None
+            date_to = export_range[1] if len(export_range) > 1 else date_from
+            status = {"Attivi": "active", "Completati": "completed"}.get(export_status)
+
+            def export_file():
+                # Generato solo al clic sul pulsante, non a ogni rerun della pagina
+                export_records = store.iter_records(date_from, date_to, status)
+                if export_archive:
+                    export_records = chain(export_records,
+                                           archive.iter_records(date_from, date_to, status))
+                return export_bytes(export_records, export_format, export_gzip)
+
+            st.download_button(
+                "📥 Esporta e scarica",
+                data=export_file,
+                file_name=export_filename(export_format, export_gzip, date.today()),
+                mime=export_mime(export_format, export_gzip),
+                on_click="ignore",
+                use_container_width=True
+            )
+            # Streamlit consegna il download tenendolo tutto in memoria
+            st.caption("Il file viene preparato al clic e tenuto in memoria fino al download: "
+                       "per archivi grandi conviene la compressione gzip.")
+        else:
+            st.info("Nessun dato da esportare")
+
+    with col2:
+        uploaded_file = st.file_uploader("📤 Importa JSON", type=['json', 'jsonl'])
+        if uploaded_file is not None:
+            import_mode = st.radio("Modalità", ["Unisci (aggiorna per id)", "Sostituisci tutto"],
+                                   key="import_mode")
+            if st.button("📤 Avvia importazione", use_container_width=True):
+                progress_bar = st.progress(0.0, text="Importazione in corso...")
+                file_size = max(uploaded_file.size, 1)
+
+                def show_progress(bytes_read, imported):
+                    progress_bar.progress(min(bytes_read / file_size, 1.0),
+                                          text=f"{imported} noleggi importati")
+
+                try:
+                    report = import_records(
+                        store, uploaded_file,
+                        mode='replace' if import_mode == "Sostituisci tutto" else 'merge',
+                        progress=show_progress, archive=archive)
+                    progress_bar.progress(1.0, text=f"{report['imported']} noleggi importati")
+                    st.success(f"✅ Importati {report['imported']} noleggi")
+                    if report['rejected_count']:
+                        st.warning(f"⚠️ {report['rejected_count']} record scartati")
+                        with st.expander("Record scartati"):
+                            for position, reason in report['rejected']:
+                                st.write(f"#{position}: {reason}")
+                except Exception as e:
+                    st.error(f"❌ Errore nell'importazione: {e}")
+
+    with col3:
+        if st.button("🗑️ Cancella Tutti", use_container_width=True):
+            if store.aggregates.total:
+                if st.checkbox("⚠️ Conferma cancellazione"):
+                    if save_reservations([]):
+                        st.success("Tutti i dati sono stati eliminati")
+                        st.rerun()
+            else:
+                st.info("Nessun dato da eliminare")
+
+    st.divider()
+
+    # Archivio delle stagioni passate
+    st.markdown("### 📦 Archivio Stagioni")
+    season_totals = archive.season_totals()
+    if season_totals:
+        st.markdown("Stagioni archiviate: " + ", ".join(
+            f"{season} ({totals.total} noleggi, €{totals.revenue:.2f})"
+            for season, totals in season_totals.items()))
+    else:
+        st.markdown("Nessuna stagione archiviata")
+    col1, col2 = st.columns(2)
+    with col1:
+        after_days = st.number_input("Archivia i completati restituiti da più di (giorni)",
+                                     min_value=1, value=archive_after_days(config), step=30)
+        if after_days != archive_after_days(config):
+            config.setdefault('archive', {})['after_days'] = int(after_days)
+            config_store.mark_dirty()
+    with col2:
+        st.write("")  # Spaziatura
+        if st.button("📦 Archivia ora", use_container_width=True):
+            try:
+                moved = archive_completed(store, archive, int(after_days))
+                st.success(f"✅ {moved} noleggi spostati nell'archivio")
+            except Exception as e:
+                st.error(f"❌ Errore nell'archiviazione: {e}")
+
+    # Pannello prestazioni, solo per gli amministratori
+    if 'admin' in (st.session_state.get('roles') or []):
+        st.divider()
+        st.markdown("### ⏱️ Prestazioni")
+        recorder = get_metrics()
+        col1, col2 = st.columns(2)
+        with col1:
+            st.metric("Record elaborati", recorder.totals['records'])
+        with col2:
+            st.metric("Byte scritti", f"{recorder.totals['bytes_written'] / 1024:.1f} KB")
+        st.markdown("##### Tempi per operazione (ultimi campioni del processo)")
+        st.dataframe(recorder.summary(), hide_index=True, use_container_width=True)
+        last_run_spans = st.session_state.get('last_run_spans')
+        if last_run_spans:
+            st.markdown("##### Run precedente di questa sessione")
+            st.dataframe([{'Span': name, 'ms': round(ms, 2),
+                           'Contatori': ', '.join(f"{k}={v}" for k, v in counts.items())}
+                          for name, ms, counts in last_run_spans],
+                         hide_index=True, use_container_width=True)
+        st.caption(f"Log delle metriche: {METRICS_LOG} (una riga JSON per span, a rotazione)")
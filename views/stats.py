@@ -0,0 +1,139 @@
+"""
+Script description: Pagina Statistiche: attrezzature, ricavi, disponibilità e occupazione.
+
+analytics (e con lui NumPy) viene importato solo qui, alla prima apertura della
+pagina, e non all'avvio dell'app.
+
+Libraries imported:
+-------------------
+- streamlit: Framework used to build pure Python web applications.
+- datetime: Module for date and time operations.
+- itertools: Functions creating iterators for efficient looping.
+- resources: Risorse dell'app create una volta per processo.
+- availability: Disponibilità delle attrezzature per intervallo di date.
+- analytics: Statistiche vettorizzate con NumPy (ricavi, utilizzo, operatori).
+"""
+
+from datetime import date
+from itertools import chain
+
+import streamlit as st
+
+from resources import get_archive, load_totals
+from availability import load_stock
+import analytics
+
+# Stagione balneare (mese, giorno) per la timeline di occupazione
+SEASON_START = (5, 1)
+SEASON_END = (9, 30)
+
+
+def render(store, config, authenticator):
+    """Pagina Statistiche: attrezzature, ricavi, disponibilità e occupazione"""
+    archive = get_archive()
+    st.markdown("## 📊 Statistiche Dettagliate")
+
+    # Totali dei noleggi di lavoro e delle stagioni archiviate
+    totals = load_totals()
+    if totals.total:
+        # Statistiche attrezzature
+        col1, col2 = st.columns(2)
+
+        with col1:
+            st.markdown("### 🏖️ Utilizzo Attrezzature")
+            total_equipment = totals.equipment
+
+            for equipment, total in total_equipment.items():
+                emoji_map = {'ombrellone': '☂️', 'sdraio': '🪑', 'lettino': '🛏️', 'regista': '🎬'}
+                st.metric(f"{emoji_map[equipment]} {equipment.title()}", total)
+
+        with col2:
+            st.markdown("### 💰 Statistiche Finanziarie")
+            total_revenue = totals.revenue
+            avg_rental = totals.average_price
+            deposits_paid = totals.deposits_paid
+
+            st.metric("Ricavi Totali", f"€{total_revenue:.2f}")
+            st.metric("Media per Noleggio", f"€{avg_rental:.2f}")
+            st.metric("Depositi Pagati", deposits_paid)
+
+        if totals.total > store.aggregates.total:
+            st.caption(f"📦 Compresi {totals.total - store.aggregates.total} noleggi "
+                       "delle stagioni archiviate")
+
+        st.divider()
+
+        # Disponibilità attrezzature
+        st.markdown("### 📆 Disponibilità Attrezzature")
+        stock = load_stock(config)
+        emoji_map = {'ombrellone': '☂️', 'sdraio': '🪑', 'lettino': '🛏️', 'regista': '🎬'}
+        col1, col2 = st.columns(2)
+        with col1:
+            availability_from = st.date_input("Dal", value=date.today(), key="availability_from")
+        with col2:
+            availability_to = st.date_input("Al", value=date.today(), key="availability_to")
+        if availability_to < availability_from:
+            availability_to = availability_from
+
+        cols = st.columns(len(stock))
+        for col, (equipment, total) in zip(cols, stock.items()):
+            with col:
+                free = store.availability.free(equipment, stock, availability_from, availability_to)
+                st.metric(f"{emoji_map[equipment]} {equipment.title()} liberi", f"{free}/{total}")
+
+        # Colonne NumPy, ricalcolate solo quando le prenotazioni cambiano
+        archived_seasons = archive.seasons()
+        include_archive = st.toggle("📦 Includi stagioni archiviate", key="stats_archive",
+                                    disabled=not archived_seasons)
+        if include_archive:
+            columns = store.derived(
+                'analytics_archive',
+                lambda records: analytics.ReservationColumns(chain(records, archive.records_between())))
+        else:
+            columns = store.derived('analytics', analytics.ReservationColumns)
+
+        # Occupazione giornaliera della stagione
+        season_year = availability_from.year
+        season_columns = columns
+        if season_year in archived_seasons and not include_archive:
+            # La stagione richiesta è archiviata: si legge solo il suo segmento
+            season_columns = store.derived(
+                f'analytics_{season_year}',
+                lambda records: analytics.ReservationColumns(chain(records, archive.load(season_year))))
+        days, occupancy = analytics.daily_occupancy(
+            season_columns,
+            date(season_year, SEASON_START[0], SEASON_START[1]),
+            date(season_year, SEASON_END[0], SEASON_END[1]))
+        st.markdown(f"##### Occupazione giornaliera stagione {season_year}")
+        st.line_chart({'Giorno': days, **occupancy}, x='Giorno')
+        st.markdown(f"##### Utilizzo delle scorte stagione {season_year} (%)")
+        st.area_chart({'Giorno': days, **analytics.utilization(occupancy, stock)}, x='Giorno')
+
+        st.divider()
+
+        # Andamento dei ricavi
+        st.markdown("### 📈 Andamento Ricavi")
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Durata Media", f"{analytics.average_duration(columns):.1f} giorni")
+        with col2:
+            st.metric("Depositi Pagati", f"{analytics.deposit_ratio(columns) * 100:.1f}%")
+        with col3:
+            st.metric("Noleggi Analizzati", columns.size)
+
+        period = st.radio("Raggruppa per", ["Giorno", "Settimana", "Mese"],
+                          index=2, horizontal=True, key="revenue_period")
+        revenue_functions = {
+            "Giorno": analytics.revenue_by_day,
+            "Settimana": analytics.revenue_by_week,
+            "Mese": analytics.revenue_by_month,
+        }
+        periods, revenue = revenue_functions[period](columns)
+        st.bar_chart({period: periods.astype('datetime64[D]'), 'Ricavi (€)': revenue}, x=period)
+
+        # Riepilogo per operatore
+        st.markdown("### 👥 Riepilogo per Operatore")
+        st.dataframe(analytics.operator_breakdown(columns), hide_index=True,
+                     use_container_width=True)
+    else:
+        st.info("🌊 Nessun dato disponibile per le statistiche")
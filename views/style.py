@@ -0,0 +1,100 @@
+"""
+Script description: CSS comune a tutte le pagine dell'app.
+
+Costante del modulo: costruita una volta per processo e inviata a ogni run.
+"""
+
+# Card con effetto vetro, statistiche, badge delle attrezzature e bottoni
+CSS = """
+<style>
+    /* Cards responsive e con effetto vetro */
+    .rental-card, .completed-rental {
+        background: rgba(255, 255, 255, 0.15);
+        backdrop-filter: blur(10px);
+        -webkit-backdrop-filter: blur(10px);
+        color: white;
+        border-radius: 15px;
+        padding: 20px;
+        margin: 10px 0;
+        box-shadow: 0 4px 15px rgba(0,0,0,0.1);
+        border: 1px solid rgba(255, 255, 255, 0.18);
+        width: 100%;
+        box-sizing: border-box;
+        display: flex;
+        flex-direction: column;
+        align-items: center;
+        text-align: center;
+    }
+
+    /* Gradiente per rental-card */
+    .rental-card {
+        background: linear-gradient(135deg, rgba(102, 126, 234, 0.8) 0%, rgba(118, 75, 162, 0.8) 100%);
+    }
+
+    /* Stessa dimensione e margini ma colore verde per completed-rental */
+    .completed-rental {
+        background: linear-gradient(135deg, rgba(76, 175, 80, 0.8) 0%, rgba(69, 160, 73, 0.8) 100%);
+    }
+
+    #Tolgo spazio vuolto inizio pagina    NON VAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA PORCA TROIA   
+    .st-emotion-cache-8atqhb.e1mlolmg0 {
+        display: none;
+    }
+
+    /* Stats cards responsive con effetto vetro */
+    .stats-card {
+        background: rgba(255, 255, 255, 0.8);
+        backdrop-filter: blur(5px);
+        -webkit-backdrop-filter: blur(5px);
+        border-radius: 10px;
+        padding: 15px;
+        text-align: center;
+        box-shadow: 0 2px 10px rgba(0,0,0,0.1);
+        margin: 10px 0;
+        width: 100%;
+        box-sizing: border-box;
+        border: 1px solid rgba(255, 255, 255, 0.2);
+    }
+
+    /* Equipment badge */
+    .equipment-badge {
+        background-color: rgba(255,255,255,0.2);
+        border-radius: 20px;
+        padding: 5px 12px;
+        margin: 5px;
+        display: inline-block;
+        font-size: 0.9em;
+    }
+
+    /* Bottone stile */
+    .stButton > button {
+        border-radius: 10px;
+        border: none;
+        background: linear-gradient(45deg, #667eea, #764ba2);
+        color: white;
+        width: 100%;
+        max-width: 200px;
+        padding: 10px;
+        margin: 5px 0;
+    }
+
+    /* Media query per mobile */
+    @media (max-width: 768px) {
+    .rental-card, .completed-rental, .stats-card {
+        padding: 7px;
+        align-items: center;
+        justify-content: left;
+        display: flex;
+    }
+            
+    .txt-card {
+        margin: 0px !important;
+    }
+        
+    .equipment-badge {
+        font-size: 0.8em;
+        padding: 4px 10px;
+    }
+    }
+</style>
+"""